@@ -0,0 +1,7 @@
+"""
+benchmarks
+
+Benchmarks of the scanners, image processing, reorganizer and LLM plumbing, one module per production module.
+Run one from the repository root, e.g. `python -m benchmarks.conversation_history`. They only log numbers,
+the behaviour they exercise is checked by the tests in `tests/`.
+"""
@@ -0,0 +1,57 @@
+import os
+import time
+import shutil
+import logging
+import tempfile
+from typing import List
+from src.features import extract_exe
+from src.features.app_sources import FilesystemSource, build_catalog
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def _fake_installation(root: str, sources_count: int, apps_count: int, exe_per_app: int) -> List[str]:
+    """
+    Create `sources_count` folders with `apps_count` app folders each, every app with `exe_per_app` .exe files.
+    Half of the apps of every source are also in the next one, to give the deduplication some work.
+    """
+    source_roots = []
+    for source_number in range(sources_count):
+        source_root = os.path.join(root, f'source_{source_number}')
+        for app_number in range(apps_count):
+            app_number += source_number * apps_count // 2
+            app_dir = os.path.join(source_root, f'App {app_number}')
+            os.makedirs(app_dir, exist_ok=True)
+            for exe_number in range(exe_per_app):
+                exe_name = f'app {app_number}.exe' if exe_number == 0 else f'helper_{exe_number}.exe'
+                open(os.path.join(app_dir, exe_name), 'w').close()
+        source_roots.append(source_root)
+    return source_roots
+
+def benchmark_pipeline(sources_count: int = 4, apps_count: int = 2000, exe_per_app: int = 3) -> None:
+    """
+    Compare building the catalog from fake filesystem sources one after another, concurrently,
+    and again with the .exe resolution cache filled.
+    """
+    root = tempfile.mkdtemp(prefix='app_sources_benchmark_')
+    try:
+        source_roots = _fake_installation(root, sources_count, apps_count, exe_per_app)
+        logger.info(f'Fake installation: {sources_count} sources, {apps_count} apps each, {exe_per_app} .exe files per app')
+
+        catalogs = []
+        for run, workers, cache_name in (('sequential', 1, 'cache_1'), ('concurrent', sources_count, 'cache_n'),
+                                         ('concurrent, warm cache', sources_count, 'cache_n')):
+            output_file = os.path.join(root, f'catalog_{len(catalogs)}.json')
+            exe_cache = extract_exe.ExeResolutionCache(os.path.join(root, f'{cache_name}.json'))
+            sources = [FilesystemSource(source_root, exe_cache=exe_cache) for source_root in source_roots]
+            start = time.perf_counter()
+            stats = build_catalog(sources, output_file, workers=workers)
+            logger.info(f'{run}: {time.perf_counter() - start:.2f} seconds, {stats.written} apps')
+            with open(output_file, 'r', encoding='utf-8') as file:
+                catalogs.append(file.read())
+        logger.info(f'Catalogs are identical: {all(catalog == catalogs[0] for catalog in catalogs)}')
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == '__main__':
+    benchmark_pipeline()
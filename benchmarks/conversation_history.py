@@ -0,0 +1,44 @@
+import time
+import logging
+from src.core import config
+from src.core import llm
+from src.core.conversation_history import ConversationHistory, estimate_tokens
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def benchmark_history(turns: int = 200) -> None:
+    """
+    Chat `turns` times with the mock backend, with a history that keeps everything and with a token-budgeted one,
+    and compare the tokens sent with the message at some turns.
+    """
+    backends = dict(config.llm_backends)
+    latencies = config.llm_mock_first_token_latency, config.llm_mock_token_latency
+    config.llm_backends.update({'chatting': 'Mock', 'summary': 'Mock'})
+    config.llm_mock_first_token_latency, config.llm_mock_token_latency = 0.0, 0.0
+    try:
+        question = 'Tell me something about the planet number {turn}, its moons and its weather, please. ' * 3
+        unbounded = []
+        model = llm.LLM()
+        history = model.histories['Mock'] = ConversationHistory('Answer as short as possible')
+        checkpoints = {10, 50, 100, turns}
+        for turn in range(1, turns + 1):
+            message = question.format(turn=turn)
+            unbounded.append(message)
+            sent = estimate_tokens('Answer as short as possible') + sum(estimate_tokens(text) for text in unbounded)
+            budgeted_sent = history.tokens() + estimate_tokens(message)
+            start = time.perf_counter()
+            answer = ''.join(model.chat_stream(message))
+            elapsed = time.perf_counter() - start
+            unbounded.append(answer)
+            history.wait()
+            if turn in checkpoints:
+                logger.info(f'Turn {turn}: keeping everything sends {sent} tokens, the budgeted history '
+                            f'{budgeted_sent} tokens (budget {history.budget}), turn took {elapsed * 1000:.2f} ms')
+    finally:
+        config.llm_backends.clear()
+        config.llm_backends.update(backends)
+        config.llm_mock_first_token_latency, config.llm_mock_token_latency = latencies
+
+if __name__ == '__main__':
+    benchmark_history()
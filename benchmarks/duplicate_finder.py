@@ -0,0 +1,46 @@
+import os
+import time
+import shutil
+import logging
+import tempfile
+from collections import defaultdict
+from src.core import config
+from src.features.duplicate_finder import DuplicateStats, find_duplicates, full_hash
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def benchmark_duplicates(files_count: int = 5_000, copies_every: int = 10, file_size: int = 1024 * 1024) -> None:
+    """
+    Compare the three round search to hashing every file completely, on a synthetic folder where
+    every file has the same size and every `copies_every`-th file is a copy of the previous one.
+    """
+    root = tempfile.mkdtemp(prefix='duplicate_finder_benchmark_')
+    try:
+        content = b''
+        for number in range(files_count):
+            if number % copies_every or not content:
+                # Same size, different first block
+                content = number.to_bytes(8, 'little') + os.urandom(32) * (file_size // 32 - 1) + bytes(24)
+            with open(os.path.join(root, f'file_{number}.bin'), 'wb') as file:
+                file.write(content)
+
+        start = time.perf_counter()
+        hashes = defaultdict(list)
+        for name in os.listdir(root):
+            hashes[full_hash(os.path.join(root, name), file_size)].append(name)
+        naive_groups = sorted(sorted(names) for names in hashes.values() if len(names) > 1)
+        logger.info(f'Full hash of every file, one thread: {time.perf_counter() - start:.2f} seconds')
+
+        for workers in (1, None):
+            stats = DuplicateStats()
+            start = time.perf_counter()
+            groups = find_duplicates(root, workers=workers, stats=stats)
+            logger.info(f'Three rounds, {workers or config.duplicate_hash_workers} threads: '
+                        f'{time.perf_counter() - start:.2f} seconds, {stats}, '
+                        f'same groups: {sorted(group.paths for group in groups) == naive_groups}')
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == '__main__':
+    benchmark_duplicates()
@@ -0,0 +1,43 @@
+import os
+import time
+import shutil
+import logging
+import tempfile
+from pathlib import Path
+from src.features.extract_exe import ExeResolutionCache, find_best_exe_match, resolve_exes
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def benchmark_resolution(apps_count: int = 5000, exe_per_app: int = 5) -> None:
+    """
+    Compare resolving a fake installation without the cache, with a cold cache and with a warm cache.
+    """
+    root = tempfile.mkdtemp(prefix='extract_exe_benchmark_')
+    try:
+        apps = {}
+        for app_number in range(apps_count):
+            app_dir = os.path.join(root, f'App {app_number}')
+            os.makedirs(app_dir)
+            for exe_number in range(exe_per_app):
+                exe_name = f'app {app_number}.exe' if exe_number == 0 else f'helper_{exe_number}.exe'
+                open(os.path.join(app_dir, exe_name), 'w').close()
+            apps[f'App {app_number}'] = app_dir
+        logger.info(f'Fake installation: {apps_count} apps, {exe_per_app} .exe files each')
+
+        start = time.perf_counter()
+        for name, path in apps.items():
+            exe_files = list(Path(path).glob('*.exe'))
+            find_best_exe_match(name, exe_files)
+        logger.info(f'Sequential, no cache: {time.perf_counter() - start:.2f} seconds')
+
+        cache = ExeResolutionCache(os.path.join(root, 'cache.json'))
+        for run in ('cold cache', 'warm cache'):
+            start = time.perf_counter()
+            resolved = sum(1 for _, exe_path in resolve_exes(apps.items(), cache=cache) if exe_path)
+            logger.info(f'Thread pool, {run}: {time.perf_counter() - start:.2f} seconds, {resolved} resolved')
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == '__main__':
+    benchmark_resolution()
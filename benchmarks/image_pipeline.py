@@ -0,0 +1,55 @@
+import os
+import time
+import shutil
+import logging
+import tempfile
+import numpy as np
+from PIL import Image
+from src.features.image_pipeline import ImageOperation, _grayscale, run_pipeline
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def benchmark_pipeline(width: int = 6000, height: int = 4000) -> None:
+    """
+    Compare the fused chain "crop, resize, rotate 90, gray" on a JPEG with running the steps one by one,
+    saving and reopening the image in between.
+    """
+    root = tempfile.mkdtemp(prefix='image_pipeline_benchmark_')
+    try:
+        source = os.path.join(root, 'photo.jpg')
+        gradient = np.linspace(0, 255, width * height * 3, dtype=np.float32).reshape(height, width, 3).astype(np.uint8)
+        Image.fromarray(gradient).save(source, quality=90)
+        operations = [
+            ImageOperation('crop', (500, 500, 5500, 3500)),
+            ImageOperation('resize', (1000, 600)),
+            ImageOperation('rotate', (90,)),
+            ImageOperation('grayscale')
+        ]
+
+        start = time.perf_counter()
+        run_pipeline(source, operations)
+        fused = time.perf_counter() - start
+
+        start = time.perf_counter()
+        path = source
+        for number, step in enumerate(operations):
+            with Image.open(path) as img:
+                if step.name == 'crop':
+                    img = img.crop(step.args)
+                elif step.name == 'resize':
+                    img = img.resize(step.args, Image.Resampling.LANCZOS)
+                elif step.name == 'rotate':
+                    img = img.rotate(step.args[0], expand=True)
+                else:
+                    img = _grayscale(img)
+                path = os.path.join(root, f'step_{number}.jpg')
+                img.save(path, quality=90)
+        separate = time.perf_counter() - start
+
+        logger.info(f'{width}x{height} JPEG, crop + resize + rotate + gray: fused {fused:.2f} seconds, step by step {separate:.2f} seconds')
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+if __name__ == '__main__':
+    benchmark_pipeline()
@@ -0,0 +1,34 @@
+import time
+import logging
+from src.core import config
+from src.core import llm
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def benchmark_streaming(turns: int = 20) -> None:
+    """
+    Run chat turns and formatter requests through `LLM` with the mock backend and report
+    the time to the first token and to the whole answer, i.e. the overhead of the streaming path itself.
+    """
+    backends = dict(config.llm_backends)
+    config.llm_backends.update({'formatter': 'Mock', 'chatting': 'Mock'})
+    try:
+        model = llm.LLM()
+        for request, stream_method in (('chatting', model.chat_stream), ('formatter', model.message_formater_stream)):
+            first_tokens, totals = [], []
+            for turn in range(turns):
+                start = time.perf_counter()
+                for number, _ in enumerate(stream_method(f'Message number {turn}, tell me something nice')):
+                    if number == 0:
+                        first_tokens.append(time.perf_counter() - start)
+                totals.append(time.perf_counter() - start)
+            logger.info(f'{request}: first token after {sum(first_tokens) / turns * 1000:.2f} ms, '
+                        f'whole answer after {sum(totals) / turns * 1000:.2f} ms '
+                        f'(mock latency {config.llm_mock_first_token_latency * 1000:.0f} ms + {config.llm_mock_token_latency * 1000:.0f} ms per token)')
+    finally:
+        config.llm_backends.clear()
+        config.llm_backends.update(backends)
+
+if __name__ == '__main__':
+    benchmark_streaming()
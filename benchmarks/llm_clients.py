@@ -0,0 +1,65 @@
+import time
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from src.core.llm_clients import ClientRegistry
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def benchmark_warm_up(requests_count: int = 5) -> None:
+    """
+    Time requests to a local mock HTTP server (a stand-in for a provider), first without and then with
+    warm-up, and count the connections the server accepted. Without TLS the saved handshake is only the TCP one,
+    against a real provider the difference is bigger.
+    """
+    connections = []
+
+    class MockProvider(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        disable_nagle_algorithm = True
+
+        def setup(self):
+            connections.append(self.client_address)
+            super().setup()
+
+        def do_HEAD(self):
+            self.send_response(200)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            body = b'{"ok": true}'
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockProvider)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.server_address[1]}'
+    try:
+        for run, warm in (('cold', False), ('warmed up', True)):
+            connections.clear()
+            registry = ClientRegistry({'DeepSeek': 'mock key'}, {'DeepSeek': base_url})
+            if warm:
+                registry.warm_up(['DeepSeek'], keep_warm_interval=0)
+                registry._keep_warm_thread.join()
+            timings = []
+            for _ in range(requests_count):
+                start = time.perf_counter()
+                registry.http_client('DeepSeek').post(f'{base_url}/chat/completions', json={'messages': []})
+                timings.append((time.perf_counter() - start) * 1000)
+            registry.close()
+            logger.info(f'{run}: first request {timings[0]:.2f} ms, next ones {sum(timings[1:]) / (len(timings) - 1):.2f} ms, '
+                        f'{len(connections)} connections')
+    finally:
+        server.shutdown()
+
+if __name__ == '__main__':
+    benchmark_warm_up()
@@ -0,0 +1,73 @@
+import time
+import logging
+import threading
+from src.core import llm_backends
+from src.core.llm_scheduler import LLMRequest, LLMScheduler
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def benchmark_scheduler(pages: int = 8, messages_per_page: int = 3, message_interval: float = 0.05) -> None:
+    """
+    Chat on `pages` pages at once with the mock backend, every page sending `messages_per_page` messages
+    `message_interval` seconds apart (earlier messages get longer answers), once with a thread per message (as before the scheduler) and once with
+    the scheduler (limit 2, a new message cancels the answer to the previous one). Compare the streams running at once,
+    the tokens streamed, answers of a page finishing out of order and the time until the last answer of every page.
+    """
+    for run in ('thread per message', 'scheduler'):
+        lock = threading.Lock()
+        state = {'running': 0, 'peak': 0, 'tokens': 0}
+        finished = {page: [] for page in range(pages)}
+
+        def answer(page: int, number: int, request: LLMRequest = None) -> None:
+            with lock:
+                state['running'] += 1
+                state['peak'] = max(state['peak'], state['running'])
+            try:
+                # Earlier messages get longer answers, so without an order they'd finish last
+                backend = llm_backends.MockBackend(reply='word ' * 20 * (messages_per_page - number),
+                                                   first_token_latency=0.1, token_latency=0.01)
+                stream = backend.stream([{'role': 'user', 'content': f'message {number}'}])
+                for _ in stream:
+                    if request is not None and request.cancelled:
+                        stream.close()
+                        return
+                    with lock:
+                        state['tokens'] += 1
+                with lock:
+                    finished[page].append((number, time.perf_counter()))
+            finally:
+                with lock:
+                    state['running'] -= 1
+
+        manager = LLMScheduler({'Mock': 2}, workers=8) if run == 'scheduler' else None
+        threads = []
+        start = time.perf_counter()
+        for number in range(messages_per_page):
+            for page in range(pages):
+                if manager is None:
+                    thread = threading.Thread(target=answer, args=(page, number))
+                    thread.start()
+                    threads.append(thread)
+                else:
+                    manager.cancel(str(page))
+                    manager.submit(str(page), 'Mock', lambda request, page=page, number=number: answer(page, number, request))
+            time.sleep(message_interval)
+        if manager is None:
+            for thread in threads:
+                thread.join()
+        else:
+            while manager.metrics()['queued'] or manager.metrics()['running_by_provider']:
+                time.sleep(0.01)
+            metrics = manager.metrics()
+            manager.shutdown(wait=True)
+        out_of_order = sum(1 for answers in finished.values()
+                           for earlier, later in zip(answers, answers[1:]) if later[0] < earlier[0])
+        last_answers = max(answers[-1][1] for answers in finished.values()) - start
+        logger.info(f'{run}: up to {state["peak"]} streams at once, {state["tokens"]} tokens streamed, '
+                    f'{out_of_order} answers out of order, last answers after {last_answers:.2f} seconds'
+                    + (f', max queue depth {metrics["max_queue_depth"]}, {metrics["cancelled"]} cancelled, '
+                       f'average wait {metrics["average_wait"] * 1000:.0f} ms' if manager else ''))
+
+if __name__ == '__main__':
+    benchmark_scheduler()
@@ -0,0 +1,52 @@
+import os
+import time
+import shutil
+import logging
+import tempfile
+import tracemalloc
+from src.core import config
+from src.core.llm_sessions import SessionManager
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def benchmark_sessions(pages: int = 40, turns: int = 30) -> None:
+    """
+    Chat on `pages` pages in turn with the mock backend, once keeping every session in memory and once with
+    `config.llm_sessions_in_memory`, and compare the memory used by the sessions and the time of a turn.
+    """
+    backends = dict(config.llm_backends)
+    latencies = config.llm_mock_first_token_latency, config.llm_mock_token_latency
+    config.llm_backends.update({'chatting': 'Mock', 'summary': 'Mock'})
+    config.llm_mock_first_token_latency, config.llm_mock_token_latency = 0.0, 0.0
+    directory = tempfile.mkdtemp(prefix='llm_sessions_benchmark_')
+    try:
+        page_ids = [f'page{number}' for number in range(pages)]
+        question = 'Tell me more about the topic number {turn} of this chat, with some details please. ' * 4
+        for run, max_in_memory in (('all in memory', pages), (f'{config.llm_sessions_in_memory} in memory', None)):
+            manager = SessionManager(os.path.join(directory, str(max_in_memory)), max_in_memory)
+            tracemalloc.start()
+            start = time.perf_counter()
+            for turn in range(turns):
+                for page_id in page_ids:
+                    session = manager.get(page_id)
+                    ''.join(session.chat_stream(question.format(turn=turn)))
+                    # The user reads the answer meanwhile, summaries are ready before the next message
+                    for history in session.histories.values():
+                        history.wait()
+            elapsed = time.perf_counter() - start
+            memory, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            # Every chat must still have its whole (budgeted) conversation
+            restored = manager.get(page_ids[0]).histories['Mock'].messages()
+            logger.info(f'{run}: {manager.in_memory()} sessions in memory, {memory / 1024:.0f} KB traced, '
+                        f'{elapsed / (turns * pages) * 1000:.2f} ms per turn, {manager.evictions} evictions, '
+                        f'{manager.restorations} restorations, first chat has {len(restored)} messages')
+    finally:
+        config.llm_backends.clear()
+        config.llm_backends.update(backends)
+        config.llm_mock_first_token_latency, config.llm_mock_token_latency = latencies
+        shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == '__main__':
+    benchmark_sessions()
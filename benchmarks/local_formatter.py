@@ -0,0 +1,26 @@
+import time
+import logging
+from src.core.local_formatter import format_message
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def benchmark_local_formatter(repeats: int = 10000) -> None:
+    """
+    Time `format_message` for outputs of every template and for an output without one.
+    """
+    messages = ['20:34:11', '17 October 2026', 'Website was opened successfully', 'Volume has been muted successfully',
+                'Current brightness: 40%', 'Result: 42', "Here is your request about 'weather'",
+                'Music was playing successfully', 'Folder C:\\Downloads was not reorganized - access denied']
+    for language_code in ('en', 'ru'):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            for message in messages:
+                format_message(message, language_code)
+        elapsed = (time.perf_counter() - start) / (repeats * len(messages))
+        logger.info(f'{language_code}: {elapsed * 1e6:.2f} microseconds per message')
+    for message in messages:
+        logger.info(f'{message!r} -> {format_message(message, "en")!r}')
+
+if __name__ == '__main__':
+    benchmark_local_formatter()
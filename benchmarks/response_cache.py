@@ -0,0 +1,49 @@
+import os
+import time
+import shutil
+import logging
+import tempfile
+from src.core import config
+from src.core import llm
+from src.core.response_cache import ResponseCache
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def benchmark_cache(messages_count: int = 50) -> None:
+    """
+    Format instant task outputs with the mock backend (`config.llm_mock_first_token_latency` as the round trip),
+    once without and once with the cache, and compare the times to the first token.
+    """
+    outputs = ['{h}:{m:02d}', 'Volume is set to {v}', 'Website was opened successfully',
+               'Brightness is set to {v}%', 'Today is {d} October 2026']
+    messages = [outputs[number % len(outputs)].format(h=number % 24, m=number % 60, v=number % 100, d=number % 28 + 1)
+                for number in range(messages_count)]
+
+    backends = dict(config.llm_backends)
+    # The mock answers with the message itself, so its values are kept and every answer can be cached
+    config.llm_backends['formatter'] = 'Mock'
+    directory = tempfile.mkdtemp(prefix='response_cache_benchmark_')
+    try:
+        for run, cache in (('without cache', None), ('with cache', ResponseCache(os.path.join(directory, 'cache.json')))):
+            model = llm.LLM()
+            model.formatter_cache = cache
+            start = time.perf_counter()
+            first_tokens = 0.0
+            for message in messages:
+                token_start = time.perf_counter()
+                stream = model.message_formater_stream(message)
+                next(stream)
+                first_tokens += time.perf_counter() - token_start
+                for _ in stream:
+                    pass
+            logger.info(f'{run}: {time.perf_counter() - start:.2f} seconds, first token after '
+                        f'{first_tokens / messages_count * 1000:.2f} ms on average'
+                        + (f', {cache.hits} hits, {cache.misses} misses' if cache else ''))
+    finally:
+        config.llm_backends.clear()
+        config.llm_backends.update(backends)
+        shutil.rmtree(directory, ignore_errors=True)
+
+if __name__ == '__main__':
+    benchmark_cache()
@@ -0,0 +1,58 @@
+import os
+import time
+import random
+import string
+import logging
+from typing import List, Tuple
+from src.features.scaning import find_best_match, find_best_match_batched
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+def _synthetic_tree(files_count: int, files_per_directory: int, target_name: str) -> List[Tuple[str, List[str]]]:
+    """
+    Build (directory, file names) listings of a synthetic tree, the target is placed near the end.
+    """
+    rng = random.Random(0)
+    extensions = ('.dll', '.txt', '.png', '.json', '.exe', '.log')
+    listings = []
+    for directory_number in range(files_count // files_per_directory):
+        files = [
+            ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(5, 14))) + rng.choice(extensions)
+            for _ in range(files_per_directory)
+        ]
+        listings.append((os.path.join('root', f'folder_{directory_number // 100}', f'sub_{directory_number}'), files))
+    listings[-10][1][0] = target_name
+    return listings
+
+def benchmark_matching(files_count: int = 1_000_000, files_per_directory: int = 5, target_name: str = 'telegram.exe') -> None:
+    """
+    Compare per-directory `find_best_match` calls with `find_best_match_batched` on a synthetic tree.
+    """
+    listings = _synthetic_tree(files_count, files_per_directory, target_name)
+    logger.info(f'Synthetic tree: {len(listings)} directories, {files_count} files')
+
+    start = time.perf_counter()
+    per_directory_result = None
+    for directory, files in listings:
+        found_program = find_best_match(files, target_name)
+        if found_program:
+            per_directory_result = (directory, found_program)
+            break
+    per_directory_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batched_result = find_best_match_batched(listings, target_name)
+    batched_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    parallel_result = find_best_match_batched(listings, target_name, workers=-1)
+    parallel_time = time.perf_counter() - start
+
+    logger.info(f'Per directory:          {per_directory_time:.2f} seconds, result - {per_directory_result}')
+    logger.info(f'Batched:                {batched_time:.2f} seconds ({per_directory_time / batched_time:.1f}x)')
+    logger.info(f'Batched, all cores:     {parallel_time:.2f} seconds ({per_directory_time / parallel_time:.1f}x)')
+    logger.info(f'Same result - {per_directory_result == batched_result == parallel_result}')
+
+if __name__ == '__main__':
+    benchmark_matching()
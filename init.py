@@ -7,9 +7,9 @@ from src.core import message_processor
 from src.ui import Threads
 from src.ui import main
 from src.core import config
+from src.core import llm_scheduler
 from src.features import functions
 from src.data import load_user_data
-from src.core import llm
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,7 +18,7 @@ logger = logging.getLogger(__name__)
 EVA_main.py
 
 Main entry point for the EVA application. This script initializes the main window, sets up the message processor, 
-LLM, and handles user input (both text and voice) using PyQt5.
+and handles user input (both text and voice) using PyQt5.
 """
 
 class MainApp(main.MainWindow):
@@ -28,9 +28,8 @@ class MainApp(main.MainWindow):
     
     Attributes:
         processor (MessageProcessor): Handles processing of user commands
-        llm (LLM): Language model instance for generating responses
         voice_input_thread (VoiceRequiestHandler): Thread for handling voice input
-        current_llm_thread (LLMStreamingThread): Current active LLM streaming thread
+        llm_scheduler (LLMScheduler): Runs the LLM answers of all chat pages
     """
     
     def __init__(self):
@@ -44,7 +43,6 @@ class MainApp(main.MainWindow):
         
         # Initialize core components
         self.processor = message_processor.MessageProcessor(config, functions)
-        self.llm = llm.LLM()
         
         # Set up message handling
         self.message_signal.connect(self._handle_command)
@@ -53,8 +51,8 @@ class MainApp(main.MainWindow):
         functions.create_objects_json()
         load_user_data.load_user_settings()
         
-        # Initialize LLM streaming
-        self.current_llm_thread = None
+        # LLM answers of all chat pages are run by the scheduler, with per-provider limits and in order per page
+        self.llm_scheduler = llm_scheduler.scheduler
         
     def _process_message(self, user_command: str, page_id) -> Union[None, str]:
         """
@@ -92,15 +90,19 @@ class MainApp(main.MainWindow):
             print(page_id)
             print(self.existed_pages)
             print(config.current_page)
-            self.current_llm_thread = Threads.LLMStreamingThread(
-                chat_page=config.current_page,
+            # The answer goes to the chat the message was sent from, with the LLM session of that chat
+            llm_task = Threads.LLMStreamingTask(
+                chat_page=self.existed_pages[page_id],
                 processed_result=processed_result,
                 user_message_type=user_message_type
             )
         except Exception as e:
-            self.logger.error(f'Error in `_create_response`, while trying to initialize LLMStreamingThread, error - {e}')
+            self.logger.error(f'Error in `_create_response`, while trying to initialize LLMStreamingTask, error - {e}')
             return
-        self.current_llm_thread.start()
+        # A new message makes the unfinished chat answers of its page obsolete
+        self.llm_scheduler.cancel(page_id)
+        llm_task.submit(self.llm_scheduler)
+        self.logger.info(f'LLM scheduler - {self.llm_scheduler.metrics()}')
 
     def _handle_command(self, command_info: tuple) -> Union[None, str]:
         """
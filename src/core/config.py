@@ -1,5 +1,6 @@
 from PyQt5.QtCore import QMutex
 import os
+import queue
 import threading
 
 application_version: str = "1.1.0"
@@ -44,18 +45,75 @@ available_languages: dict = {
     18: 'fi'    # Finnish
 }
 
-# Create an Event to signal all threads to stop
+# Create an Event to signal all threads to stop (set when the application is closing).
+# Every program scan additionally has its own cancellation token, see `scaning.ScanJob`
 stop_scaning = threading.Event()
+# Seconds after which a program scan is cancelled
+scan_timeout: int = 120
 
 call_words: list = ['eva', 'say']
 
 #Flags:
 voice_output_flag: bool = False # By default
-grayscaling_flag: bool = False
+# Progress of grayscaling, one `image_processing.GrayscalingProgress` per converted image (read by `GrayscalingThreadMonitor`)
+grayscaling_progress: queue.Queue = queue.Queue()
 # To check, does user want to voicing a message from Joy
 voicing_message_flag: bool = False  
 alarm_flag: bool = False
 
+# Connections to LLM providers (see `llm_clients.py`)
+# Maximal number of open connections per provider
+llm_max_connections: int = 4
+# Seconds an idle connection is kept open for the next request
+llm_keepalive_expiry: float = 120.0
+# Seconds to wait for a response of a provider
+llm_request_timeout: float = 60.0
+# Providers connected in the background at startup, so the first message skips the handshake
+llm_warm_up_providers: tuple = ('DeepSeek', 'Claude')
+# Seconds between requests keeping the warmed up connections open, 0 connects only once at startup.
+# Periodic requests are opt-in, they reach the providers for as long as the app runs, even if the user never chats
+llm_keep_warm_interval: float = 0
+# Base URL overrides by provider, e.g. {'DeepSeek': 'http://127.0.0.1:8080'} for a local mock server
+llm_base_urls: dict = {}
+# Streaming backend answering every kind of request (see `llm_backends.BACKENDS`), 'Mock' answers offline
+llm_backends: dict = {'formatter': 'DeepSeek', 'chatting': 'Claude', 'summary': 'DeepSeek'}
+# Who phrases instant task outputs: 'hybrid' (local templates of `local_formatter.py` if there is one, else the LLM),
+# 'local' (only templates, other outputs are shown as they are) or 'llm'
+formatter_mode: str = 'hybrid'
+# Cache of formatted messages (see `response_cache.py`), instant task outputs are mostly answered from it
+formatter_cache_enabled: bool = True
+FORMATTER_CACHE_FILE: str = 'formatter_cache.json'
+# Maximal number of cached answers
+formatter_cache_size: int = 500
+# Longer messages (e.g. file listings) are not cached
+formatter_cache_max_message: int = 200
+# Seconds between the words of a replayed answer
+formatter_cache_token_delay: float = 0.01
+# Seconds new answers are kept in memory before the cache file is written (and on closing the app),
+# so formatting a message never waits for the whole file to be rewritten
+formatter_cache_save_delay: float = 5.0
+# Token budget of the conversation history sent with every message, by backend (see `conversation_history.py`),
+# older turns are summarized in the background
+llm_history_budgets: dict = {'Claude': 4000, 'ChatGPT': 4000, 'DeepSeek': 4000, 'COHERE': 2000}
+llm_history_default_budget: int = 4000
+# Number of the last turns (a question and its answer) always sent verbatim
+llm_history_recent_turns: int = 4
+# Token budget of the summary of older turns
+llm_summary_budget: int = 500
+# Chat sessions (the LLM histories of a chat page, see `llm_sessions.py`) kept in memory,
+# the least recently used idle ones are stored in `LLM_SESSIONS_DIR` and restored when their chat is opened
+llm_sessions_in_memory: int = 4
+LLM_SESSIONS_DIR: str = 'llm_sessions'
+# LLM request scheduler (see `llm_scheduler.py`): answers streamed at once by provider, other providers get the default.
+# Keep them within `llm_max_connections`, so every running answer has a pooled connection
+llm_provider_concurrency: dict = {'Claude': 2, 'ChatGPT': 2, 'DeepSeek': 3, 'COHERE': 1}
+llm_default_concurrency: int = 2
+# Worker threads running the requests of all chat pages (answers and long-term tasks)
+llm_scheduler_workers: int = 8
+# Seconds the mock backend waits before its first token and between its tokens
+llm_mock_first_token_latency: float = 0.3
+llm_mock_token_latency: float = 0.02
+
 # Variable to check if llm was activated or not
 # True, means llm was activated, False otherwise
 llm_status: bool = False
@@ -102,6 +160,40 @@ In this way user can call features with more commands capabilities
 user_file_name: str = ''
 
 new_image_path: str = ''
+# Working memory (bytes) for one strip of an image being converted, big images are processed strip by strip
+image_tile_budget: int = 32 * 1024 * 1024
+# Number of processes converting images of a batch (every one holds a decoded image in memory)
+image_process_workers: int = min(4, os.cpu_count() or 1)
+
+# Journal of a reorganized folder (one JSON record per line), kept inside that folder
+RELOCATION_JOURNAL_FILE: str = 'relocation_log.jsonl'
+# Log of a reorganization made before the journal existed ({file name: new path}), turned into a run of the journal on first use
+LEGACY_RELOCATION_LOG_FILE: str = 'relocation_log.json'
+# Number of threads moving files while reorganizing (moves mostly wait for the disk)
+reorganize_workers: int = min(16, (os.cpu_count() or 4) * 2)
+# Folders of the "type" reorganization rule, files with other extensions go to 'other'
+extension_families: dict = {
+    'images': ('jpg', 'jpeg', 'png', 'gif', 'bmp', 'tif', 'tiff', 'webp', 'svg', 'ico', 'heic', 'raw'),
+    'documents': ('pdf', 'doc', 'docx', 'odt', 'rtf', 'txt', 'md', 'xls', 'xlsx', 'ods', 'csv', 'ppt', 'pptx', 'odp', 'epub'),
+    'audio': ('mp3', 'wav', 'flac', 'aac', 'ogg', 'm4a', 'wma', 'opus'),
+    'video': ('mp4', 'mkv', 'avi', 'mov', 'wmv', 'flv', 'webm', 'm4v'),
+    'archives': ('zip', 'rar', '7z', 'tar', 'gz', 'bz2', 'xz', 'iso'),
+    'programs': ('exe', 'msi', 'bat', 'cmd', 'ps1', 'lnk', 'dll'),
+    'code': ('py', 'js', 'ts', 'html', 'css', 'json', 'xml', 'yaml', 'yml', 'c', 'cpp', 'h', 'cs', 'java', 'go', 'rs', 'sql')
+}
+# Folders of the "size" reorganization rule: files smaller than the limit (bytes) go to the folder, bigger ones to 'huge'
+reorganize_size_tiers: tuple = ((1024 * 1024, 'small'), (100 * 1024 * 1024, 'medium'), (1024 * 1024 * 1024, 'large'))
+
+# Bytes read from the start and from the end of a file for the quick hash of the duplicate finder
+duplicate_block_size: int = 64 * 1024
+# Number of threads hashing files for the duplicate finder (hashing releases the GIL)
+duplicate_hash_workers: int = min(8, os.cpu_count() or 4)
+
+# Words of image operations (see `image_pipeline.parse_operations`), run on the last uploaded pic
+# (matched as whole words)
+image_operation_words: tuple = ('resize', 'scale', 'crop', 'rotate', 'thumbnail', 'black and white', 'grey', 'greyscale', 'convert')
+# Extensions of uploaded files the image operations are offered for
+image_extensions: tuple = ('.png', '.jpg', '.jpeg', '.bmp', '.gif', '.tif', '.tiff', '.webp')
 
 # Contains the path to an image
 user_chat_files: dict = {}
@@ -119,6 +211,48 @@ paths_for_searching: set = (f'{home_dir}\\AppData\\Roaming\\Microsoft\\Windows\\
                             r'C:\Program Files'
                             )
 
+# Catalog of installed applications, written by the app scanners and read by `app_catalog.py`
+APPS_CATALOG_FILE: str = 'all_apps_deduped.json'
+# Number of fuzzy lookup results `app_catalog.py` remembers (least recently used ones are dropped)
+app_catalog_lookups_size: int = 256
+# Score (0 - 1.7, see `app_catalog.score_app_name`) a trigram candidate needs to be taken without scoring every app
+app_catalog_confident_score: float = 1.0
+
+# Cache of the .exe chosen for every install directory, reused while the directory's mtime is unchanged
+EXE_RESOLUTION_CACHE_FILE: str = 'exe_resolution_cache.json'
+# Number of threads listing install directories while resolving .exe files
+exe_resolution_workers: int = min(8, os.cpu_count() or 4)
+# Install directories being resolved at once per worker, the rest of a source isn't read ahead
+exe_resolution_window: int = 4
+# Entries of a less trusted app source kept in memory while it waits for the sources before it,
+# further ones are spilled to a temporary file next to the catalog
+apps_catalog_pending_limit: int = 10000
+
+# Maximal number of worker threads used by the program scanner
+scan_pool_size: int = min(8, os.cpu_count() or 4)
+
+# Number of file names scored by one fuzzy matching call of the program scanner
+scan_match_batch_size: int = 20000
+
+# Pruning rules of the program scanner, applied at every depth (see `prune_rules.PruneEngine`).
+# Glob patterns are matched against folder names, case insensitive. Only trees that never hold programs
+# a user would open are pruned by default, anything broader ('*cache*', 'site-packages') hides real programs
+scan_prune_globs: tuple = ('.git', '.svn', '.hg', 'node_modules', '__pycache__', 'WinSxS')
+# Everything under these paths is skipped
+scan_prune_prefixes: tuple = (r'C:\Windows', f'{home_dir}\\AppData\\Local\\Temp')
+# Subfolders deeper than this below a search root are skipped
+scan_max_depth: int = 12
+# Subfolders of directories with more entries (files and folders, a count not a size) than this are skipped,
+# their own files are still checked
+scan_max_directory_entries: int = 20000
+
+# Filename index of the search paths, stored next to the user JSON files
+FILE_INDEX_FILE: str = 'file_index.json.gz'
+# Seconds after which the filename index is considered stale (one week)
+file_index_max_age: int = 7 * 24 * 60 * 60
+# Seconds after which the filename index is refreshed in the background (only changed directories are re-read)
+file_index_refresh_interval: int = 60 * 60
+
 useless_content: set = {'$GetCurrent','$SysReset','$WINDOWS.~BT','$Windows.~WS',
                         '$WinREAgent','adobeTemp','BIOS','DRIVER','Drivers','ESD',
                         'Intel','MSOCache','nltk_data','OneDriveTemp','PerfLogs',
@@ -178,7 +312,7 @@ task_descriptions: dict = {
     
     # Long-term Tasks
     'scan_for_program': 'Searches through the system for specific programs or files',
-    'reorganize_by_extension': 'Reorganizes files in a directory by their file extensions',
+    'reorganize_by_extension': 'Reorganizes files in a directory (optionally with subfolders) by extension, type, modification date or size',
     'create_reminder': 'Creates a new reminder with specified parameters',
     'set_alarm': 'Sets up an alarm for a specific time',
     'file_reading_thread': 'Reads file contents in a separate thread',
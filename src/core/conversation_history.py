@@ -0,0 +1,220 @@
+import time
+import logging
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, List, Optional
+from src.core import config
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+"""
+conversation_history.py
+
+Conversation history of a chat with an LLM, kept within a token budget (`config.llm_history_budgets`).
+
+The last `config.llm_history_recent_turns` turns (a question and its answer) are always sent verbatim.
+When the history grows over its budget, the oldest turns are folded into a summary by the LLM of
+`config.llm_backends['summary']`, in a background thread, so no message waits for it. Until the summary
+is ready those turns are still sent as they are; if the history reaches twice its budget meanwhile,
+the oldest turns are dropped. The summary is sent as a part of the system prompt.
+
+Tokens are estimated from the length of the text (about 4 characters per token), no tokenizer is needed
+to keep the size bounded.
+"""
+
+# Summaries of all histories are written one after another, in the background
+_summarizer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='History Summarizer')
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough number of tokens of a text.
+    """
+    return len(text) // 4 + 1
+
+def summarize_with_llm(summary: str, messages: List[dict]) -> str:
+    """
+    Fold `messages` into the running `summary` with the summary backend.
+    """
+    from src.core import llm_backends
+
+    transcript = '\n'.join(f'{message["role"]}: {message["content"]}' for message in messages)
+    prompt = [
+        {'role': 'system', 'content': 'You keep a short summary of a conversation between a user and an assistant. '
+                                      'Update the summary with the new messages. Keep names, numbers, decisions and '
+                                      f'open questions, answer only with the summary, at most {config.llm_summary_budget * 3} characters.'},
+        {'role': 'user', 'content': f'Summary so far:\n{summary or "(empty)"}\n\nNew messages:\n{transcript}'}
+    ]
+    return ''.join(llm_backends.backend_for('summary').stream(prompt)).strip()
+
+class ConversationHistory:
+    """
+    Messages of a conversation in the OpenAI chat format, bounded by a token budget. Safe to use from several threads.
+
+    Args:
+        system_prompt (str): System message sent first, none if empty
+        budget (int): Token budget of the sent messages, `config.llm_history_default_budget` if None
+        summarize (Callable[[str, List[dict]], str]): Folds messages into a summary, `summarize_with_llm` if None
+    """
+
+    def __init__(self, system_prompt: str = '', budget: int = None, summarize: Callable[[str, List[dict]], str] = None):
+        self.system_prompt = system_prompt
+        self.budget = budget or config.llm_history_default_budget
+        self.summarize = summarize or summarize_with_llm
+        self.summary = ''
+        # Messages after the summary and their estimated tokens
+        self._messages: List[dict] = []
+        self._tokens: List[int] = []
+        self._pending: Optional[Future] = None
+        # Bumped by `clear()`, a summary started before it is thrown away
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def messages(self) -> List[dict]:
+        """
+        Messages to send: the system prompt (with the summary) and the turns after the summary.
+        """
+        with self._lock:
+            system = self.system_prompt
+            if self.summary:
+                system = f'{system}\n\nSummary of the earlier conversation:\n{self.summary}'.strip()
+            prefix = [{'role': 'system', 'content': system}] if system else []
+            return prefix + self._messages
+
+    def tokens(self) -> int:
+        """
+        Estimated tokens of `messages()`.
+        """
+        with self._lock:
+            return estimate_tokens(self.system_prompt) + estimate_tokens(self.summary) + sum(self._tokens)
+
+    def append(self, role: str, content: str) -> None:
+        """
+        Add a message, and start summarizing the oldest turns if the history is over its budget.
+        """
+        with self._lock:
+            self._messages.append({'role': role, 'content': content})
+            self._tokens.append(estimate_tokens(content))
+            if role == 'assistant':
+                self._fold_old_turns()
+
+    def pop(self) -> Optional[dict]:
+        """
+        Remove the last message (e.g. a question that wasn't answered), None if the history is empty.
+        """
+        with self._lock:
+            if not self._messages:
+                return None
+            self._tokens.pop()
+            return self._messages.pop()
+
+    def clear(self) -> None:
+        """
+        Forget all messages and the summary, a summary still being written is discarded when it's ready.
+        """
+        with self._lock:
+            self._messages.clear()
+            self._tokens.clear()
+            self.summary = ''
+            self._generation += 1
+            self._pending = None
+
+    @property
+    def summarizing(self) -> bool:
+        """
+        True while old turns are being summarized in the background.
+        """
+        return self._pending is not None
+
+    def to_dict(self) -> dict:
+        """
+        State of the history, to be stored as JSON (a running summary is not waited for).
+        """
+        with self._lock:
+            return {'system_prompt': self.system_prompt, 'summary': self.summary, 'messages': list(self._messages)}
+
+    @classmethod
+    def from_dict(cls, state: dict, budget: int = None) -> 'ConversationHistory':
+        """
+        History restored from `to_dict()`.
+        """
+        history = cls(state.get('system_prompt', ''), budget=budget)
+        history.summary = state.get('summary', '')
+        for message in state.get('messages', []):
+            history._messages.append({'role': message['role'], 'content': message['content']})
+            history._tokens.append(estimate_tokens(message['content']))
+        return history
+
+    def _old_turns_count(self, target: int) -> int:
+        """
+        Number of the oldest messages to take out so that the rest fits `target` tokens.
+        Only whole turns are taken and the recent turns are kept.
+        """
+        # Called with the lock held
+        keep = 2 * config.llm_history_recent_turns
+        total = estimate_tokens(self.system_prompt) + estimate_tokens(self.summary) + sum(self._tokens)
+        count = 0
+        while total > target and count + 2 <= len(self._messages) - keep:
+            total -= self._tokens[count] + self._tokens[count + 1]
+            count += 2
+        return count
+
+    def _fold_old_turns(self) -> None:
+        # Called with the lock held, after an answer
+        total = estimate_tokens(self.system_prompt) + estimate_tokens(self.summary) + sum(self._tokens)
+        if total <= self.budget:
+            return
+
+        if self._pending is not None:
+            if total > 2 * self.budget:
+                # The summary is late, drop the oldest turns to keep the cost of a message bounded
+                count = self._old_turns_count(self.budget)
+                logger.warning(f'History is over twice its budget, {count} old messages are dropped without a summary')
+                del self._messages[:count], self._tokens[:count]
+            return
+
+        # Fold enough turns to get back to half of the budget, so summaries aren't written after every turn
+        count = self._old_turns_count(self.budget // 2)
+        if not count:
+            return
+        old_messages = self._messages[:count]
+        summary = self.summary
+        self._pending = _summarizer.submit(self._summarize, summary, old_messages, self._generation)
+
+    def _summarize(self, summary: str, old_messages: List[dict], generation: int) -> None:
+        start = time.time()
+        try:
+            new_summary = self.summarize(summary, old_messages)
+        except Exception as e:
+            logger.error(f'Error in `ConversationHistory._summarize`, old messages are dropped without a summary - {e}')
+            new_summary = summary
+        # A summary longer than its budget would grow the history again
+        new_summary = new_summary[:config.llm_summary_budget * 4]
+        with self._lock:
+            if generation != self._generation:
+                logger.info('History was cleared while it was summarized, the summary is discarded')
+                return
+            self._pending = None
+            # Only the summarized messages are removed, they are the oldest ones (some may have been dropped meanwhile)
+            summarized = {id(message) for message in old_messages}
+            count = 0
+            while count < len(self._messages) and id(self._messages[count]) in summarized:
+                count += 1
+            del self._messages[:count], self._tokens[:count]
+            self.summary = new_summary
+        logger.info(f'{len(old_messages)} old messages were summarized in {time.time() - start:.2f} seconds')
+
+    def wait(self, timeout: float = None) -> None:
+        """
+        Wait for a running summary (used by benchmarks and before saving a history).
+        """
+        pending = self._pending
+        if pending is not None:
+            try:
+                pending.result(timeout)
+            except Exception:
+                pass
@@ -1,12 +1,14 @@
-from openai import OpenAI
-import anthropic
-import cohere
 from PyQt5.QtCore import QMutexLocker
 from typing import Generator
 import logging
 import time
 from src.utils import timing_decorator
 from src.core import config
+from src.core import llm_clients
+from src.core import llm_backends
+from src.core import response_cache
+from src.core import local_formatter
+from src.core.conversation_history import ConversationHistory
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -19,31 +21,29 @@ API_KEYS = {
     'Claude': 'Your Claude API key'
 }
 
-# Initialize the OpenAI (ChatGPT) client
-chat_gpt = OpenAI(
-    api_key=API_KEYS['ChatGPT']
-)
-
-# Initialize Claude client (ensure correct API key)
-claude = anthropic.Anthropic(api_key=API_KEYS['Claude'])
-
-# Initialize the OpenAI (DeepSeek) client
-deepseek = OpenAI(api_key=API_KEYS['DeepSeek'], base_url='https://api.deepseek.com')
-
-# Initialize the Cohere client
-cohere = cohere.Client(API_KEYS['COHERE'])
+# Clients of all providers, shared by every `LLM` instance and created on first use
+clients = llm_clients.ClientRegistry(API_KEYS)
 
 class LLM:
     def __init__(self):
-        # Initialize conversation history
-        self.cohere_conversation_history = []
-        self.deepseek_conversation_history = [
-        {'role': 'system', 'content': 'Answer as short as possible'}
-        ]
-        self.chatgpt_conversation_history = [
-        {'role': 'system', 'content': 'Answer as short as possible'}
-        ]
-        self.claude_conversation_history = []
+        # Initialize conversation history, bounded by the token budget of its backend
+        self.cohere_conversation_history = self._new_history('COHERE', system_prompt='')
+        self.deepseek_conversation_history = self._new_history('DeepSeek')
+        self.chatgpt_conversation_history = self._new_history('ChatGPT')
+        self.claude_conversation_history = self._new_history('Claude')
+        # Conversation history of every streaming backend (see `llm_backends.BACKENDS`) by its name
+        self.histories = {
+            'DeepSeek': self.deepseek_conversation_history,
+            'ChatGPT': self.chatgpt_conversation_history,
+            'Claude': self.claude_conversation_history,
+            'COHERE': self.cohere_conversation_history
+        }
+        # Number of chat answers being streamed, a session isn't evicted while it's answering
+        self.active_streams = 0
+        # Number of users of the session (see `llm_sessions.SessionManager.lease`), it isn't evicted while it's used
+        self.leases = 0
+        # Formatted answers by message template, None to always ask the LLM
+        self.formatter_cache = response_cache.get_cache() if config.formatter_cache_enabled else None
         self.message_formater_prompt = [
         {'role': 'system',
         'content': f'''
@@ -65,13 +65,95 @@ class LLM:
             '''}
         ]
 
+    # Attributes of the histories in `histories`, by backend name
+    _HISTORY_ATTRIBUTES = {
+        'DeepSeek': 'deepseek_conversation_history',
+        'ChatGPT': 'chatgpt_conversation_history',
+        'Claude': 'claude_conversation_history',
+        'COHERE': 'cohere_conversation_history'
+    }
+
+    @property
+    def busy(self) -> bool:
+        """
+        True while the session is leased, an answer is streamed or a history is being summarized.
+        """
+        return self.leases > 0 or self.active_streams > 0 or any(history.summarizing for history in self.histories.values())
+
+    def is_empty(self) -> bool:
+        """
+        True if nothing was said in any conversation yet.
+        """
+        return not any(len(history) or history.summary for history in self.histories.values())
+
+    def to_dict(self) -> dict:
+        """
+        Conversation histories of the session, to be stored as JSON.
+        """
+        return {name: history.to_dict() for name, history in self.histories.items()}
+
+    @classmethod
+    def from_dict(cls, state: dict) -> 'LLM':
+        """
+        Session restored from `to_dict()`.
+        """
+        model = cls()
+        for name, history_state in state.items():
+            history = ConversationHistory.from_dict(history_state, budget=config.llm_history_budgets.get(name))
+            model.histories[name] = history
+            if name in cls._HISTORY_ATTRIBUTES:
+                setattr(model, cls._HISTORY_ATTRIBUTES[name], history)
+        return model
+
+    @staticmethod
+    def _new_history(backend_name: str, system_prompt: str = 'Answer as short as possible') -> ConversationHistory:
+        return ConversationHistory(system_prompt, budget=config.llm_history_budgets.get(backend_name))
+
+    def _stream(self, backend: llm_backends.StreamingBackend, messages: list) -> Generator[str, None, str]:
+        """
+        Stream the answer of `backend` to `messages` token by token.
+
+        Yields:
+            str: Tokens of the answer
+
+        Returns:
+            str: The complete answer
+        """
+        complete_response = ''
+        for token in backend.stream(messages):
+            complete_response += token
+            yield token
+        return complete_response
+
+    def _history_stream(self, backend_name: str, user_input: str) -> Generator[str, None, str]:
+        """
+        Stream the answer of a backend to `user_input`, keeping the conversation history of that backend.
+        Only the messages within the token budget of the history are sent (older ones are summarized).
+        """
+        history = self.histories.get(backend_name)
+        if history is None:
+            history = self.histories[backend_name] = self._new_history(backend_name)
+        history.append('user', user_input)
+        self.active_streams += 1
+        try:
+            complete_response = yield from self._stream(llm_backends.get_backend(backend_name), history.messages())
+        except BaseException:
+            # The question stays out of the history if it wasn't answered
+            history.pop()
+            raise
+        finally:
+            self.active_streams -= 1
+        history.append('assistant', complete_response)
+        return complete_response
+
     @timing_decorator.functime
     def message_formater_stream(self, message: str = None) -> Generator[str, None, str]:
         """
         This method will format all messages into more understandable response with streaming mode.
         It will stream the formatted response token by token and update the UI in real-time.
 
-        LLM: DeepSeek
+        LLM: `config.llm_backends['formatter']` (DeepSeek by default), outputs with a local template
+        are phrased by `local_formatter` (see `config.formatter_mode`)
         
         Args:
             message (str): The message to be formatted
@@ -83,29 +165,49 @@ class LLM:
         prompt = self.message_formater_prompt + [
             {
                 'role': 'user',
-                'content': message + f'\n{config.current_language_code}' 
+                'content': message + f'\n{config.current_language_code}'
             }
         ]
 
+        language_code = config.current_language_code
+        # Outputs with a local template are phrased without the LLM (see `config.formatter_mode`)
+        if config.formatter_mode != 'llm':
+            local_response = local_formatter.format_message(message, language_code)
+            if local_response is None and config.formatter_mode == 'local':
+                local_response = message
+            if local_response is not None:
+                yield local_response
+                return local_response
+
+        # Repeated outputs (with other times, numbers...) are answered from the cache, without a round trip
+        if self.formatter_cache is not None:
+            cached_response = self.formatter_cache.get(message, language_code)
+            if cached_response is not None:
+                logger.info('Formatted message is replayed from the cache')
+                yield from response_cache.replay(cached_response)
+                return cached_response
+
         logger.info('Message formating streaming is started')
+        complete_response = yield from self._stream(llm_backends.backend_for('formatter'), prompt)
+        if self.formatter_cache is not None:
+            self.formatter_cache.put(message, language_code, complete_response)
+        return complete_response
 
-        # Initialize an empty string to collect the complete response
-        complete_response = ""
-        # Send the request with streaming enabled
-        response = deepseek.chat.completions.create(
-            model='deepseek-chat',
-            messages=prompt,
-            stream=True
-        )
+    @timing_decorator.functime
+    def chat_stream(self, user_input: str = None) -> Generator[str, None, str]:
+        """
+        This method streams a chat answer token by token, from the LLM of `config.llm_backends['chatting']`.
+        Maintains a conversation history for context.
 
-        # Process the streaming response
-        for chunk in response:
-            if chunk.choices[0].delta.content is not None:
-                token = chunk.choices[0].delta.content
-                complete_response += token
-                yield token
+        Args:
+            user_input (str): The user's input message
 
-        return complete_response
+        Yields:
+            str: Tokens of the streamed response
+        """
+        backend_name = config.llm_backends['chatting']
+        logger.info(f'{backend_name} Streaming LLM is started')
+        return (yield from self._history_stream(backend_name, user_input))
 
     @timing_decorator.functime
     def chatgpt_stream(self, user_input: str = None) -> Generator[str, None, str]:
@@ -120,32 +222,7 @@ class LLM:
             str: Tokens of the streamed response
         """
         logger.info('ChatGPT Streaming LLM is started')
-
-
-        # Append user input to conversation history
-        self.chatgpt_conversation_history.append({'role': 'user', 'content': user_input})
-
-        # Initialize an empty string to collect the complete response
-        complete_response = ""
-
-        # Send the request with streaming enabled
-        response = chat_gpt.chat.completions.create(
-            model='gpt-4.1-nano',
-            messages=self.chatgpt_conversation_history,
-            stream=True
-        )
-
-        # Process the streaming response
-        for chunk in response:
-            if chunk.choices[0].delta.content is not None:
-                token = chunk.choices[0].delta.content
-                yield token
-                complete_response += token
-
-        # Append the complete response to conversation history
-        self.chatgpt_conversation_history.append({'role': 'assistant', 'content': complete_response})
-
-        return complete_response
+        return (yield from self._history_stream('ChatGPT', user_input))
 
     @timing_decorator.functime
     def claude_stream(self, user_input: str = None) -> Generator[str, None, str]:
@@ -160,34 +237,7 @@ class LLM:
             str: Tokens of the streamed response
         """
         logger.info('Claude Streaming LLM is started')
-
-        # Append user input to conversation history
-        self.claude_conversation_history.append({'role': 'user', 'content': user_input})
-
-        # Prepare messages in Claude format
-        messages = []
-        for msg in self.claude_conversation_history:
-            messages.append({
-                'role': msg['role'],
-                'content': msg['content']
-            })
-
-        # Use the recommended streaming helper
-        complete_response = ""
-        with claude.messages.stream(
-            max_tokens=1024,
-            system='Answer as short as possible',
-            messages=messages,
-            model="claude-3-5-haiku-latest",
-        ) as stream:
-            for text in stream.text_stream:
-                complete_response += text
-                yield text
-
-        # Append the complete response to conversation history
-        self.claude_conversation_history.append({'role': 'assistant', 'content': complete_response})
-
-        return complete_response
+        return (yield from self._history_stream('Claude', user_input))
 
     @timing_decorator.functime
     def deepseek_stream(self, user_input: str = None) -> Generator[str, None, str]:
@@ -202,31 +252,7 @@ class LLM:
             str: The complete response from the LLM
         """
         logger.info('DeepSeek Streaming LLM is started')
-        
-        # Append user input to conversation history
-        self.deepseek_conversation_history.append({'role': 'user', 'content': user_input})
-        
-        # Initialize an empty string to collect the complete response
-        complete_response = ""
-        
-        # Send the request with streaming enabled
-        response = deepseek.chat.completions.create(
-            model='deepseek-chat',
-            messages=self.deepseek_conversation_history,
-            stream=True
-        )
-        
-        # Process the streaming response
-        for chunk in response:
-            if chunk.choices[0].delta.content is not None:
-                token = chunk.choices[0].delta.content
-                yield token
-                complete_response += token
-        
-        # Append the complete response to conversation history
-        self.deepseek_conversation_history.append({'role': 'assistant', 'content': complete_response})
-        
-        return complete_response
+        return (yield from self._history_stream('DeepSeek', user_input))
 
     def cohere_llm(self, user_input: str = None) -> str:
         """
@@ -239,19 +265,21 @@ class LLM:
             return 'Goodbye!'
         
         # Append user input to conversation history
-        self.cohere_conversation_history.append({"role": "user", "content": user_input})
+        self.cohere_conversation_history.append('user', user_input)
         
         # Format the conversation history into a single prompt
         prompt = ""
-        for msg in self.cohere_conversation_history:
-            if msg["role"] == "user":
+        for msg in self.cohere_conversation_history.messages():
+            if msg["role"] == "system":
+                prompt += msg["content"] + "\n"
+            elif msg["role"] == "user":
                 prompt += "User: " + msg["content"] + "\n"
             elif msg["role"] == "assistant":
                 prompt += "Assistant: " + msg["content"] + "\n"
         prompt += "Assistant: "  # Cue for the assistant's response
         
         # Call the Cohere chat API with the formatted prompt
-        response = cohere.chat(
+        response = clients.get('COHERE').chat(
             message=prompt,
             model='command-xlarge-nightly'
         )
@@ -264,7 +292,7 @@ class LLM:
             config.message_to_display = bot_reply
 
         # Append the reply to conversation history
-        self.cohere_conversation_history.append({"role": "assistant", "content": bot_reply})
+        self.cohere_conversation_history.append('assistant', bot_reply)
         
         return bot_reply
 
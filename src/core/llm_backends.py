@@ -0,0 +1,162 @@
+import re
+import time
+import logging
+from typing import Callable, Dict, Iterator, List
+from src.core import config
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+"""
+llm_backends.py
+
+Streaming backends, one adapter per vendor SDK behind the same interface:
+    backend.stream(messages) -> yields text tokens
+
+`messages` are in the OpenAI chat format ({'role': 'system' | 'user' | 'assistant', 'content': ...}),
+adapters convert them for their SDK. Clients come from the shared `llm.clients` registry.
+
+Which backend answers which kind of request is set in `config.llm_backends` (e.g. 'formatter' -> 'DeepSeek'),
+so providers can be swapped without code changes. The 'Mock' backend answers locally and deterministically,
+with configurable latency, to run and benchmark the whole streaming path offline.
+"""
+
+class StreamingBackend:
+    """
+    Base class of streaming backends.
+
+    Attributes:
+        name (str): Name of the backend, a key of `BACKENDS`
+    """
+    name: str = 'backend'
+
+    def stream(self, messages: List[dict]) -> Iterator[str]:
+        """
+        Send `messages` and yield the tokens of the answer.
+        """
+        raise NotImplementedError
+
+def _clients():
+    # Imported here, `llm` imports this module
+    from src.core import llm
+    return llm.clients
+
+class OpenAIChatBackend(StreamingBackend):
+    """
+    Providers with the OpenAI chat completions API (ChatGPT, DeepSeek).
+    """
+
+    def __init__(self, provider: str, model: str):
+        self.name = provider
+        self.model = model
+
+    def stream(self, messages: List[dict]) -> Iterator[str]:
+        response = _clients().get(self.name).chat.completions.create(
+            model=self.model,
+            messages=messages,
+            stream=True
+        )
+        for chunk in response:
+            if chunk.choices and chunk.choices[0].delta.content is not None:
+                yield chunk.choices[0].delta.content
+
+class ClaudeBackend(StreamingBackend):
+    """
+    Anthropic messages API, system messages are sent as its `system` parameter.
+    """
+    name = 'Claude'
+
+    def __init__(self, model: str, max_tokens: int = 1024):
+        self.model = model
+        self.max_tokens = max_tokens
+
+    def stream(self, messages: List[dict]) -> Iterator[str]:
+        system = '\n'.join(message['content'] for message in messages if message['role'] == 'system')
+        dialog = [message for message in messages if message['role'] != 'system']
+        options = {'system': system} if system else {}
+        with _clients().get(self.name).messages.stream(
+            max_tokens=self.max_tokens,
+            messages=dialog,
+            model=self.model,
+            **options
+        ) as stream:
+            yield from stream.text_stream
+
+class CohereBackend(StreamingBackend):
+    """
+    Cohere chat API, the last user message is sent as `message`, the ones before as `chat_history`.
+    """
+    name = 'COHERE'
+
+    _ROLES = {'system': 'SYSTEM', 'user': 'USER', 'assistant': 'CHATBOT'}
+
+    def __init__(self, model: str):
+        self.model = model
+
+    def stream(self, messages: List[dict]) -> Iterator[str]:
+        history = [{'role': self._ROLES[message['role']], 'message': message['content']} for message in messages[:-1]]
+        response = _clients().get(self.name).chat_stream(
+            message=messages[-1]['content'],
+            chat_history=history,
+            model=self.model
+        )
+        for event in response:
+            if event.event_type == 'text-generation':
+                yield event.text
+
+class MockBackend(StreamingBackend):
+    """
+    Local backend answering "Mock answer: <last user message>" word by word, without any network.
+
+    Attributes:
+        reply (str): Fixed answer instead of the echo, if given
+        first_token_latency (float): Seconds before the first token, `config.llm_mock_first_token_latency` if None
+        token_latency (float): Seconds between tokens, `config.llm_mock_token_latency` if None
+    """
+    name = 'Mock'
+
+    def __init__(self, reply: str = None, first_token_latency: float = None, token_latency: float = None):
+        self.reply = reply
+        self.first_token_latency = first_token_latency
+        self.token_latency = token_latency
+
+    def stream(self, messages: List[dict]) -> Iterator[str]:
+        first_token_latency = config.llm_mock_first_token_latency if self.first_token_latency is None else self.first_token_latency
+        token_latency = config.llm_mock_token_latency if self.token_latency is None else self.token_latency
+        reply = self.reply
+        if reply is None:
+            last_user_message = next((message['content'] for message in reversed(messages) if message['role'] == 'user'), '')
+            reply = f'Mock answer: {last_user_message}'
+
+        time.sleep(first_token_latency)
+        for number, token in enumerate(re.findall(r'\S+\s*', reply)):
+            if number:
+                time.sleep(token_latency)
+            yield token
+
+# Backends by name, created on first use
+BACKENDS: Dict[str, Callable[[], StreamingBackend]] = {
+    'ChatGPT': lambda: OpenAIChatBackend('ChatGPT', 'gpt-4.1-nano'),
+    'DeepSeek': lambda: OpenAIChatBackend('DeepSeek', 'deepseek-chat'),
+    'Claude': lambda: ClaudeBackend('claude-3-5-haiku-latest'),
+    'COHERE': lambda: CohereBackend('command-xlarge-nightly'),
+    'Mock': MockBackend
+}
+
+_backends: Dict[str, StreamingBackend] = {}
+
+def get_backend(name: str) -> StreamingBackend:
+    """
+    Backend by its name (a key of `BACKENDS`).
+    """
+    backend = _backends.get(name)
+    if backend is None:
+        backend = _backends.setdefault(name, BACKENDS[name]())
+    return backend
+
+def backend_for(request_type: str) -> StreamingBackend:
+    """
+    Backend answering a kind of request ('formatter' or 'chatting'), as set in `config.llm_backends`.
+    """
+    return get_backend(config.llm_backends[request_type])
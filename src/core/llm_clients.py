@@ -0,0 +1,177 @@
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, Optional
+from src.core import config
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+"""
+llm_clients.py
+
+One shared client per LLM provider, used by every `LLM` instance.
+
+Every client gets its own `httpx.Client` with a keep-alive connection pool (`config.llm_max_connections`,
+`config.llm_keepalive_expiry`), so after the first request of a provider the next ones reuse an open
+connection instead of making a new TCP + TLS handshake. Clients (and the SDKs) are created lazily on first use.
+
+`ClientRegistry.warm_up()` connects to the providers of `config.llm_warm_up_providers` once in the background
+at startup, so even the first token of a chat turn skips the handshake. If `config.llm_keep_warm_interval` is set,
+the connections are also kept open with a cheap request every that many seconds (off by default).
+
+Base URLs can be replaced with `config.llm_base_urls`, e.g. to run against a local mock HTTP server,
+see `benchmarks/llm_clients.py`.
+"""
+
+@dataclass(frozen=True)
+class ProviderSpec:
+    """
+    How to reach an LLM provider.
+
+    Attributes:
+        base_url (str): Default API address
+        sdk (str): SDK building the client - 'openai', 'anthropic' or 'cohere'
+    """
+    base_url: str
+    sdk: str
+
+PROVIDERS: Dict[str, ProviderSpec] = {
+    'ChatGPT': ProviderSpec('https://api.openai.com/v1', 'openai'),
+    'DeepSeek': ProviderSpec('https://api.deepseek.com', 'openai'),
+    'Claude': ProviderSpec('https://api.anthropic.com', 'anthropic'),
+    'COHERE': ProviderSpec('https://api.cohere.com', 'cohere')
+}
+
+class ClientRegistry:
+    """
+    Lazily created SDK clients of the providers, sharing a keep-alive connection pool per provider.
+    Safe to use from several threads.
+
+    Args:
+        api_keys (dict): API key of every provider, by provider name
+        base_urls (dict): Base URL overrides by provider name, `config.llm_base_urls` if None
+    """
+
+    def __init__(self, api_keys: dict, base_urls: dict = None):
+        self.api_keys = api_keys
+        self.base_urls = base_urls
+        self._clients: dict = {}
+        self._http_clients: dict = {}
+        self._lock = threading.Lock()
+        self._stop_keep_warm = threading.Event()
+        self._keep_warm_thread: Optional[threading.Thread] = None
+
+    def base_url(self, provider: str) -> str:
+        base_urls = config.llm_base_urls if self.base_urls is None else self.base_urls
+        return base_urls.get(provider, PROVIDERS[provider].base_url)
+
+    def http_client(self, provider: str):
+        """
+        Keep-alive HTTP client of a provider, created on first use.
+        """
+        with self._lock:
+            http_client = self._http_clients.get(provider)
+            if http_client is None:
+                import httpx
+                http_client = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=config.llm_max_connections,
+                        max_keepalive_connections=config.llm_max_connections,
+                        keepalive_expiry=config.llm_keepalive_expiry
+                    ),
+                    timeout=httpx.Timeout(config.llm_request_timeout, connect=10.0)
+                )
+                self._http_clients[provider] = http_client
+            return http_client
+
+    def get(self, provider: str):
+        """
+        SDK client of a provider (e.g. `OpenAI` for 'DeepSeek'), created on first use.
+
+        Args:
+            provider (str): Name of the provider, a key of `PROVIDERS`
+        """
+        client = self._clients.get(provider)
+        if client is not None:
+            return client
+
+        http_client = self.http_client(provider)
+        with self._lock:
+            client = self._clients.get(provider)
+            if client is None:
+                client = self._create_client(provider, http_client)
+                self._clients[provider] = client
+                logger.info(f'{provider} client is created')
+            return client
+
+    def _create_client(self, provider: str, http_client):
+        sdk = PROVIDERS[provider].sdk
+        api_key = self.api_keys[provider]
+        base_url = self.base_url(provider)
+        if sdk == 'openai':
+            from openai import OpenAI
+            return OpenAI(api_key=api_key, base_url=base_url, http_client=http_client)
+        if sdk == 'anthropic':
+            import anthropic
+            return anthropic.Anthropic(api_key=api_key, base_url=base_url, http_client=http_client)
+        import cohere
+        return cohere.Client(api_key, base_url=base_url, httpx_client=http_client)
+
+    def connect(self, provider: str) -> bool:
+        """
+        Open (or refresh) a pooled connection to a provider with a HEAD request of its base URL.
+        Any HTTP status is fine, only the connection matters.
+
+        Returns:
+            bool: True if the provider could be reached
+        """
+        try:
+            self.http_client(provider).head(self.base_url(provider))
+        except Exception as e:
+            logger.warning(f'{provider} could not be reached while warming up - {e}')
+            return False
+        return True
+
+    def warm_up(self, providers: Iterable[str] = None, keep_warm_interval: float = None) -> None:
+        """
+        Connect to `providers` in a background daemon thread, then, if there is an interval,
+        keep the connections open until `close()` is called.
+
+        Args:
+            providers (Iterable[str]): Providers to connect to, `config.llm_warm_up_providers` if None
+            keep_warm_interval (float): Seconds between refreshing requests, `config.llm_keep_warm_interval` if None,
+                0 to connect only once
+        """
+        providers = list(config.llm_warm_up_providers if providers is None else providers)
+        interval = config.llm_keep_warm_interval if keep_warm_interval is None else keep_warm_interval
+        if not providers or (self._keep_warm_thread is not None and self._keep_warm_thread.is_alive()):
+            return
+
+        def keep_warm():
+            while True:
+                start = time.time()
+                for provider in providers:
+                    if self._stop_keep_warm.is_set():
+                        return
+                    self.connect(provider)
+                logger.info(f'LLM connections are warm ({", ".join(providers)}) in {time.time() - start:.2f} seconds')
+                if not interval or self._stop_keep_warm.wait(interval):
+                    return
+
+        self._stop_keep_warm.clear()
+        self._keep_warm_thread = threading.Thread(target=keep_warm, name='LLM Warm Up Thread', daemon=True)
+        self._keep_warm_thread.start()
+
+    def close(self) -> None:
+        """
+        Stop keeping connections warm and close all pools.
+        """
+        self._stop_keep_warm.set()
+        with self._lock:
+            for http_client in self._http_clients.values():
+                http_client.close()
+            self._http_clients.clear()
+            self._clients.clear()
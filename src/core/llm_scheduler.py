@@ -0,0 +1,255 @@
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+from src.core import config
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+"""
+llm_scheduler.py
+
+Scheduler of the LLM requests of all chat pages, run on a shared pool of worker threads
+(`config.llm_scheduler_workers`) instead of a thread per message.
+
+    - Requests of a page run one after another, in the order they were sent (FIFO per page)
+    - At most `config.llm_provider_concurrency[provider]` requests of a provider run at once
+      (`config.llm_default_concurrency` for other providers), requests without a provider (e.g. long-term tasks)
+      are only bounded by the pool
+    - Among pages, the request waiting the longest starts first
+    - `cancel(page_id)` cancels the cancellable requests of a page, e.g. when the user sends a new message:
+      queued ones are dropped, running ones are told to stop (`request.cancelled`) and stop at their next token
+    - `metrics()` reports queue depths by provider, running requests and waiting times
+"""
+
+class LLMRequest:
+    """
+    A request of a chat page, run by `LLMScheduler`.
+
+    Attributes:
+        page_id (str): Chat page the request belongs to
+        provider (Optional[str]): LLM provider it holds a slot of while it runs, None for no limit
+        work (Callable[[LLMRequest], None]): Runs the request on a worker thread, should stop soon after `cancelled` is set
+        cancellable (bool): Whether a new message of the page cancels it
+        on_cancel (Optional[Callable[[LLMRequest], None]]): Called if the request is cancelled before it started
+    """
+
+    def __init__(self, page_id: str, provider: Optional[str], work: Callable[['LLMRequest'], None],
+                 cancellable: bool = True, on_cancel: Callable[['LLMRequest'], None] = None):
+        self.page_id = page_id
+        self.provider = provider
+        self.work = work
+        self.cancellable = cancellable
+        self.on_cancel = on_cancel
+        self.submitted_at = time.perf_counter()
+        self.started_at: Optional[float] = None
+        self._cancelled = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancelled.is_set()
+
+    def cancel(self) -> None:
+        self._cancelled.set()
+
+class LLMScheduler:
+    """
+    Runs `LLMRequest`s with per-provider concurrency limits and FIFO order per page. Safe to use from several threads.
+
+    Args:
+        limits (dict): Concurrent requests by provider, `config.llm_provider_concurrency` if None
+        default_limit (int): Concurrent requests of other providers, `config.llm_default_concurrency` if None
+        workers (int): Worker threads, `config.llm_scheduler_workers` if None
+    """
+
+    def __init__(self, limits: dict = None, default_limit: int = None, workers: int = None):
+        self.limits = limits
+        self.default_limit = default_limit
+        self._executor = ThreadPoolExecutor(max_workers=workers or config.llm_scheduler_workers,
+                                            thread_name_prefix='LLM Request')
+        # Requests waiting and running, by page, the first one of a page is the one running (or next to run)
+        self._queues: Dict[str, deque] = {}
+        self._running_pages: set = set()
+        self._running: Dict[Optional[str], int] = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self.submitted = 0
+        self.completed = 0
+        self.cancelled = 0
+        self.failed = 0
+        self._started = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._max_depth = 0
+
+    def limit(self, provider: Optional[str]) -> Optional[int]:
+        """
+        Concurrent requests allowed for `provider`, None if unlimited.
+        """
+        if provider is None:
+            return None
+        limits = config.llm_provider_concurrency if self.limits is None else self.limits
+        default_limit = config.llm_default_concurrency if self.default_limit is None else self.default_limit
+        return max(1, limits.get(provider, default_limit))
+
+    def submit(self, page_id: str, provider: Optional[str], work: Callable[[LLMRequest], None],
+               cancellable: bool = True, on_cancel: Callable[[LLMRequest], None] = None) -> LLMRequest:
+        """
+        Queue a request after the other requests of its page.
+
+        Returns:
+            LLMRequest: The request, e.g. to cancel it
+        """
+        request = LLMRequest(page_id, provider, work, cancellable, on_cancel)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError('LLM scheduler is shut down')
+            self._queues.setdefault(page_id, deque()).append(request)
+            self.submitted += 1
+            depth = self._queued_count()
+            self._max_depth = max(self._max_depth, depth)
+            self._dispatch()
+            if request.started_at is None:
+                logger.info(f'LLM request of page {page_id} ({provider}) is queued, {depth} requests are waiting')
+        return request
+
+    def cancel(self, page_id: str, everything: bool = False) -> int:
+        """
+        Cancel the cancellable requests of a page. Queued ones are dropped, running ones are told to stop.
+
+        Args:
+            page_id (str): Chat page
+            everything (bool): Cancel the requests that aren't cancellable too (on shutdown)
+
+        Returns:
+            int: Number of cancelled requests
+        """
+        dropped = []
+        count = 0
+        with self._lock:
+            queue = self._queues.get(page_id)
+            if not queue:
+                return 0
+            running = queue[0] if page_id in self._running_pages else None
+            for request in list(queue):
+                if (not request.cancellable and not everything) or request.cancelled:
+                    continue
+                request.cancel()
+                count += 1
+                if request is not running:
+                    queue.remove(request)
+                    dropped.append(request)
+            self.cancelled += len(dropped)
+            if not queue:
+                del self._queues[page_id]
+            # A dropped request may have been the one blocking the others of the page
+            self._dispatch()
+        for request in dropped:
+            self._notify_cancelled(request)
+        if count:
+            logger.info(f'{count} LLM requests of page {page_id} are cancelled')
+        return count
+
+    def _notify_cancelled(self, request: LLMRequest) -> None:
+        if request.on_cancel is not None:
+            try:
+                request.on_cancel(request)
+            except Exception as e:
+                logger.error(f'Error in `LLMScheduler`, while notifying a cancelled request, error - {e}')
+
+    def _queued_count(self) -> int:
+        # Called with the lock held
+        return sum(len(queue) for queue in self._queues.values()) - len(self._running_pages)
+
+    def _dispatch(self) -> None:
+        # Called with the lock held. The first request of every idle page may start, the longest waiting first
+        if self._closed:
+            return
+        heads = sorted((queue[0] for page_id, queue in self._queues.items() if page_id not in self._running_pages),
+                       key=lambda request: request.submitted_at)
+        for request in heads:
+            limit = self.limit(request.provider)
+            if limit is not None and self._running.get(request.provider, 0) >= limit:
+                continue
+            self._running[request.provider] = self._running.get(request.provider, 0) + 1
+            self._running_pages.add(request.page_id)
+            request.started_at = time.perf_counter()
+            wait = request.started_at - request.submitted_at
+            self._started += 1
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+            self._executor.submit(self._run, request)
+
+    def _run(self, request: LLMRequest) -> None:
+        failed = False
+        try:
+            request.work(request)
+        except Exception as e:
+            failed = True
+            logger.error(f'Error in `LLMScheduler._run`, request of page {request.page_id} failed, error - {e}')
+        finally:
+            with self._lock:
+                self._running[request.provider] -= 1
+                self._running_pages.discard(request.page_id)
+                queue = self._queues.get(request.page_id)
+                if queue and queue[0] is request:
+                    queue.popleft()
+                if queue is not None and not queue:
+                    del self._queues[request.page_id]
+                if failed:
+                    self.failed += 1
+                elif request.cancelled:
+                    self.cancelled += 1
+                else:
+                    self.completed += 1
+                self._dispatch()
+
+    def queue_depths(self) -> Dict[Optional[str], int]:
+        """
+        Waiting requests by provider.
+        """
+        with self._lock:
+            depths: Dict[Optional[str], int] = {}
+            for page_id, queue in self._queues.items():
+                waiting = list(queue)[1:] if page_id in self._running_pages else queue
+                for request in waiting:
+                    depths[request.provider] = depths.get(request.provider, 0) + 1
+            return depths
+
+    def metrics(self) -> dict:
+        """
+        Snapshot of the scheduler: queue depths and running requests by provider, counters and waiting times (seconds).
+        """
+        depths = self.queue_depths()
+        with self._lock:
+            return {
+                'queued': sum(depths.values()),
+                'queued_by_provider': depths,
+                'running_by_provider': {provider: count for provider, count in self._running.items() if count},
+                'max_queue_depth': self._max_depth,
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'cancelled': self.cancelled,
+                'failed': self.failed,
+                'average_wait': self._total_wait / self._started if self._started else 0.0,
+                'max_wait': self._max_wait
+            }
+
+    def shutdown(self, wait: bool = False) -> None:
+        """
+        Cancel every request and stop the worker threads.
+        """
+        with self._lock:
+            self._closed = True
+            page_ids = list(self._queues)
+        for page_id in page_ids:
+            self.cancel(page_id, everything=True)
+        self._executor.shutdown(wait=wait)
+        logger.info(f'LLM scheduler is shut down, {self.metrics()}')
+
+# Scheduler of the requests of all chat pages
+scheduler = LLMScheduler()
@@ -0,0 +1,180 @@
+import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Iterator, Optional
+from src.core import config
+from src.core import llm
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+"""
+llm_sessions.py
+
+One LLM session (an `LLM` with its own conversation histories) per chat page, by `Page.page_id`,
+so the histories of different chats don't mix.
+
+At most `config.llm_sessions_in_memory` sessions are kept in memory. When another one is needed,
+the least recently used idle session is stored in `config.LLM_SESSIONS_DIR` as `<page_id>.json`
+and dropped; it's restored from there the next time its page asks for it (e.g. on `MainWindow.switch_chat`).
+Sessions that are leased (`lease()`, e.g. while answering) or summarizing are never evicted, and sessions without any message aren't stored at all.
+
+Page ids are new on every start, so files left by the previous run are removed on first use
+(except `<page_id>.json.bad`, files of sessions that couldn't be restored).
+"""
+
+SESSION_FILE_VERSION = 1
+
+class SessionManager:
+    """
+    LRU of the LLM sessions of chat pages, idle ones are evicted to disk. Safe to use from several threads.
+
+    Args:
+        directory (str): Folder of evicted sessions, `config.LLM_SESSIONS_DIR` if None
+        max_in_memory (int): Sessions kept in memory, `config.llm_sessions_in_memory` if None
+    """
+
+    def __init__(self, directory: str = None, max_in_memory: int = None):
+        self.directory = directory
+        self.max_in_memory = max_in_memory
+        self._sessions: OrderedDict = OrderedDict()
+        # Page ids of the sessions stored on disk
+        self._stored: set = set()
+        self._prepared = False
+        self._lock = threading.Lock()
+        self.evictions = 0
+        self.restorations = 0
+
+    def _directory(self) -> str:
+        return self.directory or config.LLM_SESSIONS_DIR
+
+    def _path(self, page_id: str) -> str:
+        return os.path.join(self._directory(), f'{page_id}.json')
+
+    def _prepare(self) -> None:
+        # Called with the lock held
+        if self._prepared:
+            return
+        self._prepared = True
+        directory = self._directory()
+        try:
+            os.makedirs(directory, exist_ok=True)
+            for name in os.listdir(directory):
+                if name.endswith('.json') or name.endswith('.json.tmp'):
+                    os.remove(os.path.join(directory, name))
+        except OSError as e:
+            logger.error(f'Error in `SessionManager._prepare`, error - {e}')
+
+    def get(self, page_id: str) -> llm.LLM:
+        """
+        Session of a chat page: from memory, restored from disk, or a new one.
+        It may be evicted as soon as other sessions are asked for, use `lease()` to keep it while it's used.
+        """
+        with self._lock:
+            return self._get(page_id)
+
+    @contextmanager
+    def lease(self, page_id: str) -> Iterator[llm.LLM]:
+        """
+        Session of a chat page, which isn't evicted until the `with` block is over, e.g. while it answers.
+        """
+        with self._lock:
+            session = self._get(page_id)
+            session.leases += 1
+        try:
+            yield session
+        finally:
+            with self._lock:
+                session.leases -= 1
+
+    def _get(self, page_id: str) -> llm.LLM:
+        # Called with the lock held
+        self._prepare()
+        session = self._sessions.get(page_id)
+        if session is not None:
+            self._sessions.move_to_end(page_id)
+            return session
+
+        session = self._restore(page_id) if page_id in self._stored else None
+        if session is None:
+            session = llm.LLM()
+        self._sessions[page_id] = session
+        self._evict_idle()
+        return session
+
+    def discard(self, page_id: str) -> None:
+        """
+        Forget the session of a deleted chat page, in memory and on disk.
+        """
+        with self._lock:
+            self._sessions.pop(page_id, None)
+            if page_id in self._stored:
+                self._stored.discard(page_id)
+                try:
+                    os.remove(self._path(page_id))
+                except OSError as e:
+                    logger.error(f'Error in `SessionManager.discard`, error - {e}')
+
+    def in_memory(self) -> int:
+        return len(self._sessions)
+
+    def _evict_idle(self) -> None:
+        # Called with the lock held, the most recently used session (the one just asked for) is kept
+        max_in_memory = max(1, self.max_in_memory or config.llm_sessions_in_memory)
+        for page_id in list(self._sessions)[:-1]:
+            if len(self._sessions) <= max_in_memory:
+                break
+            session = self._sessions[page_id]
+            if session.busy:
+                continue
+            if session.is_empty() or self._store(page_id, session):
+                del self._sessions[page_id]
+                self.evictions += 1
+
+    def _store(self, page_id: str, session: llm.LLM) -> bool:
+        # Called with the lock held. The file is replaced atomically
+        path = self._path(page_id)
+        temp_path = f'{path}.tmp'
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': SESSION_FILE_VERSION, 'histories': session.to_dict()}, f,
+                          separators=(',', ':'), ensure_ascii=False)
+            os.replace(temp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            # The session stays in memory
+            logger.error(f'Error in `SessionManager._store`, session {page_id} is kept in memory - {e}')
+            return False
+        self._stored.add(page_id)
+        return True
+
+    def _restore(self, page_id: str) -> Optional[llm.LLM]:
+        # Called with the lock held
+        path = self._path(page_id)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            session = llm.LLM.from_dict(state['histories'])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            # The file is kept as `<page_id>.json.bad`, so the chat isn't lost with it
+            logger.error(f'Error in `SessionManager._restore`, session {page_id} starts over, '
+                         f'its file is kept as {path}.bad - {e}')
+            try:
+                os.replace(path, f'{path}.bad')
+            except OSError as error:
+                logger.error(f'Error in `SessionManager._restore`, error - {error}')
+            return None
+        finally:
+            self._stored.discard(page_id)
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        self.restorations += 1
+        return session
+
+# Sessions of all chat pages
+sessions = SessionManager()
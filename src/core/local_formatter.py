@@ -0,0 +1,136 @@
+import re
+import logging
+from typing import Dict, List, Optional, Tuple
+from src.core import config
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+"""
+local_formatter.py
+
+Local phrasing of instant task outputs, the fast path of the message formatter (`LLM.message_formater_stream`).
+
+Most outputs of `functions.py` are fixed strings or fixed strings with a value ("Volume has been muted successfully",
+"Current brightness: 40%", "20:34:11"). `TEMPLATES` has, for every task of `config.instantaneous_tasks`, the
+patterns of its outputs and a friendly answer per language, filled with the named groups of the pattern.
+Outputs without a template, and languages without a phrase, are left to the LLM.
+
+`config.formatter_mode` chooses who answers:
+    'hybrid' - the local template if there is one, otherwise the LLM
+    'local'  - only local templates, outputs without one are shown as they are
+    'llm'    - always the LLM
+"""
+
+_MONTHS_RU = {
+    'January': 'января', 'February': 'февраля', 'March': 'марта', 'April': 'апреля', 'May': 'мая', 'June': 'июня',
+    'July': 'июля', 'August': 'августа', 'September': 'сентября', 'October': 'октября', 'November': 'ноября',
+    'December': 'декабря'
+}
+
+# Task name -> [(pattern of an output, {language code: answer})], answers are filled with the groups of the pattern
+TEMPLATES: Dict[str, List[Tuple[str, Dict[str, str]]]] = {
+    'get_time': [
+        (r'(?P<hours>\d{1,2}):(?P<minutes>\d{2})(?::\d{2})?', {
+            'en': "It's {hours}:{minutes} right now! Need help with anything else?",
+            'ru': 'Сейчас {hours}:{minutes}! Чем ещё могу помочь?'
+        })
+    ],
+    'get_date': [
+        (r'(?P<day>\d{1,2}) (?P<month>[A-Z][a-z]+) (?P<year>\d{4})', {
+            'en': 'Today is {day} {month} {year}! Anything planned for today?',
+            'ru': 'Сегодня {day} {month_ru} {year} года! Есть планы на сегодня?'
+        })
+    ],
+    'open_site': [
+        (r'Website was opened successfully', {
+            'en': 'I opened the website for you! What would you like to do there?',
+            'ru': 'Открыла сайт для тебя! Что будем там делать?'
+        })
+    ],
+    'control_volume': [
+        (r'Volume has been increased successfully', {
+            'en': 'I turned the volume up for you! Is it loud enough now?',
+            'ru': 'Сделала погромче! Так хорошо слышно?'
+        }),
+        (r'Volume has been decreased successfully', {
+            'en': 'I turned the volume down a bit. Is that better?',
+            'ru': 'Сделала потише. Так лучше?'
+        }),
+        (r'Volume has been muted successfully', {
+            'en': 'Sound is muted, enjoy the silence!',
+            'ru': 'Звук выключен, наслаждайся тишиной!'
+        }),
+        (r'Volume has been unmuted successfully', {
+            'en': 'Sound is back on! Anything else I can help with?',
+            'ru': 'Звук снова включён! Чем ещё помочь?'
+        })
+    ],
+    'set_screen_brightness': [
+        (r'Current brightness: (?P<value>\d+(?:\.\d+)?)%', {
+            'en': 'Done! Your screen brightness is {value}% now.',
+            'ru': 'Готово! Яркость экрана теперь {value}%.'
+        })
+    ],
+    'calculate_expression': [
+        (r'Result: (?P<result>.+)', {
+            'en': 'The answer is {result}! Need anything else calculated?',
+            'ru': 'Ответ: {result}! Посчитать что-нибудь ещё?'
+        })
+    ],
+    'search_information': [
+        (r"Here is your request about '(?P<query>.*)'", {
+            'en': "I searched for '{query}' for you, the results are in your browser!",
+            'ru': "Поискала '{query}' для тебя, результаты уже в браузере!"
+        })
+    ],
+    'play_music': [
+        (r'Music was (?:loaded and )?playing successfully', {
+            'en': 'Your music is playing, enjoy!',
+            'ru': 'Музыка играет, наслаждайся!'
+        })
+    ]
+}
+
+# Compiled patterns, only of tasks the assistant has
+_COMPILED: List[Tuple[str, re.Pattern, Dict[str, str]]] = [
+    (task, re.compile(pattern), answers)
+    for task, templates in TEMPLATES.items() if task in config.instantaneous_tasks
+    for pattern, answers in templates
+]
+
+def match_output(message: str) -> Optional[Tuple[str, re.Match, Dict[str, str]]]:
+    """
+    Find the template of a task output.
+
+    Returns:
+        Optional[Tuple[str, re.Match, Dict[str, str]]]: Task name, match of the pattern and answers, None if there is no template
+    """
+    message = message.strip()
+    for task, pattern, answers in _COMPILED:
+        match = pattern.fullmatch(message)
+        if match:
+            return task, match, answers
+    return None
+
+def format_message(message: str, language_code: str) -> Optional[str]:
+    """
+    Phrase a task output in `language_code` with its template.
+
+    Returns:
+        Optional[str]: The answer, None if there is no template for the output or no phrase in that language
+    """
+    if not message:
+        return None
+    matched = match_output(message)
+    if matched is None:
+        return None
+    task, match, answers = matched
+    answer = answers.get(language_code)
+    if answer is None:
+        return None
+    values = match.groupdict()
+    if 'month' in values:
+        values['month_ru'] = _MONTHS_RU.get(values['month'], values['month'])
+    return answer.format(**values)
@@ -2,14 +2,26 @@ from dataclasses import dataclass
 from src.core import config
 from src.features import functions
 from typing import Union, Tuple
+import os
 import string
 import logging
-from src.core import llm
 from src.core import verb_object_extractor
 import re
 from rapidfuzz import process, fuzz
 from threading import Thread
 
+# Duplicate search command, e.g. "find duplicates in C:\Downloads", "search for duplicate files in D:\"
+DUPLICATE_COMMAND_PATTERN = re.compile(
+    r'\s*(?:find|show|search)\s+(?:for\s+)?(?:the\s+)?duplicates?\b(?:\s+files)?(?:\s+(?:in|of|for))?\s*(?P<path>.*)',
+    re.IGNORECASE | re.DOTALL
+)
+
+# Whole words of image operations, "convert to png" but not "how do I convert celsius" without an uploaded pic,
+# nor "greyhound facts"
+IMAGE_OPERATION_PATTERN = re.compile(
+    r'\b(?:' + '|'.join(re.escape(word) for word in config.image_operation_words) + r')\b', re.IGNORECASE
+)
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -48,7 +60,6 @@ class MessageProcessor:
         self.config = config
         self.functions = functions
         self.extractor = verb_object_extractor.Extractor()   # NLP verb-object extractor
-        self.llm = llm.LLM()               # Language Model instance
         logger.info('Message Processor initialized')
 
     def _process_message(self, action_verb: str, target_object: str) -> CommandResult:
@@ -215,6 +226,34 @@ class MessageProcessor:
         except Exception as e:
             logger.error(f'Error in open command handling: {e}')
 
+    def _handle_image_command(self, user_input: str) -> Tuple[Tuple[str, object], str]:
+        """
+        Handle image processing of uploaded pics or of a folder.
+
+        "gray C:/Photos" converts every pic of the folder, "gray all" every uploaded pic.
+        Otherwise the operations of the message ("resize to 800x600 and gray") are run on the last uploaded pic.
+
+        Args:
+            user_input: User command containing an image operation keyword
+
+        Returns:
+            Tuple[Tuple[str, object], str]: Task and its argument, 'Long-Term Task'
+        """
+        target_object = ' '.join(word for word in user_input.split() if 'gray' not in word.lower())
+        if 'gray' in user_input:
+            if target_object and os.path.isdir(target_object):
+                return ('batch image processing', [target_object]), 'Long-Term Task'
+
+            if target_object.lower() in ('all', 'all pics', 'all images', 'them', 'these'):
+                return ('batch image processing', list(config.user_chat_files.values())), 'Long-Term Task'
+
+        image_path = config.user_chat_files.get(config.user_file_name)
+        if image_path is None:
+            return 'There is no uploaded pic to process, upload one first', 'Instantanious Task'
+        # The pic is processed once, later messages aren't taken for image operations on it
+        config.user_file_name = ''
+        return ('image processing', (image_path, user_input)), 'Long-Term Task'
+
     def _handle_special_cases(self, user_message: str) -> Union[str, Tuple[str, str]]:
         """
         Handle special command cases that require specific processing.
@@ -237,12 +276,21 @@ class MessageProcessor:
                 thread.start()
                 return 'Reminder created successfully', 'Instantanious Task'
 
-            # Handle file reorganization
+            # Handle undoing of the last file reorganization, e.g. "undo reorganize C:\Downloads"
+            if 'undo' in user_message.split() and ('reorganize' in user_message or 'reorganization' in user_message):
+                target_path = ' '.join(word for word in user_message.split() if word not in ('undo', 'reorganize', 'reorganization'))
+                return ('undo reorganization', target_path), 'Long-Term Task'
+
+            # Handle file reorganization, e.g. "reorganize C:\Downloads by type recursively"
+            # (the folder, rule and recursion are parsed by `reorganizer.parse_reorganize_command`)
             if 'reorganize' in user_message:
-                target_path = ' '.join(word for word in user_message.split() if word != 'reorganize')
-                thread = Thread(target=reorganize_by_extension, args=[target_path])
-                thread.start()
-                return ('reorganization', target_path), 'Long-Term Task'
+                command = ' '.join(word for word in user_message.split() if word != 'reorganize')
+                return ('reorganization', command), 'Long-Term Task'
+
+            # Handle duplicate search, e.g. "find duplicates in C:\Downloads" ("open duplicates.xlsx" is not one)
+            duplicate_command = DUPLICATE_COMMAND_PATTERN.match(user_message)
+            if duplicate_command:
+                return ('duplicate search', duplicate_command.group('path').strip()), 'Long-Term Task'
 
             # Handle file opening
             if 'open' in user_message:
@@ -272,7 +320,11 @@ class MessageProcessor:
 
             # Handle grayscale conversion
             if 'gray' in user_message:
-                return ('image processing', config.user_chat_files[config.user_file_name]), 'Long-Term Task'
+                return self._handle_image_command(user_message)
+
+            # Handle other image operations on an uploaded pic
+            if config.user_file_name.endswith(config.image_extensions) and IMAGE_OPERATION_PATTERN.search(user_message):
+                return self._handle_image_command(user_message)
 
             return 'Not exception case'
             
@@ -0,0 +1,234 @@
+import os
+import re
+import json
+import time
+import logging
+import threading
+from collections import OrderedDict
+from typing import Iterator, List, Optional, Tuple
+from src.core import config
+
+# Set up logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+"""
+response_cache.py
+
+Cache of the message formatter (`LLM.message_formater_stream`). Most formatted messages are the same
+robotic output with other values ("20:34", "Volume is set to 40"), so the cache is keyed on the message
+with its volatile values (times, dates, numbers, month and day names) replaced by a placeholder,
+together with the language code.
+
+An answer is cached only if it contains every value of the message verbatim and no other ones, the values are replaced by slots
+and filled with the values of the next message with the same template:
+    "Volume is set to 40" -> "I turned the volume to 40%!" is stored as "I turned the volume to <slot 0>%!"
+    "Volume is set to 75" -> "I turned the volume to 75%!" without asking the LLM
+Answers are replayed word by word, like a stream.
+
+The cache is a size-bounded LRU (`config.formatter_cache_size`) stored in `config.FORMATTER_CACHE_FILE`
+as [[key, answer template], ...], least recently used first. New answers are written
+`config.formatter_cache_save_delay` seconds later and on closing the app (`save_cache`), not on every `put`.
+"""
+
+_MONTHS = 'January|February|March|April|May|June|July|August|September|October|November|December'
+_WEEKDAYS = 'Monday|Tuesday|Wednesday|Thursday|Friday|Saturday|Sunday'
+_VOLATILE_PATTERN = re.compile(
+    r'\d{1,2}:\d{2}(?::\d{2})?'            # Times
+    r'|\d{1,4}[./-]\d{1,2}[./-]\d{1,4}'     # Dates
+    r'|\d+(?:[.,]\d+)?'                     # Numbers
+    rf'|\b(?:{_MONTHS}|{_WEEKDAYS})\b'
+)
+# Placeholder of a value in a message template, and the marks around the number of a slot in an answer template
+# (characters of the Unicode private use area, they don't occur in messages)
+_VALUE = '\ue000'
+_SLOT_START = '\ue001'
+_SLOT_END = '\ue002'
+_SLOT_PATTERN = re.compile(f'{_SLOT_START}(\\d+){_SLOT_END}')
+
+def split_message(message: str) -> Tuple[str, List[str]]:
+    """
+    Split a message into its template and its volatile values,
+    e.g. "It's 20:34" -> ("It's _VALUE", ['20:34']).
+    """
+    values = _VOLATILE_PATTERN.findall(message)
+    return _VOLATILE_PATTERN.sub(_VALUE, ' '.join(message.split())), values
+
+def _value_pattern(value: str) -> str:
+    # A value must not be matched inside a longer number, e.g. "5" in "50"
+    return rf'(?<![\w.,:]){re.escape(value)}(?![\w:]|[.,]\d)'
+
+def answer_template(answer: str, values: List[str]) -> Optional[str]:
+    """
+    Replace the values of the message in its answer by slots.
+    None if some value isn't in the answer verbatim, or the answer has volatile values of its own.
+    """
+    template = answer.translate({ord(mark): None for mark in (_VALUE, _SLOT_START, _SLOT_END)})
+    # Longest first, so "20:34" is replaced before "20"
+    for index, value in sorted(enumerate(values), key=lambda item: -len(item[1])):
+        template, count = re.subn(_value_pattern(value), f'{_SLOT_START}{index}{_SLOT_END}', template)
+        if not count:
+            return None
+    # Other times, numbers or day names were made up from the values (e.g. a weekday from a date) and would be wrong
+    # for other values
+    if _VOLATILE_PATTERN.search(_SLOT_PATTERN.sub('', template)):
+        return None
+    return template
+
+def fill_template(template: str, values: List[str]) -> str:
+    """
+    Put `values` into the slots of an answer template.
+    """
+    return _SLOT_PATTERN.sub(lambda match: values[int(match.group(1))], template)
+
+def replay(answer: str, token_delay: float = None) -> Iterator[str]:
+    """
+    Yield a cached answer word by word, like a streamed one.
+
+    Args:
+        answer (str): The answer
+        token_delay (float): Seconds between words, `config.formatter_cache_token_delay` if None
+    """
+    token_delay = config.formatter_cache_token_delay if token_delay is None else token_delay
+    for number, token in enumerate(re.findall(r'\s*\S+\s*', answer)):
+        if number and token_delay:
+            time.sleep(token_delay)
+        yield token
+
+class ResponseCache:
+    """
+    LRU cache of formatted answers by message template and language, safe to use from several threads.
+
+    Attributes:
+        path (str): JSON file the cache is kept in
+        max_entries (int): Size bound, `config.formatter_cache_size` if None
+        save_delay (float): Seconds between a change and writing the file, `config.formatter_cache_save_delay` if None
+    """
+
+    def __init__(self, path: str = None, max_entries: int = None, save_delay: float = None):
+        self.path = path or config.FORMATTER_CACHE_FILE
+        self.max_entries = max_entries or config.formatter_cache_size
+        self.save_delay = config.formatter_cache_save_delay if save_delay is None else save_delay
+        self._entries: Optional[OrderedDict] = None
+        self._changed = False
+        self._save_timer: Optional[threading.Timer] = None
+        self._lock = threading.Lock()
+        # Held while the file is written, so two saves don't race on the temporary file
+        self._save_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _load(self) -> OrderedDict:
+        # Called with the lock held
+        if self._entries is None:
+            self._entries = OrderedDict()
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        self._entries = OrderedDict(json.load(f)[-self.max_entries:])
+                except (OSError, ValueError, TypeError) as e:
+                    logger.error(f'Error in `ResponseCache`, cache is unreadable and will be rebuilt - {e}')
+        return self._entries
+
+    @staticmethod
+    def _key(template: str, language_code: str) -> str:
+        return f'{language_code}\n{template}'
+
+    def get(self, message: str, language_code: str) -> Optional[str]:
+        """
+        Returns:
+            Optional[str]: Cached answer to `message` with its own values, None if there is none
+        """
+        template, values = split_message(message)
+        key = self._key(template, language_code)
+        with self._lock:
+            entries = self._load()
+            answer = entries.get(key)
+            if answer is None:
+                self.misses += 1
+                return None
+            entries.move_to_end(key)
+            self.hits += 1
+        try:
+            return fill_template(answer, values)
+        except IndexError:
+            # The template was stored by a version that found other values
+            return None
+
+    def put(self, message: str, language_code: str, answer: str) -> bool:
+        """
+        Cache the answer to `message`, if it contains the values of the message.
+        Messages longer than `config.formatter_cache_max_message` (file listings etc.) are not cached.
+
+        Returns:
+            bool: True if the answer was cached
+        """
+        if len(message) > config.formatter_cache_max_message or not answer.strip():
+            return False
+        template, values = split_message(message)
+        stored_answer = answer_template(answer, values)
+        if stored_answer is None:
+            return False
+
+        key = self._key(template, language_code)
+        with self._lock:
+            entries = self._load()
+            entries[key] = stored_answer
+            entries.move_to_end(key)
+            while len(entries) > self.max_entries:
+                entries.popitem(last=False)
+            self._changed = True
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(self.save_delay, self.save)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+        return True
+
+    def save(self) -> None:
+        """
+        Write the cache if something changed. The file is replaced atomically,
+        entries are only copied under the lock so lookups don't wait for the disk.
+        """
+        with self._save_lock:
+            with self._lock:
+                if self._save_timer is not None:
+                    self._save_timer.cancel()
+                    self._save_timer = None
+                if not self._changed:
+                    return
+                items = list(self._entries.items())
+                self._changed = False
+
+            temp_path = f'{self.path}.tmp'
+            try:
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(items, f, separators=(',', ':'), ensure_ascii=False)
+                os.replace(temp_path, self.path)
+            except OSError as e:
+                logger.error(f'Error in `ResponseCache.save`, error - {e}')
+                with self._lock:
+                    # Tried again with the next change or at shutdown
+                    self._changed = True
+
+# Cache shared by all chats, created on first use
+_cache: Optional[ResponseCache] = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> ResponseCache:
+    """
+    Return the shared cache for `config.FORMATTER_CACHE_FILE`.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache()
+        return _cache
+
+def save_cache() -> None:
+    """
+    Write the shared cache if it was used and changed, called when the app is closed.
+    """
+    with _cache_lock:
+        cache = _cache
+    if cache is not None:
+        cache.save()
@@ -0,0 +1,250 @@
+import os
+import json
+import logging
+import threading
+from collections import Counter, OrderedDict, defaultdict
+from dataclasses import dataclass, field
+from difflib import SequenceMatcher
+from typing import Dict, Iterable, List, Optional, Tuple
+from src.core import config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+"""
+app_catalog.py
+
+In-memory catalog of installed applications (`config.APPS_CATALOG_FILE`, written by the app scanners).
+The file is read once, app names are cleaned once and indexed by character trigrams,
+so "open discord" is answered without re-reading the JSON or comparing against every app.
+The catalog reloads itself when the file changes on disk.
+"""
+
+def clean_name_for_comparison(name: str) -> str:
+    """Clean name for similarity comparison."""
+    # Remove common words and special characters
+    name = name.lower()
+    name = name.replace('(', '').replace(')', '').replace('[', '').replace(']', '')
+    name = name.replace('version', '').replace('v.', '').replace('v ', '')
+    name = name.replace('64-bit', '').replace('32-bit', '').replace('x64', '').replace('x86', '')
+    name = name.replace('professional', '').replace('pro', '').replace('plus', '')
+    name = name.replace('edition', '').replace('enterprise', '').replace('home', '')
+
+    # Remove extra spaces
+    name = ' '.join(name.split())
+
+    return name
+
+def _trigrams(clean_name: str) -> set:
+    padded = f' {clean_name} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+def score_app_name(clean_user_input: str, clean_app_name: str) -> float:
+    """
+    Similarity of two cleaned names, the same score `open_exe.find_best_app_match` uses.
+    """
+    similarity = SequenceMatcher(None, clean_user_input, clean_app_name).ratio()
+
+    # Additional scoring for common patterns
+    if clean_app_name in clean_user_input or clean_user_input in clean_app_name:
+        similarity += 0.2  # Bonus for substring matches
+
+    # Exact match bonus
+    if clean_user_input == clean_app_name:
+        similarity += 0.5
+
+    return similarity
+
+@dataclass
+class CatalogSnapshot:
+    """
+    Loaded catalog with its lookup indexes. A reload creates a new snapshot instead of changing this one.
+
+    Attributes:
+        names (List[str]): App names, in file order
+        paths (List[str]): Executable paths, same order as `names`
+        clean_names (List[str]): Names after `clean_name_for_comparison`
+        by_clean_name (Dict[str, int]): First app id for every cleaned name
+        trigrams (Dict[str, List[int]]): App ids for every character trigram of the cleaned names
+        trigram_counts (List[int]): Number of distinct trigrams of every cleaned name
+        lookups (OrderedDict): Results of the latest lookups, by cleaned input, least recently used first
+    """
+    names: List[str] = field(default_factory=list)
+    paths: List[str] = field(default_factory=list)
+    clean_names: List[str] = field(default_factory=list)
+    by_clean_name: Dict[str, int] = field(default_factory=dict)
+    trigrams: Dict[str, List[int]] = field(default_factory=dict)
+    trigram_counts: List[int] = field(default_factory=list)
+    lookups: OrderedDict = field(default_factory=OrderedDict)
+
+    @classmethod
+    def build(cls, apps: Dict[str, str]) -> 'CatalogSnapshot':
+        snapshot = cls()
+        trigrams = defaultdict(list)
+        for app_id, (app_name, app_path) in enumerate(apps.items()):
+            clean_name = clean_name_for_comparison(app_name)
+            snapshot.names.append(app_name)
+            snapshot.paths.append(app_path)
+            snapshot.clean_names.append(clean_name)
+            snapshot.by_clean_name.setdefault(clean_name, app_id)
+            name_trigrams = _trigrams(clean_name)
+            snapshot.trigram_counts.append(len(name_trigrams))
+            for trigram in name_trigrams:
+                trigrams[trigram].append(app_id)
+        snapshot.trigrams = dict(trigrams)
+        return snapshot
+
+class AppCatalog:
+    """
+    Application catalog backed by a JSON file ({app name: executable path}).
+
+    Attributes:
+        path (str): Path to the catalog JSON file
+        max_candidates (int): Number of apps scored first, chosen by shared trigrams. If none of them scores
+            `config.app_catalog_confident_score`, every app is scored, as `open_exe.find_best_app_match` does
+    """
+
+    def __init__(self, path: str = None, max_candidates: int = 64):
+        self.path = path or config.APPS_CATALOG_FILE
+        self.max_candidates = max_candidates
+        self._snapshot = CatalogSnapshot()
+        self._signature = None
+        self._lock = threading.Lock()
+        self._lookups_lock = threading.Lock()
+
+    def _file_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def refresh(self) -> bool:
+        """
+        Reload the catalog if the file changed since the last load.
+
+        Returns:
+            bool: True if the catalog was reloaded
+        """
+        signature = self._file_signature()
+        if signature == self._signature:
+            return False
+
+        with self._lock:
+            if signature == self._signature:
+                return False
+            apps = {}
+            if signature is not None:
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as file:
+                        apps = json.load(file)
+                except (OSError, ValueError) as e:
+                    logger.error(f'Error in `AppCatalog.refresh`, catalog is unreadable - {e}')
+                    return False
+            else:
+                logger.warning(f'{self.path} not found. Please run the scanner first.')
+
+            self._snapshot = CatalogSnapshot.build(apps)
+            self._signature = signature
+            logger.info(f'Application catalog was loaded: {len(apps)} apps')
+            return True
+
+    def __len__(self) -> int:
+        self.refresh()
+        return len(self._snapshot.names)
+
+    def apps(self) -> Dict[str, str]:
+        """
+        Return the catalog as {app name: executable path}.
+        """
+        self.refresh()
+        snapshot = self._snapshot
+        return dict(zip(snapshot.names, snapshot.paths))
+
+    def _candidates(self, snapshot: CatalogSnapshot, clean_user_input: str) -> List[int]:
+        """
+        App ids sharing the most trigrams (relative to the name length) with the input, in file order.
+        """
+        input_trigrams = _trigrams(clean_user_input)
+        hits = Counter()
+        for trigram in input_trigrams:
+            hits.update(snapshot.trigrams.get(trigram, ()))
+
+        # Dice coefficient of trigram sets, so short names aren't outnumbered by long ones
+        ranked = sorted(
+            hits,
+            key=lambda app_id: hits[app_id] / (len(input_trigrams) + snapshot.trigram_counts[app_id]),
+            reverse=True
+        )
+        candidates = set(ranked[:self.max_candidates])
+
+        if not candidates:
+            # Nothing in common, fall back to scoring every app
+            return list(range(len(snapshot.names)))
+        return sorted(candidates)
+
+    @staticmethod
+    def _best_match(snapshot: CatalogSnapshot, clean_user_input: str, app_ids: Iterable[int]) -> Optional[Tuple[str, str, float]]:
+        """
+        The best scoring of `app_ids` (the first one on a tie), None if all score 0.
+        """
+        best_match = None
+        best_score = 0
+        for app_id in app_ids:
+            similarity = score_app_name(clean_user_input, snapshot.clean_names[app_id])
+            if similarity > best_score:
+                best_score = similarity
+                best_match = (snapshot.names[app_id], snapshot.paths[app_id], similarity)
+        return best_match
+
+    def find(self, user_input: str) -> Optional[Tuple[str, str, float]]:
+        """
+        Find the best matching app based on user input.
+
+        Args:
+            user_input (str): App name as the user said it
+
+        Returns:
+            Optional[Tuple[str, str, float]]: (app_name, app_path, similarity_score), None if the catalog is empty
+        """
+        self.refresh()
+        snapshot = self._snapshot
+        if not snapshot.names:
+            return None
+
+        clean_user_input = clean_name_for_comparison(user_input)
+        with self._lookups_lock:
+            if clean_user_input in snapshot.lookups:
+                snapshot.lookups.move_to_end(clean_user_input)
+                return snapshot.lookups[clean_user_input]
+
+        # Exact match always has the highest possible score
+        app_id = snapshot.by_clean_name.get(clean_user_input)
+        if app_id is not None:
+            return snapshot.names[app_id], snapshot.paths[app_id], score_app_name(clean_user_input, clean_user_input)
+
+        candidates = self._candidates(snapshot, clean_user_input)
+        best_match = self._best_match(snapshot, clean_user_input, candidates)
+        if len(candidates) < len(snapshot.names) and (best_match is None or best_match[2] < config.app_catalog_confident_score):
+            # Short or abbreviated names may share few trigrams with the app they mean, score every app instead
+            best_match = self._best_match(snapshot, clean_user_input, range(len(snapshot.names)))
+
+        with self._lookups_lock:
+            snapshot.lookups[clean_user_input] = best_match
+            while len(snapshot.lookups) > config.app_catalog_lookups_size:
+                snapshot.lookups.popitem(last=False)
+        return best_match
+
+# Catalog shared by the whole application, created on first use
+_catalog: Optional[AppCatalog] = None
+_catalog_lock = threading.Lock()
+
+def get_catalog() -> AppCatalog:
+    """
+    Return the shared application catalog for `config.APPS_CATALOG_FILE`.
+    """
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = AppCatalog()
+        return _catalog
@@ -0,0 +1,196 @@
+import os
+import time
+import queue
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Sequence, Tuple
+from src.core import config
+from src.features import extract_exe
+from src.features.deduplicate_apps import CatalogBuilder, DeduplicationStats
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+"""
+app_sources.py
+
+Sources of installed applications for the app catalog (`config.APPS_CATALOG_FILE`).
+
+Every source is a plugin with `discover()`, yielding (app name, target path) pairs. Sources run concurrently,
+their entries are streamed into the `CatalogBuilder` as they are found. Sources whose targets are install
+directories are resolved to an .exe by `extract_exe.resolve_exes` (cached, on a thread pool) while they are
+still being discovered. Memory stays bounded end to end: the results queue holds `QUEUE_SIZE` entries, the
+resolution a small window per worker and the builder spills waiting entries of less trusted sources to disk.
+
+Windows only modules (`winreg`, pywin32) are imported by the sources when they run, a source that can't run
+on the current system reports it through `available()` and is skipped. `FilesystemSource` discovers apps in
+an ordinary directory tree, so the whole pipeline also runs on Linux.
+"""
+
+# Number of found entries that may wait for the catalog builder
+QUEUE_SIZE: int = 1024
+
+# Marks the end of a source in the results queue
+_SOURCE_DONE = object()
+
+class AppSource:
+    """
+    Base class of application sources.
+
+    Attributes:
+        name (str): Name of the source, used in logs
+        resolve_executables (bool): True if targets are install directories, which have to be resolved to an .exe
+        exe_cache (ExeResolutionCache): Cache for the resolution, the shared one if None
+    """
+    name: str = 'source'
+    resolve_executables: bool = False
+    exe_cache: extract_exe.ExeResolutionCache = None
+
+    def available(self) -> bool:
+        """
+        Check whether the source can run on this system.
+        """
+        return True
+
+    def discover(self) -> Iterator[Tuple[str, str]]:
+        """
+        Yield (app name, target path) pairs.
+        """
+        raise NotImplementedError
+
+    def iter_apps(self) -> Iterator[Tuple[str, str]]:
+        """
+        Yield (app name, executable path) pairs, resolving install directories if needed.
+        """
+        if not self.resolve_executables:
+            yield from self.discover()
+            return
+        for app_name, exe_path in extract_exe.resolve_exes(self.discover(), cache=self.exe_cache):
+            if exe_path is not None:
+                yield app_name, exe_path
+
+class ShortcutSource(AppSource):
+    """
+    Start Menu shortcuts (requires pywin32).
+    """
+    name = 'shortcuts'
+
+    def available(self) -> bool:
+        try:
+            import pythoncom
+            from win32com.shell import shell
+        except ImportError:
+            return False
+        return True
+
+    def discover(self) -> Iterator[Tuple[str, str]]:
+        from src.features import scanner_shortcut
+        return scanner_shortcut.iter_shortcut_apps()
+
+class RegistrySource(AppSource):
+    """
+    Uninstall keys of the Windows registry, their install locations are resolved to an .exe.
+    """
+    name = 'registry'
+    resolve_executables = True
+
+    def available(self) -> bool:
+        try:
+            import winreg
+        except ImportError:
+            return False
+        return True
+
+    def discover(self) -> Iterator[Tuple[str, str]]:
+        from src.features import scanner_registry
+        return scanner_registry.iter_registry_apps()
+
+class FilesystemSource(AppSource):
+    """
+    Every folder directly inside `root` is an installed app, named after the folder,
+    its .exe is chosen by `extract_exe.resolve_exe`. Works on every system,
+    e.g. for an app folder like 'C:\\Games' or a fake Windows installation in benchmarks.
+
+    Attributes:
+        root (str): Directory containing the app folders
+    """
+    resolve_executables = True
+
+    def __init__(self, root: str, name: str = None, exe_cache: extract_exe.ExeResolutionCache = None):
+        self.root = root
+        self.name = name or f'filesystem {root}'
+        self.exe_cache = exe_cache
+
+    def available(self) -> bool:
+        return os.path.isdir(self.root)
+
+    def discover(self) -> Iterator[Tuple[str, str]]:
+        with os.scandir(self.root) as entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    yield entry.name, entry.path
+
+def default_sources() -> List[AppSource]:
+    """
+    Sources of the Windows app scan, most trusted first.
+    """
+    return [ShortcutSource(), RegistrySource()]
+
+def _run_source(priority: int, source: AppSource, results: queue.Queue) -> None:
+    start = time.time()
+    found = 0
+    try:
+        for app_name, target_path in source.iter_apps():
+            results.put((priority, app_name, target_path))
+            found += 1
+    except Exception as e:
+        logger.error(f'Error in app source {source.name}, it was not read completely - {e}')
+    finally:
+        results.put((priority, _SOURCE_DONE, None))
+    logger.info(f'App source {source.name} found {found} apps in {time.time() - start:.2f} seconds')
+
+def build_catalog(sources: Sequence[AppSource] = None, output_file: str = None, workers: int = None) -> DeduplicationStats:
+    """
+    Run the sources concurrently and write their deduplicated results to the app catalog.
+
+    Args:
+        sources (Sequence[AppSource]): Sources, most trusted first (`default_sources()` if None)
+        output_file (str): Catalog file to write, `config.APPS_CATALOG_FILE` if None
+        workers (int): Number of sources running at once, all of them if None
+
+    Returns:
+        DeduplicationStats: Counters of the run
+    """
+    sources = default_sources() if sources is None else list(sources)
+    runnable = []
+    for source in sources:
+        if source.available():
+            runnable.append(source)
+        else:
+            logger.warning(f'App source {source.name} is not available on this system, it is skipped')
+
+    if not runnable:
+        # Keep the old catalog instead of replacing it with an empty one
+        logger.warning('No app source is available, the app catalog was not rebuilt')
+        return DeduplicationStats()
+
+    builder = CatalogBuilder(output_file or config.APPS_CATALOG_FILE, len(runnable))
+
+    results = queue.Queue(maxsize=QUEUE_SIZE)
+    with ThreadPoolExecutor(max_workers=workers or len(runnable), thread_name_prefix='App Source') as executor:
+        for priority, source in enumerate(runnable):
+            executor.submit(_run_source, priority, source, results)
+
+        remaining = len(runnable)
+        while remaining:
+            priority, app_name, target_path = results.get()
+            if app_name is _SOURCE_DONE:
+                builder.finish_source(priority)
+                remaining -= 1
+            else:
+                builder.add(priority, app_name, target_path)
+
+    return builder.close()
+
+if __name__ == '__main__':
+    build_catalog()
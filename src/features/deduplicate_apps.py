@@ -0,0 +1,350 @@
+import os
+import json
+import hashlib
+import logging
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Tuple
+from src.core import config
+
+logger = logging.getLogger(__name__)
+
+"""
+deduplicate_apps.py
+
+Last stage of the Windows app scan: merges the results of the shortcut and registry scanners
+into one catalog ({app name: executable path}) without duplicates.
+
+Source files are parsed as a stream, so their size doesn't matter. Entries are keyed by a hash
+of their normalized target path: the first entry for a path wins (sources are given in priority order),
+later entries pointing to the same executable are dropped.
+
+`CatalogBuilder` does the merging and writing, it's also fed directly by the concurrent app sources
+of `app_sources.py`. Entries of a source that has to wait for more trusted ones are kept in memory
+up to `config.apps_catalog_pending_limit`, beyond that they are spilled to a temporary file.
+"""
+
+# Size of the chunks source files are read in
+CHUNK_SIZE: int = 64 * 1024
+
+_decoder = json.JSONDecoder()
+
+# Characters that may follow a complete JSON value
+_VALUE_TERMINATORS = frozenset(' \t\r\n,:]}')
+
+@dataclass
+class DeduplicationStats:
+    """
+    Result of a deduplication run.
+
+    Attributes:
+        read (int): Entries read from all sources
+        duplicates (int): Entries dropped because their target (or name) was already in the catalog
+        invalid (int): Entries without a usable target path
+        written (int): Entries written to the catalog
+    """
+    read: int = 0
+    duplicates: int = 0
+    invalid: int = 0
+    written: int = 0
+
+def iter_json_object(file_path: str, chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[str, object]]:
+    """
+    Yield (key, value) pairs of a top-level JSON object, reading the file in chunks.
+    Only one key/value pair has to fit in memory at a time.
+
+    Args:
+        file_path (str): JSON file containing one object, e.g. {"App": "C:\\\\App\\\\app.exe"}
+        chunk_size (int): Number of characters read at once
+
+    Raises:
+        ValueError: If the file isn't a JSON object
+    """
+    with open(file_path, 'r', encoding='utf-8') as file:
+        buffer = ''
+        position = 0
+        eof = False
+
+        def fill() -> bool:
+            # Drop the consumed part and append the next chunk, False at the end of the file
+            nonlocal buffer, position, eof
+            if eof:
+                return False
+            chunk = file.read(chunk_size)
+            if not chunk:
+                eof = True
+                return False
+            buffer = buffer[position:] + chunk
+            position = 0
+            return True
+
+        def next_char() -> str:
+            # Skip whitespace and return the next significant character (without consuming it)
+            nonlocal position
+            while True:
+                while position < len(buffer) and buffer[position].isspace():
+                    position += 1
+                if position < len(buffer):
+                    return buffer[position]
+                if not fill():
+                    return ''
+
+        def next_value() -> object:
+            nonlocal position
+            while True:
+                try:
+                    value, end = _decoder.raw_decode(buffer, position)
+                except json.JSONDecodeError:
+                    if fill():
+                        continue
+                    raise ValueError(f'{file_path} is not valid JSON')
+                # A number may continue in the next chunk ("1.5" of "1.5e10")
+                if (end == len(buffer) or buffer[end] not in _VALUE_TERMINATORS) and fill():
+                    continue
+                position = end
+                return value
+
+        if next_char() != '{':
+            raise ValueError(f'{file_path} does not contain a JSON object')
+        position += 1
+
+        if next_char() == '}':
+            return
+
+        while True:
+            next_char()
+            key = next_value()
+            if next_char() != ':':
+                raise ValueError(f'{file_path} is not valid JSON')
+            position += 1
+            next_char()
+            value = next_value()
+            yield key, value
+
+            separator = next_char()
+            position += 1
+            if separator == '}':
+                return
+            if separator != ',':
+                raise ValueError(f'{file_path} is not valid JSON')
+
+def normalize_target_path(path: str) -> Optional[str]:
+    """
+    Bring a target path from a scanner into one form, e.g. '"%ProgramFiles%\\\\App\\\\app.exe",0' -> 'C:\\\\Program Files\\\\App\\\\app.exe'.
+    Registry DisplayIcon values may be quoted and end with an icon index.
+
+    Returns:
+        Optional[str]: Normalized path, None if nothing usable is left
+    """
+    if not isinstance(path, str):
+        return None
+
+    path = path.strip().strip('"').strip()
+    # Drop icon index (",0" / ",-101")
+    head, separator, tail = path.rpartition(',')
+    if separator and tail.strip().lstrip('-').isdigit():
+        path = head.strip().strip('"')
+
+    if not path:
+        return None
+    return os.path.normpath(os.path.expandvars(path))
+
+def path_key(normalized_path: str) -> bytes:
+    """
+    Hash key of a normalized path, case insensitive on Windows.
+    """
+    return hashlib.blake2b(os.path.normcase(normalized_path).encode('utf-8'), digest_size=16).digest()
+
+class CatalogBuilder:
+    """
+    Streams (app name, target path) entries of several sources into the catalog file.
+
+    Sources may deliver their entries concurrently, but the result is the same as if they were read
+    one after another in priority order: entries of the most trusted unfinished source are merged
+    right away, entries of less trusted sources wait until all sources before them are finished.
+    At most `pending_limit` waiting entries of a source are kept in memory, further ones are spilled
+    to a temporary file next to the catalog (`<output_file>.pending<priority>.tmp`).
+
+    Attributes:
+        output_file (str): Catalog file to write, `config.APPS_CATALOG_FILE` if None
+        pending_limit (int): Waiting entries kept in memory per source, `config.apps_catalog_pending_limit` if None
+        stats (DeduplicationStats): Counters of the run
+    """
+
+    def __init__(self, output_file: str = None, sources_count: int = 1, pending_limit: int = None):
+        self.output_file = output_file or config.APPS_CATALOG_FILE
+        self.pending_limit = max(1, pending_limit or config.apps_catalog_pending_limit)
+        self.stats = DeduplicationStats()
+        self._temp_path = f'{self.output_file}.tmp'
+        self._seen_paths = set()
+        self._seen_names = set()
+        self._pending: List[List[Tuple[object, object]]] = [[] for _ in range(sources_count)]
+        # Files of the waiting entries spilled from `_pending`, by source, older than the ones in memory
+        self._spilled: List[Optional[str]] = [None] * sources_count
+        self._finished: List[bool] = [False] * sources_count
+        # Index of the source whose entries are merged directly
+        self._current = 0
+        self._file = None
+        try:
+            self._file = open(self._temp_path, 'w', encoding='utf-8')
+            self._file.write('{')
+        except OSError as e:
+            self._fail(e)
+
+    def _fail(self, error: OSError) -> None:
+        logger.error(f'Error in `CatalogBuilder`, catalog was not written - {error}')
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if os.path.exists(self._temp_path):
+            os.remove(self._temp_path)
+
+    def _merge(self, app_name: object, target_path: object) -> None:
+        self.stats.read += 1
+        normalized_path = normalize_target_path(target_path)
+        if normalized_path is None or not isinstance(app_name, str):
+            self.stats.invalid += 1
+            return
+
+        key = path_key(normalized_path)
+        name_key = app_name.strip().lower()
+        if key in self._seen_paths or name_key in self._seen_names:
+            self.stats.duplicates += 1
+            return
+        self._seen_paths.add(key)
+        self._seen_names.add(name_key)
+
+        if self._file is None:
+            return
+        try:
+            self._file.write(',\n  ' if self.stats.written else '\n  ')
+            self._file.write(f'{json.dumps(app_name.strip(), ensure_ascii=False)}: {json.dumps(normalized_path, ensure_ascii=False)}')
+            self.stats.written += 1
+        except OSError as e:
+            self._fail(e)
+
+    def add(self, priority: int, app_name: object, target_path: object) -> None:
+        """
+        Add one entry.
+
+        Args:
+            priority (int): Index of the source that found it, 0 is the most trusted
+            app_name (object): App name
+            target_path (object): Path to the app's executable
+        """
+        if priority == self._current:
+            self._merge(app_name, target_path)
+            return
+        pending = self._pending[priority]
+        pending.append((app_name, target_path))
+        if len(pending) >= self.pending_limit:
+            self._spill(priority)
+
+    def _spill_path(self, priority: int) -> str:
+        return f'{self.output_file}.pending{priority}.tmp'
+
+    def _spill(self, priority: int) -> None:
+        # Append the waiting entries of a source to its spill file, one JSON pair per line
+        path = self._spill_path(priority)
+        try:
+            # A file left by an earlier run is overwritten on the first spill
+            with open(path, 'a' if self._spilled[priority] else 'w', encoding='utf-8') as f:
+                for entry in self._pending[priority]:
+                    f.write(json.dumps(entry, ensure_ascii=False))
+                    f.write('\n')
+        except (OSError, TypeError, ValueError) as e:
+            # The entries stay in memory
+            logger.error(f'Error in `CatalogBuilder._spill`, entries of source {priority} are kept in memory - {e}')
+            return
+        self._spilled[priority] = path
+        self._pending[priority] = []
+
+    def _merge_waiting(self, priority: int) -> None:
+        # Merge the waiting entries of a source, the spilled ones first
+        path, self._spilled[priority] = self._spilled[priority], None
+        if path is not None:
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        app_name, target_path = json.loads(line)
+                        self._merge(app_name, target_path)
+            except (OSError, ValueError) as e:
+                logger.error(f'Error in `CatalogBuilder._merge_waiting`, spilled entries of source {priority} were not read completely - {e}')
+            self._remove_spill(path)
+        pending, self._pending[priority] = self._pending[priority], []
+        for app_name, target_path in pending:
+            self._merge(app_name, target_path)
+
+    def _remove_spill(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    def finish_source(self, priority: int) -> None:
+        """
+        Mark a source as finished, so the entries of the following sources can be merged.
+        """
+        self._finished[priority] = True
+        while self._current < len(self._finished) and self._finished[self._current]:
+            self._current += 1
+            if self._current < len(self._pending):
+                self._merge_waiting(self._current)
+
+    def close(self) -> DeduplicationStats:
+        """
+        Finish the catalog and put it in place of the old one. Sources that weren't marked finished
+        are merged anyway.
+
+        Returns:
+            DeduplicationStats: Counters of the run
+        """
+        for priority, finished in enumerate(self._finished):
+            if not finished:
+                self.finish_source(priority)
+
+        if self._file is None:
+            return self.stats
+        try:
+            self._file.write('\n}\n' if self.stats.written else '}\n')
+            self._file.close()
+            self._file = None
+            os.replace(self._temp_path, self.output_file)
+        except OSError as e:
+            self._fail(e)
+            return self.stats
+
+        logger.info(
+            f'Catalog {self.output_file} was written: {self.stats.written} apps, '
+            f'{self.stats.duplicates} duplicates and {self.stats.invalid} invalid entries dropped out of {self.stats.read}'
+        )
+        return self.stats
+
+def start_deduplication(sources: Iterable[str], output_file: str = None) -> DeduplicationStats:
+    """
+    Merge the scanner results into the application catalog.
+    The catalog is written to a temporary file first and replaces the old one only when complete.
+
+    Args:
+        sources (Iterable[str]): JSON files with {app name: target path}, most trusted first
+        output_file (str): Catalog file to write, `config.APPS_CATALOG_FILE` if None
+
+    Returns:
+        DeduplicationStats: Counters of the run
+    """
+    sources = list(sources)
+    builder = CatalogBuilder(output_file, len(sources))
+    for priority, source in enumerate(sources):
+        if not os.path.exists(source):
+            logger.warning(f'Source {source} does not exist, it is skipped')
+        else:
+            try:
+                for app_name, target_path in iter_json_object(source):
+                    builder.add(priority, app_name, target_path)
+            except (OSError, ValueError) as e:
+                logger.error(f'Error in `start_deduplication`, source {source} was not read completely - {e}')
+        builder.finish_source(priority)
+    return builder.close()
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    start_deduplication(['result_of_shortcuts_scan.json', 'exe_apps_from_registry.json'])
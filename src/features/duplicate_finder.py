@@ -0,0 +1,201 @@
+import os
+import mmap
+import time
+import hashlib
+import logging
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from src.core import config
+from src.features.reorganizer import iter_files
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+"""
+duplicate_finder.py
+
+Finds files with the same content in a folder and its subfolders, in three rounds:
+    1. Size - files are listed by `reorganizer.iter_files` and grouped by size, a file with a unique size
+       has no duplicate and is never opened.
+    2. Quick hash - the first and the last block (`config.duplicate_block_size`) of the remaining files are hashed.
+       For files not bigger than two blocks this already is the whole content.
+    3. Full hash - only files that still share a quick hash are hashed completely.
+Files are hashed on a thread pool (hashlib releases the GIL for big buffers) through memory-mapped reads.
+Empty files are ignored.
+"""
+
+@dataclass
+class DuplicateGroup:
+    """
+    Files with the same content.
+
+    Attributes:
+        size (int): Size of every file, bytes
+        paths (List[str]): Paths relative to the searched folder, sorted
+    """
+    size: int
+    paths: List[str] = field(default_factory=list)
+
+    @property
+    def wasted(self) -> int:
+        """
+        Bytes taken by all copies but one.
+        """
+        return self.size * (len(self.paths) - 1)
+
+@dataclass
+class DuplicateStats:
+    """
+    Counters of a search, to see how much every round filtered.
+
+    Attributes:
+        files (int): Listed files
+        size_candidates (int): Files sharing their size with another file
+        quick_hashed (int): Files whose first and last blocks were hashed
+        full_hashed (int): Files that were hashed completely
+    """
+    files: int = 0
+    size_candidates: int = 0
+    quick_hashed: int = 0
+    full_hashed: int = 0
+
+def _hash_mapped(path: str, size: int, block_size: Optional[int]) -> bytes:
+    """
+    Hash a file through a memory mapping; only its first and last `block_size` bytes if `block_size` is given.
+    """
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as file, mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+        view = memoryview(mapped)
+        try:
+            if block_size is None or size <= 2 * block_size:
+                digest.update(view)
+            else:
+                digest.update(view[:block_size])
+                digest.update(view[size - block_size:])
+        finally:
+            view.release()
+    return digest.digest()
+
+def quick_hash(path: str, size: int) -> bytes:
+    """
+    Hash of the first and the last block of a file.
+    """
+    return _hash_mapped(path, size, config.duplicate_block_size)
+
+def full_hash(path: str, size: int) -> bytes:
+    """
+    Hash of the whole file.
+    """
+    return _hash_mapped(path, size, None)
+
+def _regroup(groups: List[DuplicateGroup], root: str, hash_function: Callable[[str, int], bytes],
+             executor: ThreadPoolExecutor) -> List[DuplicateGroup]:
+    """
+    Split every group by the hashes of its files, keeping only the parts with more than one file.
+    Files that can't be read are dropped.
+    """
+    def hash_file(item: tuple) -> tuple:
+        size, relative_path = item
+        try:
+            return size, relative_path, hash_function(os.path.join(root, relative_path), size)
+        except (OSError, ValueError) as e:
+            logger.warning(f'{relative_path} is skipped - {e}')
+            return size, relative_path, None
+
+    items = [(group.size, relative_path) for group in groups for relative_path in group.paths]
+    by_hash: Dict[tuple, DuplicateGroup] = {}
+    for size, relative_path, file_hash in executor.map(hash_file, items):
+        if file_hash is not None:
+            by_hash.setdefault((size, file_hash), DuplicateGroup(size)).paths.append(relative_path)
+    return [group for group in by_hash.values() if len(group.paths) > 1]
+
+def find_duplicates(folder: str, workers: int = None, stats: DuplicateStats = None) -> List[DuplicateGroup]:
+    """
+    Find groups of files with the same content in `folder` and its subfolders.
+
+    Args:
+        folder (str): Folder to search
+        workers (int): Number of hashing threads, `config.duplicate_hash_workers` if None
+        stats (DuplicateStats): Filled with the counters of the search, if given
+
+    Returns:
+        List[DuplicateGroup]: Groups, the most wasted space first
+    """
+    root = str(Path(folder))
+    stats = stats if stats is not None else DuplicateStats()
+
+    by_size = defaultdict(list)
+    for relative_path, entry in iter_files(root, recursive=True):
+        stats.files += 1
+        try:
+            size = entry.stat(follow_symlinks=False).st_size
+        except OSError as e:
+            logger.warning(f'{entry.path} is skipped - {e}')
+            continue
+        if size:
+            by_size[size].append(relative_path)
+
+    groups = [DuplicateGroup(size, paths) for size, paths in by_size.items() if len(paths) > 1]
+    stats.size_candidates = sum(len(group.paths) for group in groups)
+
+    with ThreadPoolExecutor(max_workers=workers or config.duplicate_hash_workers, thread_name_prefix='Duplicate Finder') as executor:
+        stats.quick_hashed = stats.size_candidates
+        groups = _regroup(groups, root, quick_hash, executor)
+
+        # The quick hash of small files covers all their content
+        complete = [group for group in groups if group.size <= 2 * config.duplicate_block_size]
+        partial = [group for group in groups if group.size > 2 * config.duplicate_block_size]
+        stats.full_hashed = sum(len(group.paths) for group in partial)
+        groups = complete + _regroup(partial, root, full_hash, executor)
+
+    for group in groups:
+        group.paths.sort()
+    groups.sort(key=lambda group: (-group.wasted, group.paths[0]))
+    return groups
+
+def _format_size(size: int) -> str:
+    for unit in ('bytes', 'KB', 'MB', 'GB'):
+        if size < 1024 or unit == 'GB':
+            return f'{size:.0f} {unit}' if unit == 'bytes' else f'{size:.1f} {unit}'
+        size /= 1024
+
+def find_duplicates_in_folder(folder: str = '') -> Optional[List[DuplicateGroup]]:
+    """
+    Search `folder` for duplicates and describe the result in `config.message_to_display`
+    (the biggest groups are listed).
+
+    Args:
+        folder (str): Folder to search
+
+    Returns:
+        Optional[List[DuplicateGroup]]: Groups of duplicates, None if the folder couldn't be searched
+    """
+    try:
+        start = time.time()
+        stats = DuplicateStats()
+        groups = find_duplicates(folder, stats=stats)
+    except OSError as e:
+        logger.error(f'Error in find_duplicates_in_folder, error - {e}')
+        config.message_to_display = f'Folder {folder} was not searched for duplicates - {e}'
+        return None
+
+    logger.info(f'Duplicate search is completed in {time.time() - start:.2f} seconds: {stats}')
+    if not groups:
+        config.message_to_display = f'There are no duplicate files in {folder} ({stats.files} files checked)'
+        return groups
+
+    wasted = sum(group.wasted for group in groups)
+    lines = [f'{len(groups)} groups of duplicate files were found in {folder}, '
+             f'deleting the copies would free {_format_size(wasted)}. The biggest ones:']
+    for group in groups[:10]:
+        lines.append(f'{_format_size(group.size)} x {len(group.paths)}: ' + ', '.join(group.paths))
+    config.message_to_display = '\n'.join(lines)
+    return groups
+
+if __name__ == '__main__':
+    folder = input('Write the directory to search for duplicates:\n')
+    find_duplicates_in_folder(folder)
+    print(config.message_to_display)
@@ -1,6 +1,189 @@
 from pathlib import Path
 from difflib import SequenceMatcher
+from concurrent.futures import ThreadPoolExecutor
+from stat import S_ISDIR
+from collections import deque
+from typing import Iterable, Iterator, Optional, Tuple
+import os
 import json
+import logging
+import threading
+from src.core import config
+
+logger = logging.getLogger(__name__)
+
+class ExeResolutionCache:
+    """
+    The .exe chosen for each (install directory, app name), together with the directory's mtime.
+    A directory's mtime changes when files are added to, removed from or renamed in it,
+    so while it's unchanged the earlier result is still right.
+
+    Stored as {install directory: [mtime_ns, {app name: .exe path or None}]}.
+
+    Attributes:
+        path (str): JSON file the cache is kept in
+    """
+
+    def __init__(self, path: str = None):
+        self.path = path or config.EXE_RESOLUTION_CACHE_FILE
+        self._entries: Optional[dict] = None
+        self._changed = False
+        self._lock = threading.Lock()
+
+    def _load(self) -> dict:
+        # Called with the lock held
+        if self._entries is None:
+            self._entries = {}
+            if os.path.exists(self.path):
+                try:
+                    with open(self.path, 'r', encoding='utf-8') as f:
+                        self._entries = json.load(f)
+                except (OSError, ValueError) as e:
+                    logger.error(f'Error in `ExeResolutionCache`, cache is unreadable and will be rebuilt - {e}')
+        return self._entries
+
+    def get(self, directory: str, mtime: int, name: str) -> Tuple[bool, Optional[str]]:
+        """
+        Returns:
+            Tuple[bool, Optional[str]]: (True, result) if the result is cached and still valid, else (False, None)
+        """
+        with self._lock:
+            entry = self._load().get(directory)
+            if entry is not None and entry[0] == mtime and name in entry[1]:
+                return True, entry[1][name]
+        return False, None
+
+    def put(self, directory: str, mtime: int, name: str, exe_path: Optional[str]) -> None:
+        with self._lock:
+            entries = self._load()
+            entry = entries.get(directory)
+            if entry is None or entry[0] != mtime:
+                # Results for an older state of the directory are useless
+                entry = entries[directory] = [mtime, {}]
+            entry[1][name] = exe_path
+            self._changed = True
+
+    def discard(self, directory: str) -> None:
+        with self._lock:
+            if self._load().pop(directory, None) is not None:
+                self._changed = True
+
+    def save(self) -> None:
+        """
+        Write the cache if something changed. The file is replaced atomically.
+        """
+        with self._lock:
+            if not self._changed:
+                return
+            temp_path = f'{self.path}.tmp'
+            try:
+                with open(temp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self._entries, f, separators=(',', ':'), ensure_ascii=False)
+                os.replace(temp_path, self.path)
+            except OSError as e:
+                logger.error(f'Error in `ExeResolutionCache.save`, error - {e}')
+                return
+            self._changed = False
+
+# Cache shared by all scans, created on first use
+_cache: Optional[ExeResolutionCache] = None
+_cache_lock = threading.Lock()
+
+def get_cache() -> ExeResolutionCache:
+    """
+    Return the shared cache for `config.EXE_RESOLUTION_CACHE_FILE`.
+    """
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ExeResolutionCache()
+        return _cache
+
+def resolve_exe(name: str, path: str, cache: ExeResolutionCache = None) -> Optional[str]:
+    """
+    Find the exact .exe path of one app.
+
+    Args:
+        name (str): App name, used to choose between several .exe files
+        path (str): .exe file or install directory of the app
+        cache (ExeResolutionCache): Results of earlier scans, `get_cache()` if None
+
+    Returns:
+        Optional[str]: Path to the .exe file, None if there is none
+    """
+    path_obj = Path(path)
+    
+    # If path is already a .exe file
+    if path_obj.suffix.lower() == '.exe' and path_obj.exists():
+        return str(path_obj)
+
+    cache = cache or get_cache()
+    directory = os.path.normcase(os.path.abspath(path))
+    try:
+        stat = os.stat(path)
+    except OSError:
+        cache.discard(directory)
+        return None
+        
+    # If path is a directory, search for .exe files
+    if not S_ISDIR(stat.st_mode):
+        return None
+
+    cached, exe_path = cache.get(directory, stat.st_mtime_ns, name)
+    if cached:
+        return exe_path
+
+    exe_path = None
+    # Look for .exe files in the directory
+    exe_files = list(path_obj.glob('*.exe'))
+    
+    if exe_files:
+        # If multiple .exe files found, use similarity to find the best match
+        if len(exe_files) > 1:
+            best_match = find_best_exe_match(name, exe_files)
+            if best_match:
+                exe_path = str(best_match)
+        else:
+            # Single .exe file found
+            exe_path = str(exe_files[0])
+
+    cache.put(directory, stat.st_mtime_ns, name, exe_path)
+    return exe_path
+
+def resolve_exes(apps: Iterable[Tuple[str, str]], cache: ExeResolutionCache = None,
+                 workers: int = None) -> Iterator[Tuple[str, Optional[str]]]:
+    """
+    Resolve many apps on a thread pool, yielding (app name, .exe path or None) in input order.
+    `apps` is read lazily: at most `config.exe_resolution_window` apps per worker are resolving
+    or waiting to be yielded, so results are streamed while the input is still being discovered.
+    The cache is saved when all apps are resolved.
+
+    Args:
+        apps (Iterable[Tuple[str, str]]): (app name, .exe file or install directory) pairs
+        cache (ExeResolutionCache): Results of earlier scans, `get_cache()` if None
+        workers (int): Number of threads, `config.exe_resolution_workers` if None
+    """
+    cache = cache or get_cache()
+    workers = workers or config.exe_resolution_workers
+    window = max(1, workers * config.exe_resolution_window)
+    in_flight = deque()
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='Exe Resolution') as executor:
+            try:
+                for name, path in apps:
+                    in_flight.append((name, executor.submit(resolve_exe, name, path, cache)))
+                    if len(in_flight) >= window:
+                        name, future = in_flight.popleft()
+                        yield name, future.result()
+                while in_flight:
+                    name, future = in_flight.popleft()
+                    yield name, future.result()
+            finally:
+                # The consumer stopped early, don't resolve the rest
+                for _, future in in_flight:
+                    future.cancel()
+    finally:
+        cache.save()
 
 def find_exe_files(apps: dict) -> dict:
     """
@@ -9,30 +192,12 @@ def find_exe_files(apps: dict) -> dict:
     """
     exe_apps = {}
     
-    for name, path in apps.items():
-        path_obj = Path(path)
-        
-        # If path is already a .exe file
-        if path_obj.suffix.lower() == '.exe' and path_obj.exists():
-            exe_apps[name] = str(path_obj)
-            continue
-            
-        # If path is a directory, search for .exe files
-        if path_obj.is_dir():
-            # Look for .exe files in the directory
-            exe_files = list(path_obj.glob('*.exe'))
-            
-            if exe_files:
-                # If multiple .exe files found, use similarity to find the best match
-                if len(exe_files) > 1:
-                    best_match = find_best_exe_match(name, exe_files)
-                    if best_match:
-                        exe_apps[name] = str(best_match)
-                else:
-                    # Single .exe file found
-                    exe_apps[name] = str(exe_files[0])
+    for name, exe_path in resolve_exes(apps.items()):
+        if exe_path:
+            exe_apps[name] = exe_path
     
     save_exe_apps_to_config(exe_apps)
+    return exe_apps
 
 def find_best_exe_match(app_name: str, exe_files: list) -> Path:
     """
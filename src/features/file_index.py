@@ -0,0 +1,301 @@
+import os
+import gzip
+import json
+import time
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Optional, Tuple
+from src.core import config
+from src.features import prune_rules
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+"""
+file_index.py
+
+On-disk filename index used by the program scanner. The index keeps the file listing of every
+directory under the search roots, so "open X" / "delete X" can be answered without walking whole drives.
+
+Every directory is stored together with its mtime, so the index can be refreshed incrementally:
+a directory's mtime changes only when its direct children are added, removed or renamed,
+so only those directories have to be listed again.
+
+Folders pruned by the scanner's rules (see `prune_rules.py`) are not indexed.
+
+Layout of the stored file (gzip compressed JSON):
+	{
+		'version': 2,
+		'updated': 1700000000.0,
+		'rules': fingerprint of the prune rules,
+		'roots': {root: {directory: [mtime_ns, [file names], [folder names]]}}
+	}
+"""
+
+INDEX_VERSION: int = 2
+
+# In-memory copy of the index, loaded lazily from `config.FILE_INDEX_FILE`
+_index: Optional[dict] = None
+_index_lock = threading.Lock()
+
+# Only one build/refresh may run at a time
+_build_lock = threading.Lock()
+
+# Set by `stop_refresh()` when the application is closing. The index has its own flag, so scans that
+# finish (or `config.stop_scaning`) never cut a build short and leave a partial index behind
+_stop = threading.Event()
+
+@dataclass
+class RefreshStats:
+	"""
+	Result of an index refresh.
+
+	Attributes:
+		reread (int): Directories that were listed again (new or changed mtime)
+		skipped (int): Unchanged directories, whose stored listing was reused
+		removed (int): Directories that don't exist anymore
+	"""
+	reread: int = 0
+	skipped: int = 0
+	removed: int = 0
+
+def load_index() -> Optional[dict]:
+	"""
+	Load the filename index from disk. The index is read only once and kept in memory afterwards.
+
+	Returns:
+		Optional[dict]: The index, None if it's missing, unreadable or has an old format
+	"""
+	global _index
+	with _index_lock:
+		if _index is not None:
+			return _index
+
+		if not os.path.exists(config.FILE_INDEX_FILE):
+			return None
+
+		try:
+			with gzip.open(config.FILE_INDEX_FILE, 'rt', encoding='utf-8') as file:
+				data: dict = json.load(file)
+		except (OSError, ValueError) as e:
+			logger.error(f'Error in `load_index`, filename index is unreadable - {e}')
+			return None
+
+		if data.get('version') != INDEX_VERSION:
+			logger.info('Filename index has an old format, it will be rebuilt')
+			return None
+
+		_index = data
+		return _index
+
+def save_index(data: dict) -> None:
+	"""
+	Write the index to `config.FILE_INDEX_FILE`. The file is replaced atomically,
+	so a crash during saving never leaves a broken index behind.
+
+	Args:
+		data (dict): The index to save
+	"""
+	global _index
+	temp_path = f'{config.FILE_INDEX_FILE}.tmp'
+	try:
+		with gzip.open(temp_path, 'wt', encoding='utf-8', compresslevel=6) as file:
+			json.dump(data, file, separators=(',', ':'), ensure_ascii=False)
+		os.replace(temp_path, config.FILE_INDEX_FILE)
+	except OSError as e:
+		logger.error(f'Error in `save_index`, error - {e}')
+		return
+
+	with _index_lock:
+		_index = data
+	logger.info('Filename index was saved')
+
+def age() -> float:
+	"""
+	Seconds since the index was last built or refreshed, infinity if there is no index.
+	"""
+	data = load_index()
+	if data is None:
+		return float('inf')
+	return time.time() - data['updated']
+
+def covers(root: str) -> bool:
+	"""
+	Check whether the index can answer searches under `root`.
+
+	Args:
+		root (str): Search root (drive or one of `config.paths_for_searching`)
+
+	Returns:
+		bool: True if the index exists, isn't stale and contains `root`
+	"""
+	data = load_index()
+	if data is None or age() > config.file_index_max_age:
+		return False
+	return root in data['roots']
+
+def iter_listings(root: str) -> Iterator[Tuple[str, List[str]]]:
+	"""
+	Yield (directory, file names) pairs stored for `root`, parents before their subdirectories.
+
+	Args:
+		root (str): Search root
+	"""
+	data = load_index()
+	if data is None:
+		return
+	for directory, (_, files, _) in data['roots'].get(root, {}).items():
+		yield directory, files
+
+def _list_directory(directory: str, is_root: bool) -> Tuple[List[str], List[str]]:
+	"""
+	List files and folders of one directory.
+	Top level items from `config.useless_content` are skipped, like the scanner does.
+
+	Returns:
+		Tuple[List[str], List[str]]: (file names, folder names), empty if the directory is inaccessible
+	"""
+	files, folders = [], []
+	try:
+		with os.scandir(directory) as entries:
+			for entry in entries:
+				if is_root and entry.name in config.useless_content:
+					continue
+				try:
+					if entry.is_dir(follow_symlinks=False):
+						folders.append(entry.name)
+					else:
+						files.append(entry.name)
+				except OSError:
+					continue
+	except OSError as e:
+		logger.debug(f'Directory {directory} was not listed - {e}')
+	return files, folders
+
+def _refresh_root(root: str, previous: dict, stats: RefreshStats, prune_engine: prune_rules.PruneEngine) -> Optional[dict]:
+	"""
+	Walk one search root, reusing the stored listing of every directory whose mtime didn't change.
+
+	Args:
+		root (str): Search root
+		previous (dict): Stored listings of this root, empty for a full build
+		stats (RefreshStats): Counters to update
+		prune_engine (PruneEngine): Rules for folders that are not indexed
+
+	Returns:
+		Optional[dict]: {directory: [mtime_ns, files, folders]}, None if the walk was interrupted
+	"""
+	listings: dict = {}
+	stack: List[Tuple[str, int]] = [(root, 0)]
+	while stack:
+		if _stop.is_set():
+			return None
+
+		directory, depth = stack.pop()
+		try:
+			mtime = os.stat(directory).st_mtime_ns
+		except OSError:
+			continue
+
+		stored = previous.get(directory)
+		if stored is not None and stored[0] == mtime:
+			files, folders = stored[1], stored[2]
+			stats.skipped += 1
+		else:
+			files, folders = _list_directory(directory, is_root=directory == root)
+			prune_engine.prune(directory, folders, len(files), depth)
+			stats.reread += 1
+
+		listings[directory] = [mtime, files, folders]
+		# Reversed, so folders are visited in listing order (like `os.walk`)
+		stack.extend((os.path.join(directory, folder), depth + 1) for folder in reversed(folders))
+
+	stats.removed += sum(1 for directory in previous if directory not in listings)
+	return listings
+
+def _lower_thread_priority() -> None:
+	"""
+	Lower CPU and disk priority of the calling thread, so index refreshes don't slow down the UI.
+	"""
+	try:
+		if os.name == 'nt':
+			import ctypes
+			THREAD_MODE_BACKGROUND_BEGIN = 0x00010000
+			kernel32 = ctypes.windll.kernel32
+			kernel32.SetThreadPriority(kernel32.GetCurrentThread(), THREAD_MODE_BACKGROUND_BEGIN)
+		else:
+			# On Linux a thread id can be used as a process id for priorities
+			os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 19)
+	except (AttributeError, OSError) as e:
+		logger.warning(f'Priority of index thread was not lowered - {e}')
+
+def refresh_index(roots: Iterable[str], rebuild: bool = False) -> Optional[RefreshStats]:
+	"""
+	Bring the filename index up to date and save it.
+	Only directories with a changed mtime are listed again, without an index everything is listed.
+
+	Args:
+		roots (Iterable[str]): Search roots to index
+		rebuild (bool): If True, ignore the stored index and list every directory
+
+	Returns:
+		Optional[RefreshStats]: How many directories were re-read/skipped/removed,
+			None if the refresh was interrupted or is already running
+	"""
+	if not _build_lock.acquire(blocking=False):
+		logger.info('Filename index is already being refreshed')
+		return None
+	try:
+		start = time.time()
+		prune_engine = prune_rules.PruneEngine.from_config()
+		previous = (None if rebuild else load_index()) or {'roots': {}}
+		# Stored listings are already pruned, they can't be reused with other rules
+		if previous.get('rules') != prune_engine.fingerprint():
+			previous = {'roots': {}}
+		logger.info('Refreshing filename index' if previous['roots'] else 'Building filename index')
+
+		stats = RefreshStats()
+		data = {'version': INDEX_VERSION, 'updated': start, 'rules': prune_engine.fingerprint(), 'roots': {}}
+		for root in roots:
+			if not os.path.exists(root) or not os.access(root, os.R_OK):
+				logger.warning(f'Directory {root} is not accessible, it will not be indexed')
+				continue
+			listings = _refresh_root(root, previous['roots'].get(root, {}), stats, prune_engine)
+			if listings is None:
+				logger.info('Refreshing of filename index was interrupted')
+				return None
+			data['roots'][root] = listings
+
+		save_index(data)
+		logger.info(
+			f'Filename index was refreshed in {time.time() - start:.2f} seconds: '
+			f'{stats.reread} directories re-read, {stats.skipped} skipped, {stats.removed} removed'
+		)
+		prune_engine.log_counts()
+		return stats
+	finally:
+		_build_lock.release()
+
+def stop_refresh() -> None:
+	"""
+	Interrupt a running build or refresh (nothing is saved), e.g. when the application is closing.
+	"""
+	_stop.set()
+
+def _background_refresh(roots: List[str]) -> None:
+	_lower_thread_priority()
+	refresh_index(roots)
+
+def refresh_index_in_background(roots: Iterable[str]) -> Optional[threading.Thread]:
+	"""
+	Start `refresh_index` in a low priority daemon thread, unless a refresh is already running.
+
+	Returns:
+		Optional[threading.Thread]: The started thread, None if nothing was started
+	"""
+	if _build_lock.locked():
+		return None
+	thread = threading.Thread(target=_background_refresh, args=[list(roots)], name='File Index Thread', daemon=True)
+	thread.start()
+	return thread
@@ -0,0 +1,363 @@
+from PIL import Image
+import os
+import re
+import time
+import logging
+from dataclasses import dataclass, field
+from typing import List, Optional, Tuple, Union
+from src.core import config
+from src.features import image_processing
+
+logger = logging.getLogger(__name__)
+
+"""
+image_pipeline.py
+
+Chains of image operations ("resize to 800x600 and gray this photo"), executed on one decoded image.
+
+The chain is planned before anything is decoded, so steps are fused instead of being executed one by one:
+	- crops, resizes and thumbnails in a row become one resampling (`Image.resize` with a source box),
+	  the image is resampled once no matter how many of them there are
+	- rotations by multiples of 90 degrees in a row become one transposition
+	- a JPEG that is scaled down first is decoded at a reduced scale (`Image.draft`)
+	- a grayscale step at the end is done while saving, strip by strip (see `image_processing.save_grayscale`)
+	- a format conversion only changes how the result is saved
+
+Intermediate images are never written to disk, the source is decoded exactly once.
+"""
+
+# Formats that can be produced by the 'convert' operation, by extension
+FORMATS = {
+	'png': 'PNG', 'jpg': 'JPEG', 'jpeg': 'JPEG', 'webp': 'WEBP',
+	'bmp': 'BMP', 'tif': 'TIFF', 'tiff': 'TIFF', 'gif': 'GIF'
+}
+
+# Shown when no operation is understood in a message
+SUPPORTED_OPERATIONS = (
+	'resize to W x H, resize N%, crop L T R B, rotate [degrees], gray (or black and white), '
+	f'thumbnail [max side], convert to {"/".join(FORMATS)}'
+)
+
+# Formats that can't store transparency, images are flattened to RGB/L for them
+_NO_ALPHA_FORMATS = {'JPEG', 'BMP'}
+
+# Added to the name of the result, per operation
+_PREFIXES = {
+	'resize': 'resized', 'scale': 'resized', 'crop': 'cropped', 'rotate': 'rotated',
+	'grayscale': 'gray', 'thumbnail': 'thumbnail', 'convert': 'converted'
+}
+
+@dataclass
+class ImageOperation:
+	"""
+	One requested operation.
+
+	Attributes:
+		name (str): 'resize' (width, height), 'scale' (percent), 'crop' (left, top, right, bottom), 'rotate' (degrees counterclockwise),
+			'grayscale' (), 'thumbnail' (max side) or 'convert' (extension, e.g. 'png')
+		args (tuple): Arguments of the operation
+	"""
+	name: str
+	args: tuple = ()
+
+@dataclass
+class _Step:
+	"""
+	Planned step, after fusing.
+
+	Attributes:
+		kind (str): 'resample' (size, box), 'transpose' (method), 'rotate' (degrees), 'grayscale' ()
+		args (tuple): Arguments of the step
+	"""
+	kind: str
+	args: tuple = ()
+
+@dataclass
+class Plan:
+	"""
+	Fused operations, ready to be executed.
+
+	Attributes:
+		steps (List[_Step]): Pixel operations, in order
+		output_format (Optional[str]): Extension of the result, None to keep the source one
+		source_size (Tuple[int, int]): Size of the image the plan was made for
+		rest (List[ImageOperation]): Operations planned only after `steps` are executed
+			(they follow a free rotation, whose resulting size isn't known in advance)
+	"""
+	steps: List[_Step] = field(default_factory=list)
+	output_format: Optional[str] = None
+	source_size: Tuple[int, int] = (0, 0)
+	rest: List[ImageOperation] = field(default_factory=list)
+
+_TRANSPOSES = {
+	90: Image.Transpose.ROTATE_90,
+	180: Image.Transpose.ROTATE_180,
+	270: Image.Transpose.ROTATE_270
+}
+
+def plan_operations(operations: List[ImageOperation], size: Tuple[int, int]) -> Plan:
+	"""
+	Fuse a chain of operations for an image of the given size.
+
+	Args:
+		operations (List[ImageOperation]): Requested operations, in order
+		size (Tuple[int, int]): (width, height) of the source image
+
+	Raises:
+		ValueError: If an operation is unknown or its arguments don't fit the image
+	"""
+	plan = Plan(source_size=size)
+	# Pending resampling: region of the current image (box) and the size it's scaled to
+	width, height = size
+	box: Optional[Tuple[float, float, float, float]] = None
+	target = size
+	degrees = 0
+
+	def flush_geometry() -> None:
+		nonlocal box, target, degrees, width, height
+		if box is not None:
+			# A box of the whole image at its own size changes nothing
+			if box != (0.0, 0.0, float(width), float(height)) or target != (width, height):
+				plan.steps.append(_Step('resample', (target, box)))
+			width, height = target
+			box = None
+		if degrees % 360:
+			if degrees % 90 == 0:
+				plan.steps.append(_Step('transpose', (_TRANSPOSES[degrees % 360],)))
+				if degrees % 180:
+					width, height = height, width
+			else:
+				plan.steps.append(_Step('rotate', (degrees % 360,)))
+				width, height = None, None
+		degrees = 0
+
+	for index, operation in enumerate(operations):
+		if operation.name in ('resize', 'scale', 'crop', 'thumbnail'):
+			if degrees % 360:
+				flush_geometry()
+			if width is None:
+				# Size after a free rotation is only known after it's executed, the rest is planned then
+				plan.rest = operations[index:]
+				for later in plan.rest:
+					if later.name == 'convert':
+						plan.output_format = later.args[0].lower().lstrip('.')
+				return plan
+			if box is None:
+				box = (0.0, 0.0, float(width), float(height))
+				target = (width, height)
+
+			if operation.name == 'resize':
+				target = tuple(max(1, int(value)) for value in operation.args)
+			elif operation.name == 'scale':
+				percent = operation.args[0] / 100
+				target = (max(1, round(target[0] * percent)), max(1, round(target[1] * percent)))
+			elif operation.name == 'thumbnail':
+				# Fit into a square, never enlarge (like `Image.thumbnail`)
+				scale = min(1.0, operation.args[0] / max(target))
+				target = (max(1, round(target[0] * scale)), max(1, round(target[1] * scale)))
+			else:
+				left, top, right, bottom = operation.args
+				if not (0 <= left < right <= target[0] and 0 <= top < bottom <= target[1]):
+					raise ValueError(f'Crop {operation.args} is outside of the image {target}')
+				# Crop coordinates are in the pending (scaled) image, map them back to the source box
+				scale_x = (box[2] - box[0]) / target[0]
+				scale_y = (box[3] - box[1]) / target[1]
+				box = (box[0] + left * scale_x, box[1] + top * scale_y, box[0] + right * scale_x, box[1] + bottom * scale_y)
+				target = (right - left, bottom - top)
+
+		elif operation.name == 'rotate':
+			if box is not None:
+				flush_geometry()
+			degrees += int(operation.args[0]) if operation.args else 90
+
+		elif operation.name == 'grayscale':
+			flush_geometry()
+			if not plan.steps or plan.steps[-1].kind != 'grayscale':
+				plan.steps.append(_Step('grayscale'))
+
+		elif operation.name == 'convert':
+			extension = operation.args[0].lower().lstrip('.')
+			if extension not in FORMATS:
+				raise ValueError(f'Format {extension} is not supported')
+			plan.output_format = extension
+
+		else:
+			raise ValueError(f'Unknown image operation {operation.name}')
+
+	flush_geometry()
+	return plan
+
+def _draft(img: Image.Image, plan: Plan) -> None:
+	"""
+	Let a JPEG decode at a reduced scale if the first step scales it down, adjusting the step's box.
+	"""
+	if img.format != 'JPEG' or not plan.steps or plan.steps[0].kind != 'resample':
+		return
+	(target_width, target_height), box = plan.steps[0].args
+	# The whole source must still be at least as big as the box needs to be after scaling
+	requested = (
+		max(1, int(target_width * img.width / (box[2] - box[0]))),
+		max(1, int(target_height * img.height / (box[3] - box[1])))
+	)
+	original_size = img.size
+	img.draft(img.mode, requested)
+	if img.size != original_size:
+		scale_x = img.width / original_size[0]
+		scale_y = img.height / original_size[1]
+		plan.steps[0] = _Step('resample', ((target_width, target_height), (box[0] * scale_x, box[1] * scale_y, box[2] * scale_x, box[3] * scale_y)))
+
+def _grayscale(img: Image.Image) -> Image.Image:
+	gray_array = image_processing.grayscale_array(img)
+	return Image.fromarray(gray_array, mode='LA' if gray_array.ndim == 3 else 'L')
+
+def execute_plan(img: Image.Image, plan: Plan, output_path: str) -> None:
+	"""
+	Run a plan on an opened image and save the result.
+
+	Args:
+		img (Image.Image): Source image, as opened (not loaded yet, so JPEGs can be drafted)
+		plan (Plan): Plan made for this image by `plan_operations`
+		output_path (str): Where to save the result, the format follows the extension
+	"""
+	_draft(img, plan)
+	output_format = FORMATS.get(os.path.splitext(output_path)[1].lower().lstrip('.'), img.format)
+
+	while True:
+		steps = plan.steps
+		# Grayscale as the last step is done while saving, without a gray copy in memory
+		gray_on_save = not plan.rest and bool(steps) and steps[-1].kind == 'grayscale'
+		if gray_on_save:
+			steps = steps[:-1]
+
+		for step in steps:
+			if step.kind == 'resample':
+				size, box = step.args
+				img = img.resize(size, Image.Resampling.LANCZOS, box=box)
+			elif step.kind == 'transpose':
+				img = img.transpose(step.args[0])
+			elif step.kind == 'rotate':
+				img = img.rotate(step.args[0], Image.Resampling.BICUBIC, expand=True)
+			elif step.kind == 'grayscale':
+				img = _grayscale(img)
+
+		if not plan.rest:
+			break
+		plan = plan_operations(plan.rest, img.size)
+
+	if gray_on_save:
+		image_processing.save_grayscale(img, output_path)
+		return
+
+	if output_format in _NO_ALPHA_FORMATS and img.mode not in ('RGB', 'L'):
+		img = img.convert('L' if img.mode in ('LA', 'I', 'I;16', '1') else 'RGB')
+	img.save(output_path, format=output_format)
+
+def result_path(image_path: str, operations: List[ImageOperation], output_format: Optional[str]) -> str:
+	"""
+	Path of the result: operation names are added to the name (e.g. 'resized_gray_photo.jpg'),
+	a format conversion changes the extension. The result is saved next to the source.
+	"""
+	prefixes = []
+	for operation in operations:
+		prefix = _PREFIXES.get(operation.name)
+		if prefix and prefix not in prefixes:
+			prefixes.append(prefix)
+	directory, file_name = os.path.split(image_path)
+	if output_format:
+		file_name = f'{os.path.splitext(file_name)[0]}.{output_format}'
+	return os.path.join(directory, '_'.join(prefixes + [file_name]))
+
+def run_pipeline(image_path: str, operations: List[ImageOperation]) -> str:
+	"""
+	Decode an image once, run the fused chain of operations on it and save the result.
+
+	Args:
+		image_path (str): Source image
+		operations (List[ImageOperation]): Operations, in order
+
+	Returns:
+		str: Path of the result
+	"""
+	with Image.open(image_path) as img:
+		plan = plan_operations(operations, img.size)
+		output_path = result_path(image_path, operations, plan.output_format)
+		execute_plan(img, plan, output_path)
+	return output_path
+
+def parse_operations(text: str) -> List[ImageOperation]:
+	"""
+	Find image operations in a user message, in the order they are mentioned, e.g.
+	"resize to 800x600, rotate 90 and make it gray, convert to png".
+
+	Understood: 'resize W x H' / 'resize N%', 'crop L T R B', 'rotate [degrees]', 'gray'/'grey'/'black and white',
+	'thumbnail [max side]', 'convert to FORMAT'.
+	"""
+	# Words between an operation and its numbers, without crossing into the next part of the message
+	words = r'[^\d,;.]*?'
+	patterns = [
+		('resize', rf'\bresize{words}(\d+)\s*[x×*]\s*(\d+)'),
+		('scale', rf'\b(?:resize|scale){words}(\d+)\s*%'),
+		('crop', r'\bcrop[^\d;.]*?(\d+)[\s,]+(\d+)[\s,]+(\d+)[\s,]+(\d+)'),
+		('rotate', r'\brotate(?:\s+(?:it\s+)?(?:by\s+)?(-?\d+))?'),
+		('grayscale', r'\bgr[ae]y|\bblack and white\b'),
+		('thumbnail', r'\bthumbnail(?:\s+(?:of\s+)?(\d+))?'),
+		('convert', rf'\bconvert\b[^,;.]*?\bto\s+\.?({"|".join(FORMATS)})\b'),
+	]
+	found = []
+	for name, pattern in patterns:
+		for match in re.finditer(pattern, text, re.IGNORECASE):
+			groups = match.groups()
+			if name == 'resize':
+				operation = ImageOperation('resize', (int(groups[0]), int(groups[1])))
+			elif name == 'scale':
+				operation = ImageOperation('scale', (int(groups[0]),))
+			elif name == 'crop':
+				operation = ImageOperation('crop', tuple(int(group) for group in groups))
+			elif name == 'rotate':
+				operation = ImageOperation('rotate', (int(groups[0]) if groups[0] else 90,))
+			elif name == 'thumbnail':
+				operation = ImageOperation('thumbnail', (int(groups[0]) if groups[0] else 256,))
+			elif name == 'convert':
+				operation = ImageOperation('convert', (groups[0].lower(),))
+			else:
+				operation = ImageOperation('grayscale')
+			found.append((match.start(), operation))
+
+	# "resize 50%" and "resize 800x600" may both match "resize", keep the one with a size
+	operations = []
+	for position, operation in sorted(found, key=lambda item: item[0]):
+		if operation.name == 'scale' and any(other.name == 'resize' and other_position == position for other_position, other in found):
+			continue
+		operations.append(operation)
+	return operations
+
+def process_image(request: Union[str, Tuple[str, str]]) -> str:
+	"""
+	Entry point of the 'image processing' task: run the operations of a user message on an image.
+	Runs in the task's worker thread, the UI isn't blocked.
+
+	Args:
+		request (Union[str, Tuple[str, str]]): (image path, user message), or only an image path to grayscale it
+	"""
+	image_path, text = (request, 'gray') if isinstance(request, str) else request
+	try:
+		logger.info('Image processing is started')
+		start = time.time()
+		operations = parse_operations(text)
+		if not operations:
+			# The pic is left as it is, e.g. "convert it to pdf" or "crop the image" without a box
+			logger.info(f'No image operation was understood in "{text}"')
+			config.message_to_display = f'I did not understand what to do with the pic, it was left as it is. Supported operations: {SUPPORTED_OPERATIONS}'
+			return
+		if [operation.name for operation in operations] == ['grayscale']:
+			# Plain grayscaling keeps its own path (progress reporting, strip-wise saving)
+			return image_processing.grayscaling_image(image_path)
+
+		output_path = run_pipeline(image_path, operations)
+		logger.info(f'Image processing is over in {time.time() - start:.2f} seconds, result - {output_path}')
+
+		config.new_image_path = output_path
+		config.message_to_display = f'Pic was processed ({", ".join(operation.name for operation in operations)}), you can check {os.path.basename(output_path)} in the same directory where pic was'
+	except Exception as e:
+		logger.error(f'Error in process_image, error - {e}')
+		config.message_to_display = f'Pic was not processed - {e}'
@@ -1,55 +1,299 @@
 from PIL import Image
 import numpy as np
-import matplotlib.pyplot as plt
+import os
+import time
+import zlib
+import struct
 import logging
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Iterable, Iterator, List, Tuple, Union
 from src.core import config
 
 logger = logging.getLogger(__name__)
 
-def grayscaling_image(image_path: str) -> str:
-	try:
-		logger.info('Grayscaling is started')
+# Luminance weights of the R, G and B channels
+GRAY_WEIGHTS = (0.299, 0.587, 0.114)
 
-		img = Image.open(image_path)
+# Formats that can store a grayscale image with transparency ('LA')
+_ALPHA_FORMATS = {'.png', '.webp', '.tif', '.tiff'}
 
-		# Convert image to numpy array
-		img_array = np.array(img)
+def _luminance(rgb: np.ndarray) -> np.ndarray:
+	"""
+	Grayscale values of an (height, width, 3+) array, alpha and other extra channels are ignored.
+	Computed in float64 in the same order as `int(0.299 * r + 0.587 * g + 0.114 * b)`
+	and truncated the same way, so the result is identical to the per-pixel formula.
+	"""
+	gray = GRAY_WEIGHTS[0] * rgb[..., 0]
+	gray += GRAY_WEIGHTS[1] * rgb[..., 1]
+	gray += GRAY_WEIGHTS[2] * rgb[..., 2]
+	return gray.astype(np.uint8)
 
-		# Function that make convertation
-		def grayscaling(rgb):
-			# Calculate grayscale value
-			return int(0.299 * rgb[0] + 0.587 * rgb[1] + 0.114 * rgb[2])
+def _has_alpha(img: Image.Image) -> bool:
+	return img.mode in ('RGBA', 'LA', 'PA') or (img.mode == 'P' and 'transparency' in img.info)
 
-		# Create a new list for gray Image
-		gray_array = np.zeros((img_array.shape[0], img_array.shape[1]), dtype=np.uint8)
+def _working_mode(img: Image.Image) -> str:
+	"""
+	Mode the pixels are read in: palette indexes mean nothing by themselves, CMYK, YCbCr, 1-bit, 16-bit...
+	go through RGB. RGB(A) and L(A) are used as they are.
+	"""
+	if img.mode in ('RGB', 'RGBA', 'L', 'LA'):
+		return img.mode
+	return 'RGBA' if _has_alpha(img) else 'RGB'
 
-		# Iterate over each pixel and convert to grayscale
-		for i in range(img_array.shape[0]):
-			for j in range(img_array.shape[1]):
-				gray_array[i, j] = grayscaling(img_array[i, j])
+def _strip_rows(img: Image.Image, tile_budget: int) -> int:
+	"""
+	Number of rows converted at once, so that one strip needs at most `tile_budget` bytes.
+	"""
+	bands = Image.getmodebands(_working_mode(img))
+	# Cropped strip and its array (bands each), two float64 rows of the luminance and the uint8 result
+	row_bytes = img.width * (2 * bands + 8 + 8 + 2)
+	return max(1, tile_budget // row_bytes)
 
-		# Convert the numpy array back to an image
-		gray_image = Image.fromarray(gray_array, mode='L')
+def iter_grayscale_strips(img: Image.Image, tile_budget: int = None) -> Iterator[Tuple[int, np.ndarray]]:
+	"""
+	Convert an image into grayscale strip by strip.
 
-		old_image_name = image_path.split('/')[-1]
-		# Reaname an image to add gray_ to the beggining
-		new_image_name = 'gray_' + old_image_name
-		logger.info(f'New image name - {new_image_name}')
-		
-		# Take all objects before image name
-		not_full_path = image_path.split('/')[:-1]
+	Pillow decodes the source image once, when the first strip is cropped (some uncompressed formats
+	are memory mapped instead), so the decoded image is the lower bound of memory. Conversion itself
+	never needs more than `tile_budget` bytes on top of it.
 
-		# Create a full path with new image name
-		new_image_path = '/'.join(not_full_path) + '/' + new_image_name
-		logger.info(f'New full path - {new_image_path}')
+	Args:
+		img (Image.Image): Opened image
+		tile_budget (int): Working memory per strip in bytes, `config.image_tile_budget` if None
+
+	Yields:
+		Tuple[int, np.ndarray]: (first row, uint8 array (rows, width), or (rows, width, 2) with alpha)
+	"""
+	working_mode = _working_mode(img)
+	rows = _strip_rows(img, tile_budget or config.image_tile_budget)
+
+	for top in range(0, img.height, rows):
+		strip = img.crop((0, top, img.width, min(top + rows, img.height)))
+		if strip.mode != working_mode:
+			strip = strip.convert(working_mode)
+		strip_array = np.asarray(strip)
+
+		if working_mode in ('L', 'LA'):
+			# Already grayscale
+			yield top, strip_array
+		elif working_mode == 'RGBA':
+			yield top, np.dstack((_luminance(strip_array), strip_array[..., 3]))
+		else:
+			yield top, _luminance(strip_array)
+
+def grayscale_array(img: Image.Image, tile_budget: int = None) -> np.ndarray:
+	"""
+	Convert an image of any mode into grayscale.
+
+	Args:
+		img (Image.Image): Opened image
+		tile_budget (int): Working memory per strip in bytes, `config.image_tile_budget` if None
+
+	Returns:
+		np.ndarray: uint8 array (height, width), or (height, width, 2) with alpha if the image has transparency
+	"""
+	shape = (img.height, img.width, 2) if _has_alpha(img) else (img.height, img.width)
+	gray_array = np.empty(shape, dtype=np.uint8)
+	for top, strip in iter_grayscale_strips(img, tile_budget):
+		gray_array[top:top + len(strip)] = strip
+	return gray_array
+
+class _PngStripWriter:
+	"""
+	Writes an 8-bit grayscale PNG (with or without alpha) row strip by row strip,
+	so the converted image never has to be in memory as a whole.
+	"""
+
+	def __init__(self, path: str, width: int, height: int, alpha: bool):
+		self._file = open(path, 'wb')
+		self._compressor = zlib.compressobj(6)
+		self._previous = None
+		self._file.write(b'\x89PNG\r\n\x1a\n')
+		# Bit depth 8, color type 4 (gray + alpha) or 0 (gray)
+		self._chunk(b'IHDR', struct.pack('>IIBBBBB', width, height, 8, 4 if alpha else 0, 0, 0, 0))
+
+	def _chunk(self, chunk_type: bytes, data: bytes) -> None:
+		self._file.write(struct.pack('>I', len(data)) + chunk_type + data)
+		self._file.write(struct.pack('>I', zlib.crc32(chunk_type + data) & 0xffffffff))
+
+	def write(self, strip: np.ndarray) -> None:
+		rows = strip.reshape(strip.shape[0], -1)
+		# Filter "Up": difference to the previous row, compresses much better than raw photos
+		previous = np.vstack((self._previous if self._previous is not None else np.zeros_like(rows[:1]), rows[:-1]))
+		filtered = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.uint8)
+		filtered[:, 0] = 2
+		np.subtract(rows, previous, out=filtered[:, 1:])
+		self._previous = rows[-1:].copy()
+
+		data = self._compressor.compress(filtered.tobytes())
+		if data:
+			self._chunk(b'IDAT', data)
+
+	def close(self) -> None:
+		self._chunk(b'IDAT', self._compressor.flush())
+		self._chunk(b'IEND', b'')
+		self._file.close()
+
+def save_grayscale(img: Image.Image, output_path: str, tile_budget: int = None) -> None:
+	"""
+	Convert an image into grayscale and save it. PNG output is written strip by strip while converting,
+	other formats are collected into one 8-bit image (a third of an RGB image) and saved by Pillow.
+	Transparency is kept if the output format can store it.
+
+	Args:
+		img (Image.Image): Opened image
+		output_path (str): Where to save the grayscale image, the format follows the extension
+		tile_budget (int): Working memory per strip in bytes, `config.image_tile_budget` if None
+	"""
+	extension = os.path.splitext(output_path)[1].lower()
+	alpha = _has_alpha(img) and extension in _ALPHA_FORMATS
+
+	if extension == '.png':
+		writer = _PngStripWriter(output_path, img.width, img.height, alpha)
+		try:
+			for _, strip in iter_grayscale_strips(img, tile_budget):
+				writer.write(strip if alpha or strip.ndim == 2 else strip[..., 0])
+		except Exception:
+			# Don't leave a truncated image behind
+			writer.close()
+			os.remove(output_path)
+			raise
+		writer.close()
+		return
+
+	gray_image = Image.new('LA' if alpha else 'L', img.size)
+	for top, strip in iter_grayscale_strips(img, tile_budget):
+		if strip.ndim == 3 and not alpha:
+			strip = strip[..., 0]
+		gray_image.paste(Image.fromarray(np.ascontiguousarray(strip)), (0, top))
+	gray_image.save(output_path)
 
-		gray_image.save(new_image_path)
+@dataclass
+class GrayscalingProgress:
+	"""
+	One finished image of a grayscaling run, put into `config.grayscaling_progress`.
+
+	Attributes:
+		done (int): Images finished so far, including this one
+		total (int): Images of the run
+		image_path (str): The source image
+		new_image_path (str): The grayscale copy, '' if the conversion failed
+		error (str): Why the conversion failed, '' if it didn't
+	"""
+	done: int
+	total: int
+	image_path: str
+	new_image_path: str = ''
+	error: str = ''
+
+def gray_image_path(image_path: str) -> str:
+	"""
+	Path of the grayscale copy of an image: 'gray_' + name, in the same directory.
+	"""
+	old_image_name = image_path.split('/')[-1]
+	# Reaname an image to add gray_ to the beggining
+	new_image_name = 'gray_' + old_image_name
+
+	# Take all objects before image name
+	not_full_path = image_path.split('/')[:-1]
+
+	# Create a full path with new image name
+	return '/'.join(not_full_path) + '/' + new_image_name
+
+def _grayscale_file(image_path: str, tile_budget: int) -> str:
+	"""
+	Save the grayscale copy of one image. Runs in worker processes too, so it doesn't touch `config`.
+
+	Returns:
+		str: Path of the grayscale copy
+	"""
+	new_image_path = gray_image_path(image_path)
+	with Image.open(image_path) as img:
+		save_grayscale(img, new_image_path, tile_budget)
+	return new_image_path
+
+def grayscaling_image(image_path: str) -> str:
+	try:
+		logger.info('Grayscaling is started')
+
+		new_image_path = _grayscale_file(image_path, config.image_tile_budget)
+		logger.info(f'New full path - {new_image_path}')
 
 		config.new_image_path = new_image_path
-		config.grayscaling_flag = True
+		config.grayscaling_progress.put(GrayscalingProgress(1, 1, image_path, new_image_path))
 		config.message_to_display = 'Grayscaling was finished, you can check the new black and white pic, in the same directory where pic was'
 
 		logger.info('Grayscaling is over')
 
 	except Exception as e:
 		logger.error(f'Error in grayscaling_image, error - {e}')
+		config.grayscaling_progress.put(GrayscalingProgress(1, 1, image_path, error=str(e)))
+
+def collect_images(targets: Iterable[str]) -> List[str]:
+	"""
+	Image files of the targets: image files are taken as they are, folders are replaced by the images directly in them.
+	Grayscale copies made earlier ('gray_' files) are skipped.
+
+	Args:
+		targets (Iterable[str]): Image files and folders
+	"""
+	image_paths = []
+	for target in targets:
+		if os.path.isdir(target):
+			for file_name in sorted(os.listdir(target)):
+				path = f'{target.rstrip("/")}/{file_name}'
+				if file_name.lower().endswith(config.image_extensions) and not file_name.startswith('gray_') and os.path.isfile(path):
+					image_paths.append(path)
+		elif os.path.isfile(target):
+			if target.lower().endswith(config.image_extensions):
+				image_paths.append(target)
+			else:
+				logger.warning(f'{target} is not an image, it is skipped')
+		else:
+			logger.warning(f'{target} does not exist, it is skipped')
+	return image_paths
+
+def grayscaling_images(targets: Union[str, List[str]]) -> str:
+	"""
+	Grayscale a batch of images (files and/or folders) on a pool of processes.
+	Every finished image is reported through `config.grayscaling_progress`.
+
+	Args:
+		targets (Union[str, List[str]]): Image file, folder, or a list of them
+	"""
+	image_paths = collect_images([targets] if isinstance(targets, str) else targets)
+	if not image_paths:
+		config.message_to_display = 'There are no images to grayscale'
+		return
+	if len(image_paths) == 1:
+		# Starting worker processes would take longer than the conversion
+		return grayscaling_image(image_paths[0])
+
+	total = len(image_paths)
+	converted = 0
+	start = time.time()
+	logger.info(f'Grayscaling of {total} images is started')
+	try:
+		with ProcessPoolExecutor(max_workers=min(config.image_process_workers, total)) as executor:
+			futures = {
+				executor.submit(_grayscale_file, image_path, config.image_tile_budget): image_path
+				for image_path in image_paths
+			}
+			for done, future in enumerate(as_completed(futures), start=1):
+				image_path = futures[future]
+				try:
+					new_image_path = future.result()
+					converted += 1
+					config.grayscaling_progress.put(GrayscalingProgress(done, total, image_path, new_image_path))
+				except Exception as e:
+					logger.error(f'Error in grayscaling_images, {image_path} was not converted - {e}')
+					config.grayscaling_progress.put(GrayscalingProgress(done, total, image_path, error=str(e)))
+	except Exception as e:
+		logger.error(f'Error in grayscaling_images, error - {e}')
+
+	logger.info(f'Grayscaling of {total} images is over in {time.time() - start:.2f} seconds, {converted} converted')
+	config.message_to_display = (
+		f'Grayscaling was finished, {converted} of {total} pics were converted, '
+		f'you can check the new black and white pics in the same directories where pics were'
+	)
@@ -0,0 +1,125 @@
+import os
+import re
+import fnmatch
+import logging
+import threading
+from collections import Counter
+from typing import Iterable, List
+from src.core import config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+"""
+prune_rules.py
+
+Pruning of directories during program scans. Rules are compiled once and applied at every depth
+of a walk by editing the list of subfolders in place, so pruned trees are never entered.
+
+Supported rules:
+	- glob patterns, matched against folder names (case insensitive), e.g. 'node_modules', '.git'
+	- path prefixes, everything under them is skipped, e.g. 'C:\\Windows'
+	- maximal depth below the search root
+	- maximal number of entries (files and folders, not bytes) of a directory, whose subfolders are then skipped
+"""
+
+class PruneEngine:
+	"""
+	Compiled set of pruning rules, counting how many directories each rule pruned.
+
+	Attributes:
+		max_depth (int): Subfolders of directories this deep below the search root are skipped
+		max_directory_entries (int): Subfolders of directories with more entries (files and folders) than this are skipped
+		counts (Counter): Number of pruned directories per rule
+	"""
+
+	def __init__(self, globs: Iterable[str] = (), prefixes: Iterable[str] = (),
+				 max_depth: int = None, max_directory_entries: int = None):
+		self.globs: List[str] = list(globs)
+		self.prefixes: List[str] = [os.path.normcase(os.path.normpath(prefix)) for prefix in prefixes]
+		self.max_depth = max_depth
+		self.max_directory_entries = max_directory_entries
+		self.counts: Counter = Counter()
+		self._counts_lock = threading.Lock()
+
+		# All globs in one regular expression, the matched group tells which rule it was
+		self._glob_regex = None
+		if self.globs:
+			groups = '|'.join(f'(?P<g{number}>{fnmatch.translate(glob)})' for number, glob in enumerate(self.globs))
+			self._glob_regex = re.compile(groups, re.IGNORECASE)
+		# Paths under a prefix, the prefix itself is checked for equality ('C:\\WindowsApps' isn't under 'C:\\Windows')
+		self._prefix_tuple = tuple(prefix + os.sep for prefix in self.prefixes)
+
+	@classmethod
+	def from_config(cls) -> 'PruneEngine':
+		"""
+		Create an engine from `config.scan_prune_globs`, `config.scan_prune_prefixes`,
+		`config.scan_max_depth` and `config.scan_max_directory_entries`.
+		"""
+		return cls(
+			globs=config.scan_prune_globs,
+			prefixes=config.scan_prune_prefixes,
+			max_depth=config.scan_max_depth,
+			max_directory_entries=config.scan_max_directory_entries
+		)
+
+	def fingerprint(self) -> str:
+		"""
+		Text describing the rules, to detect that stored results were produced with other rules.
+		"""
+		return repr((self.globs, self.prefixes, self.max_depth, self.max_directory_entries))
+
+	def _count(self, rule: str, pruned: int = 1) -> None:
+		with self._counts_lock:
+			self.counts[rule] += pruned
+
+	def prune(self, current_dir: str, subdirs: List[str], files_count: int, depth: int) -> None:
+		"""
+		Remove pruned folders from `subdirs` in place (as `os.walk` expects).
+
+		Args:
+			current_dir (str): The directory being walked
+			subdirs (List[str]): Its subfolder names, edited in place
+			files_count (int): Number of files in the directory
+			depth (int): Depth of `current_dir` below the search root (the root itself is 0)
+		"""
+		if not subdirs:
+			return
+
+		if self.max_depth is not None and depth >= self.max_depth:
+			self._count('max depth', len(subdirs))
+			subdirs.clear()
+			return
+
+		if self.max_directory_entries is not None and len(subdirs) + files_count > self.max_directory_entries:
+			self._count('max directory entries', len(subdirs))
+			subdirs.clear()
+			return
+
+		kept = []
+		for folder in subdirs:
+			if self._glob_regex is not None:
+				match = self._glob_regex.match(folder)
+				if match:
+					self._count(f'glob {self.globs[int(match.lastgroup[1:])]}')
+					continue
+
+			if self._prefix_tuple:
+				path = os.path.normcase(os.path.join(current_dir, folder))
+				if path in self.prefixes or path.startswith(self._prefix_tuple):
+					prefix = next(prefix for prefix in self.prefixes if path == prefix or path.startswith(prefix + os.sep))
+					self._count(f'prefix {prefix}')
+					continue
+
+			kept.append(folder)
+
+		if len(kept) != len(subdirs):
+			subdirs[:] = kept
+
+	def log_counts(self) -> None:
+		"""
+		Log how many directories each rule pruned.
+		"""
+		if self.counts:
+			summary = ', '.join(f'{rule} - {count}' for rule, count in self.counts.most_common())
+			logger.info(f'Pruned directories: {summary}')
@@ -1,55 +1,579 @@
+import os
+import re
 import json
+import time
 import shutil
 import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
-from PyQt5.QtCore import QMutexLocker
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
 from src.core import config
-from src.features import functions
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-def reorganize_by_extension(project_dir: str = ''):
+"""
+reorganizer.py
+
+Reorganization of a folder in two phases:
+    1. Planning - the folder (with its subfolders, if recursive) is listed once by `iter_files` and every
+       file gets the folder of its group by a rule of `BUCKET_RULES` (extension, type, date or size),
+       every move is decided in memory (a dry run stops here),
+       then all target directories are created in one batch.
+    2. Moving - files are moved on a thread pool, every finished move is appended to the relocation
+       journal (`config.RELOCATION_JOURNAL_FILE` in the reorganized folder) as it happens and flushed
+       after every few dozen moves, so a crash still leaves a journal of what was moved.
+
+The journal has one JSON object per line:
+    {"op": "start", "time": 1700000000.0}
+    {"op": "move", "from": "photo.jpg", "to": "jpg/photo.jpg"}
+    {"op": "end", "moved": 1, "failed": 0}
+Paths are relative to the reorganized folder. A run is identified by the time of its "start" record.
+
+`undo_reorganization` moves the files of the last run back, appending to the same journal:
+    {"op": "undo", "run": 1700000000.0, "from": "photo.jpg", "to": "jpg/photo.jpg"}
+    {"op": "undo_skipped", "run": 1700000000.0, "from": "photo.jpg", "to": "jpg/photo.jpg", "reason": "..."}
+    {"op": "undone", "run": 1700000000.0}
+An interrupted undo is resumed by running it again, moves with an "undo" or "undo_skipped" record are not repeated.
+
+Folders reorganized by older versions have a `config.LEGACY_RELOCATION_LOG_FILE` ({file name: new path}) instead,
+it's turned into the oldest run of the journal on first use (`migrate_legacy_log`), so those reorganizations can be undone too.
+"""
+
+# Number of moves done by one task of the thread pool, the journal is flushed after each task
+MOVES_PER_TASK: int = 64
+
+@dataclass
+class PlannedMove:
+    """
+    One file move, paths are relative to the reorganized folder.
+    """
+    source: str
+    destination: str
+
+@dataclass
+class ReorganizationPlan:
+    """
+    Everything a reorganization will do, computed before anything is touched.
+
+    Attributes:
+        root (str): The reorganized folder
+        moves (List[PlannedMove]): Files to move
+        directories (List[str]): Target directories (relative), created before moving
+    """
+    root: str
+    moves: List[PlannedMove] = field(default_factory=list)
+    directories: List[str] = field(default_factory=list)
+
+@dataclass
+class ReorganizationStats:
+    """
+    Result of a reorganization.
+
+    Attributes:
+        moved (int): Files that were moved
+        failed (int): Files that couldn't be moved (they stay where they were)
+    """
+    moved: int = 0
+    failed: int = 0
+
+def _unique_destination(directory: str, name: str, taken: set) -> str:
+    """
+    Relative destination for `name` in `directory` that neither exists nor is planned for another file,
+    e.g. 'jpg/photo (1).jpg' if 'jpg/photo.jpg' is taken.
+    """
+    stem, suffix = os.path.splitext(name)
+    candidate = f'{directory}/{name}'
+    number = 1
+    while os.path.normcase(candidate) in taken:
+        candidate = f'{directory}/{stem} ({number}){suffix}'
+        number += 1
+    taken.add(os.path.normcase(candidate))
+    return candidate
+
+def iter_files(root: str, recursive: bool = False) -> Iterator[Tuple[str, os.DirEntry]]:
+    """
+    Stream the files of `root` with `os.scandir`, every directory is read once.
+    The type of an entry comes from the listing itself and `DirEntry.stat()` is cached by the entry,
+    so a file costs at most one stat call (none on Windows, where the listing has the size and times).
+    Symlinks and the relocation journal (or a legacy log) are skipped.
+
+    Args:
+        root (str): Folder to list
+        recursive (bool): If True, files of all subfolders are listed too
+
+    Yields:
+        Tuple[str, os.DirEntry]: Path relative to `root` (with '/' separators) and the entry of the file
+    """
+    pending = ['']
+    while pending:
+        relative_dir = pending.pop()
+        prefix = f'{relative_dir}/' if relative_dir else ''
+        try:
+            with os.scandir(os.path.join(root, relative_dir)) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_symlink():
+                            continue
+                        if entry.is_dir(follow_symlinks=False):
+                            if recursive:
+                                pending.append(prefix + entry.name)
+                        elif entry.is_file(follow_symlinks=False):
+                            if relative_dir or entry.name not in (config.RELOCATION_JOURNAL_FILE, config.LEGACY_RELOCATION_LOG_FILE):
+                                yield prefix + entry.name, entry
+                    except OSError as e:
+                        logger.warning(f'{entry.path} is skipped - {e}')
+        except OSError as e:
+            if not relative_dir:
+                raise
+            logger.warning(f'{relative_dir} is skipped - {e}')
+
+def bucket_by_extension(entry: os.DirEntry) -> str:
+    """
+    Folder named after the extension, e.g. 'jpg'.
+    """
+    return Path(entry.name).suffix.lower().lstrip('.') or 'no_ext'
+
+_EXTENSION_FAMILY = {extension: family for family, extensions in config.extension_families.items() for extension in extensions}
+
+def bucket_by_type(entry: os.DirEntry) -> str:
+    """
+    Folder of the extension family (`config.extension_families`), e.g. 'images'.
+    """
+    return _EXTENSION_FAMILY.get(Path(entry.name).suffix.lower().lstrip('.'), 'other')
+
+def bucket_by_date(entry: os.DirEntry) -> str:
+    """
+    Folder of the month the file was last modified, e.g. '2024-05'.
+    """
+    return time.strftime('%Y-%m', time.localtime(entry.stat(follow_symlinks=False).st_mtime))
+
+def bucket_by_size(entry: os.DirEntry) -> str:
+    """
+    Folder of the size tier (`config.reorganize_size_tiers`), e.g. 'medium'.
+    """
+    size = entry.stat(follow_symlinks=False).st_size
+    for limit, tier in config.reorganize_size_tiers:
+        if size < limit:
+            return tier
+    return 'huge'
+
+# Reorganization rules: name -> (folder of a file, what the folders are named after)
+BUCKET_RULES: Dict[str, Tuple[Callable[[os.DirEntry], str], str]] = {
+    'extension': (bucket_by_extension, 'their extension'),
+    'type': (bucket_by_type, 'their type'),
+    'date': (bucket_by_date, 'the month they were modified'),
+    'size': (bucket_by_size, 'their size')
+}
+
+def plan_reorganization(project_dir: str, rule: str = 'extension', recursive: bool = False) -> ReorganizationPlan:
+    """
+    Plan moving every file of `project_dir` into a folder chosen by `rule` (see `BUCKET_RULES`),
+    e.g. 'jpg' for the extension rule or '2024-05' for the date rule.
+
+    Args:
+        project_dir (str): Folder to reorganize
+        rule (str): Name of the rule
+        recursive (bool): If True, files of subfolders are collected too. Files already in their folder stay there
+
+    Returns:
+        ReorganizationPlan: Moves and target directories
+    """
+    bucket_of = BUCKET_RULES[rule][0]
+    plan = ReorganizationPlan(root=str(Path(project_dir)))
+    # The legacy log must become a run of the journal before another run is added after it
+    migrate_legacy_log(plan.root)
+    files = []
+    # Existing names count as taken, nothing is ever overwritten
+    taken = set()
+    for relative_path, entry in iter_files(plan.root, recursive):
+        taken.add(os.path.normcase(relative_path))
+        try:
+            files.append((relative_path, entry.name, bucket_of(entry)))
+        except OSError as e:
+            logger.warning(f'{entry.path} is skipped - {e}')
+    if not recursive:
+        # Only files of the top level are listed, names inside the folders the plan writes into have to be read as well
+        for bucket in {bucket for _, _, bucket in files}:
+            try:
+                with os.scandir(os.path.join(plan.root, bucket)) as children:
+                    taken.update(os.path.normcase(f'{bucket}/{child.name}') for child in children)
+            except FileNotFoundError:
+                continue
+            except OSError as e:
+                logger.warning(f'{os.path.join(plan.root, bucket)} could not be read, its names are not checked - {e}')
+
+    directories = set()
+    for relative_path, name, bucket in sorted(files):
+        if os.path.normcase(os.path.dirname(relative_path)) == os.path.normcase(bucket):
+            continue
+        directories.add(bucket)
+        plan.moves.append(PlannedMove(relative_path, _unique_destination(bucket, name, taken)))
+    plan.directories = sorted(directories)
+    return plan
+
+def plan_by_extension(project_dir: str) -> ReorganizationPlan:
+    """
+    Plan moving every file of `project_dir` into a folder named after its extension.
+    """
+    return plan_reorganization(project_dir, 'extension')
+
+def create_directories(plan: ReorganizationPlan) -> None:
+    """
+    Create all target directories of a plan, before any file is moved.
+    """
+    for directory in plan.directories:
+        os.makedirs(os.path.join(plan.root, directory), exist_ok=True)
+
+class RelocationJournal:
+    """
+    Append-only journal of a reorganized folder, safe to write from several threads.
+    Records are written as soon as they happen, `flush()` hands them over to the system.
+    """
+
+    def __init__(self, root: str):
+        self.path = os.path.join(root, config.RELOCATION_JOURNAL_FILE)
+        self._file = open(self.path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+        # A record cut off by a crash must not swallow the first new one
+        if self._file.tell() and not self._ends_with_newline():
+            self._file.write('\n')
+
+    def _ends_with_newline(self) -> bool:
+        with open(self.path, 'rb') as file:
+            file.seek(-1, os.SEEK_END)
+            return file.read(1) == b'\n'
+
+    def write(self, **record) -> None:
+        line = json.dumps(record, ensure_ascii=False) + '\n'
+        with self._lock:
+            self._file.write(line)
+
+    def flush(self) -> None:
+        with self._lock:
+            self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+def move_file(source: str, destination: str) -> None:
+    """
+    Move a file; a rename if both paths are on the same volume, a copy otherwise.
+    """
+    try:
+        os.rename(source, destination)
+    except OSError:
+        if not os.path.exists(source) or os.path.exists(destination):
+            raise
+        # Other volume (e.g. a mount point inside the folder)
+        shutil.move(source, destination)
+
+def _run_in_chunks(function: Callable[[list], None], items: list, workers: int = None) -> None:
+    """
+    Call `function` with chunks of `items` on a thread pool.
+    Files are handed to the pool in chunks, a single rename is too quick to be a task of its own.
+    """
+    chunks = [items[index:index + MOVES_PER_TASK] for index in range(0, len(items), MOVES_PER_TASK)]
+    with ThreadPoolExecutor(max_workers=workers or config.reorganize_workers, thread_name_prefix='Reorganizer') as executor:
+        for _ in executor.map(function, chunks):
+            pass
+
+def execute_plan(plan: ReorganizationPlan, workers: int = None) -> ReorganizationStats:
+    """
+    Create the target directories and move the files on a thread pool, journaling every move.
+
+    Args:
+        plan (ReorganizationPlan): Plan to execute
+        workers (int): Number of moving threads, `config.reorganize_workers` if None
+
+    Returns:
+        ReorganizationStats: Numbers of moved and failed files
+    """
+    stats = ReorganizationStats()
+    stats_lock = threading.Lock()
+    create_directories(plan)
+    journal = RelocationJournal(plan.root)
+    journal.write(op='start', time=time.time())
+
+    def move_chunk(chunk: List[PlannedMove]) -> None:
+        moved = failed = 0
+        for planned in chunk:
+            try:
+                move_file(os.path.join(plan.root, planned.source), os.path.join(plan.root, planned.destination))
+            except OSError as e:
+                logger.error(f'{planned.source} was not moved - {e}')
+                failed += 1
+                continue
+            journal.write(op='move', **{'from': planned.source, 'to': planned.destination})
+            moved += 1
+        journal.flush()
+        with stats_lock:
+            stats.moved += moved
+            stats.failed += failed
+
+    try:
+        _run_in_chunks(move_chunk, plan.moves, workers)
+    finally:
+        journal.write(op='end', moved=stats.moved, failed=stats.failed)
+        journal.close()
+    return stats
+
+def reorganize(project_dir: str = '', rule: str = 'extension', recursive: bool = False,
+               dry_run: bool = False) -> Union[ReorganizationPlan, ReorganizationStats, None]:
+    """
+    Scans `project_dir` for all files (of subfolders too, if `recursive`),
+    groups them by `rule` (see `BUCKET_RULES`), and moves each
+    file into the folder of its group.
+
+    Args:
+        project_dir (str): Folder to reorganize
+        rule (str): Name of the rule
+        recursive (bool): If True, files of subfolders are reorganized too
+        dry_run (bool): If True, only return the plan, nothing is created or moved
+
+    Returns:
+        Union[ReorganizationPlan, ReorganizationStats, None]: The plan for a dry run, otherwise the stats
+            (None if the folder couldn't be reorganized)
+    """
+    try:
+        start = time.time()
+        plan = plan_reorganization(project_dir, rule, recursive)
+        logger.info(f'Reorganization plan: {len(plan.moves)} files into {len(plan.directories)} folders')
+        if dry_run:
+            return plan
+
+        stats = execute_plan(plan)
+    except OSError as e:
+        logger.error(f'Error in reorganize, error - {e}')
+        config.message_to_display = f'Folder {project_dir} was not reorganized - {e}'
+        return None
+
+    logger.info(f'Relocation is completed in {time.time() - start:.2f} seconds: {stats.moved} moved, {stats.failed} failed')
+    config.message_to_display = (
+        f'Relocation is completed, {stats.moved} files were sorted into folders by {BUCKET_RULES[rule][1]}'
+        + (f', {stats.failed} files could not be moved' if stats.failed else '')
+    )
+    return stats
+
+def reorganize_by_extension(project_dir: str = '', dry_run: bool = False) -> Union[ReorganizationPlan, ReorganizationStats, None]:
     """
-    Scans 'root' for all files,
-    groups them by extension, and moves each
-    file into a folder named after that extension.
+    Moves each file of `project_dir` into a folder named after its extension, see `reorganize`.
     """
-    project_dir = Path(project_dir)
+    return reorganize(project_dir, 'extension', dry_run=dry_run)
+
+# Words of a chat command choosing the rule, e.g. "reorganize C:\Downloads by date"
+_RULE_WORDS: Dict[str, str] = {
+    'extension': 'extension', 'extensions': 'extension', 'type': 'type', 'types': 'type', 'kind': 'type',
+    'date': 'date', 'month': 'date', 'time': 'date', 'size': 'size'
+}
+_RULE_PATTERN = re.compile(r'(?:^|\s+)by\s+(' + '|'.join(_RULE_WORDS) + r')\b', re.IGNORECASE)
+_RECURSIVE_PATTERN = re.compile(r'(?:^|\s+)(recursive(ly)?|with subfolders|including subfolders|and subfolders)\b', re.IGNORECASE)
 
-    # Dict for relocation logging
-    relocation_log = {}
+def parse_reorganize_command(text: str) -> Tuple[str, str, bool]:
+    """
+    Split a chat command like "C:\\Downloads by date recursively" into the folder, the rule and the recursion flag.
 
-    # Iterate over every item in project_dir
-    for item in project_dir.iterdir():
-        if item.is_file():
-            extension = item.suffix.lower().lstrip('.') or 'no_ext'
-            target_dir = project_dir / extension
+    Returns:
+        Tuple[str, str, bool]: Folder, rule name ('extension' by default), True if subfolders were asked for
+    """
+    rule = 'extension'
+    match = _RULE_PATTERN.search(text)
+    if match:
+        rule = _RULE_WORDS[match.group(1).lower()]
+        text = text[:match.start()] + text[match.end():]
+    recursive, count = _RECURSIVE_PATTERN.subn('', text)
+    return recursive.strip(), rule, bool(count)
+
+def reorganize_from_command(text: str) -> Optional[ReorganizationStats]:
+    """
+    Reorganize the folder of a chat command, see `parse_reorganize_command`.
+    """
+    project_dir, rule, recursive = parse_reorganize_command(text)
+    return reorganize(project_dir, rule, recursive)
 
-            # Ensure the target directory exists (creates ones, if doesn't)
-            target_dir.mkdir(exist_ok=True)
+def migrate_legacy_log(root: str) -> bool:
+    """
+    Turn the log of a reorganization made by an older version (`config.LEGACY_RELOCATION_LOG_FILE` in `root`,
+    {file name: new path}) into a run of the journal, placed before the runs already there.
+    The journal is replaced atomically, the legacy log is removed afterwards.
 
-            # Build the destination path
-            destination = target_dir / item.name
+    Returns:
+        bool: True if a legacy log was migrated
+    """
+    legacy_path = os.path.join(root, config.LEGACY_RELOCATION_LOG_FILE)
+    if not os.path.isfile(legacy_path):
+        return False
+    journal_path = os.path.join(root, config.RELOCATION_JOURNAL_FILE)
+    temp_path = f'{journal_path}.tmp'
+    try:
+        with open(legacy_path, 'r', encoding='utf-8') as file:
+            moves = json.load(file)
+        if not isinstance(moves, dict):
+            raise ValueError('it is not a {file name: new path} object')
+        lines = [json.dumps({'op': 'start', 'time': os.path.getmtime(legacy_path)})]
+        lines.extend(json.dumps({'op': 'move', 'from': old_name, 'to': new_path.replace(os.sep, '/')}, ensure_ascii=False)
+                     for old_name, new_path in moves.items())
+        lines.append(json.dumps({'op': 'end', 'moved': len(moves), 'failed': 0}))
+        existing = ''
+        if os.path.exists(journal_path):
+            with open(journal_path, 'r', encoding='utf-8') as file:
+                existing = file.read()
+        with open(temp_path, 'w', encoding='utf-8') as file:
+            file.write('\n'.join(lines) + '\n' + existing)
+        os.replace(temp_path, journal_path)
+        os.remove(legacy_path)
+    except (OSError, ValueError, AttributeError) as e:
+        logger.error(f'Error in `migrate_legacy_log`, {legacy_path} was not migrated - {e}')
+        return False
+    logger.info(f'{legacy_path} was migrated to the relocation journal, {len(moves)} moves')
+    return True
 
-            # Move the file
-            shutil.move(str(item), str(destination))
+def read_journal(root: str) -> List[dict]:
+    """
+    Read the relocation journal of a folder, after migrating a legacy log. A line cut off by a crash is ignored.
 
-            # Record in the log
-            relocation_log[item.name] = str(destination.relative_to(project_dir))
+    Returns:
+        List[dict]: Records in order, empty if there is no journal
+    """
+    migrate_legacy_log(root)
+    records = []
+    journal_path = os.path.join(root, config.RELOCATION_JOURNAL_FILE)
+    if not os.path.exists(journal_path):
+        return records
+    with open(journal_path, 'r', encoding='utf-8') as file:
+        for line in file:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logger.warning(f'Broken record in {journal_path} is skipped')
+    return records
 
-    logger.info('Relocation is completed')
-    functions.run_message_formater('Relocation is completed')
+def _last_run_to_undo(records: List[dict]) -> Optional[tuple]:
+    """
+    Find the newest run that isn't completely undone.
 
-    # Create paths for logs json
-    logs_path = project_dir / 'relocation_log.json'
+    Returns:
+        Optional[tuple]: (run id, moves still to undo, newest first), None if there is nothing to undo
+    """
+    runs = {}
+    order = []
+    handled = set()
+    finished = set()
+    current = None
+    for record in records:
+        op = record.get('op')
+        if op == 'start':
+            current = record['time']
+            runs[current] = []
+            order.append(current)
+        elif op == 'move' and current is not None:
+            runs[current].append((record['from'], record['to']))
+        elif op in ('undo', 'undo_skipped'):
+            handled.add((record['run'], record['from'], record['to']))
+        elif op == 'undone':
+            finished.add(record['run'])
+
+    for run in reversed(order):
+        if run in finished or not runs[run]:
+            continue
+        # Reverse order, the last move is undone first
+        remaining = [move for move in reversed(runs[run]) if (run, *move) not in handled]
+        return run, remaining
+    return None
+
+def undo_reorganization(project_dir: str = '', workers: int = None) -> Optional[ReorganizationStats]:
+    """
+    Move the files of the last reorganization of `project_dir` back, with renames on a thread pool.
+    Files whose old place is taken by another file, or that are gone, are skipped; files that failed
+    for other reasons (e.g. opened by another program) are tried again by the next undo.
+    Folders the reorganization filled and that are empty afterwards are removed.
+
+    Args:
+        project_dir (str): The reorganized folder
+        workers (int): Number of moving threads, `config.reorganize_workers` if None
+
+    Returns:
+        Optional[ReorganizationStats]: Moved back and failed files, None if there was nothing to undo
+    """
+    root = str(Path(project_dir))
     try:
-        with open(logs_path, 'w') as file:
-            json.dump(relocation_log, file, indent=2)
-            logger.info('Logs were saved')
-    except Exception as e:
-        logger.error(f'Error occurs while trying to save relocation logs: {str(e)}')
+        start = time.time()
+        last_run = _last_run_to_undo(read_journal(root))
+        if last_run is None:
+            config.message_to_display = f'There is no reorganization of {project_dir} to undo'
+            return None
+        run, moves = last_run
+        logger.info(f'Undoing reorganization: {len(moves)} files to move back')
+
+        # Folders the files came from may have been removed meanwhile
+        for directory in {os.path.dirname(old_path) for old_path, _ in moves} - {''}:
+            os.makedirs(os.path.join(root, directory), exist_ok=True)
+
+        stats = ReorganizationStats()
+        # Files that failed for a reason which may go away, the run is finished only without them
+        retry_later = 0
+        stats_lock = threading.Lock()
+        journal = RelocationJournal(root)
+
+        def undo_chunk(chunk: List[tuple]) -> None:
+            nonlocal retry_later
+            moved = failed = retry = 0
+            for old_path, new_path in chunk:
+                source = os.path.join(root, new_path)
+                destination = os.path.join(root, old_path)
+                record = {'run': run, 'from': old_path, 'to': new_path}
+                if os.path.lexists(destination):
+                    journal.write(op='undo_skipped', reason='its old place is taken', **record)
+                    failed += 1
+                    continue
+                try:
+                    # Same folder tree, so a rename, nothing is copied
+                    os.replace(source, destination)
+                except FileNotFoundError:
+                    journal.write(op='undo_skipped', reason='it does not exist anymore', **record)
+                    failed += 1
+                    continue
+                except OSError as e:
+                    logger.error(f'{new_path} was not moved back - {e}')
+                    retry += 1
+                    continue
+                journal.write(op='undo', **record)
+                moved += 1
+            journal.flush()
+            with stats_lock:
+                stats.moved += moved
+                stats.failed += failed + retry
+                retry_later += retry
+
+        try:
+            _run_in_chunks(undo_chunk, moves, workers)
+        finally:
+            journal.flush()
+
+        # Remove the folders the run filled, if nothing else is in them
+        for directory in sorted({os.path.dirname(new_path) for _, new_path in moves}, key=len, reverse=True):
+            try:
+                os.rmdir(os.path.join(root, directory))
+            except OSError:
+                pass
+
+        if retry_later == 0:
+            journal.write(op='undone', run=run)
+        journal.close()
+    except OSError as e:
+        logger.error(f'Error in undo_reorganization, error - {e}')
+        config.message_to_display = f'Reorganization of {project_dir} was not undone - {e}'
+        return None
+
+    logger.info(f'Undo is completed in {time.time() - start:.2f} seconds: {stats.moved} moved back, {stats.failed} failed')
+    config.message_to_display = (
+        f'Reorganization was undone, {stats.moved} files are back in {project_dir}'
+        + (f', {stats.failed} files could not be moved back' if stats.failed else '')
+    )
+    return stats
 
 if __name__ == '__main__':
     project_dir = input('Write the directory that you want to reorginize:\n')
-    reorganize_by_extension(project_dir)
\ No newline at end of file
+    reorganize_by_extension(project_dir)
@@ -0,0 +1,86 @@
+import logging
+import threading
+from collections import deque
+from typing import Callable, Optional
+from src.core import config
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+"""
+scan_pool.py
+
+Shared, bounded pool of worker threads for the program scanner.
+
+Directories are queued as work items, the number of threads never exceeds `config.scan_pool_size`,
+no matter how many folders a drive has. Walkers ask `has_idle_workers()` while walking and hand
+their not yet visited subfolders over to the queue when some worker has nothing to do,
+so idle workers take over parts of a busy walker's tree instead of waiting.
+"""
+
+class ScanPool:
+	"""
+	Bounded pool of daemon worker threads executing queued tasks.
+
+	Attributes:
+		size (int): Maximal number of worker threads
+	"""
+
+	def __init__(self, size: int):
+		self.size = max(1, size)
+		self._tasks = deque()
+		self._condition = threading.Condition()
+		self._threads: list = []
+		self._idle: int = 0
+
+	def submit(self, function: Callable, *args) -> None:
+		"""
+		Queue `function(*args)` for execution by one of the workers.
+		Workers are started lazily, up to `size` of them.
+		"""
+		with self._condition:
+			self._tasks.append((function, args))
+			if self._idle == 0 and len(self._threads) < self.size:
+				self._start_worker()
+			self._condition.notify()
+
+	def has_idle_workers(self) -> bool:
+		"""
+		Check whether some worker would pick up new work right now.
+		"""
+		return len(self._threads) < self.size or (self._idle > 0 and not self._tasks)
+
+	def _start_worker(self) -> None:
+		thread = threading.Thread(
+			target=self._worker, name=f'Search Thread {len(self._threads)}', daemon=True
+		)
+		self._threads.append(thread)
+		thread.start()
+
+	def _worker(self) -> None:
+		while True:
+			with self._condition:
+				while not self._tasks:
+					self._idle += 1
+					self._condition.wait()
+					self._idle -= 1
+				function, args = self._tasks.popleft()
+
+			try:
+				function(*args)
+			except Exception as e:
+				logger.error(f'Error in scan pool task {getattr(function, "__name__", function)}: {e}')
+
+# Pool shared by all scans, created on first use
+_pool: Optional[ScanPool] = None
+_pool_lock = threading.Lock()
+
+def get_pool() -> ScanPool:
+	"""
+	Return the shared scan pool, sized by `config.scan_pool_size`.
+	"""
+	global _pool
+	with _pool_lock:
+		if _pool is None:
+			_pool = ScanPool(config.scan_pool_size)
+		return _pool
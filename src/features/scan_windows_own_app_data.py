@@ -1,29 +1,14 @@
 import logging
-from scanner_registry import scan_registry_for_apps
-from scanner_shortcut import scan_shortcuts_for_apps
-from extract_exe import find_exe_files
-from deduplicate_apps import start_deduplication
+from src.features.app_sources import build_catalog, default_sources
 
 logger = logging.getLogger(__name__)
 
 def start_scan():
-    # Scan shortcuts and registry
-    scan_shortcuts_for_apps()
-    registry_apps = scan_registry_for_apps()
-
-    # Extract .exe files from registry apps
-    find_exe_files(registry_apps)
-
-    # Define sources for deduplication
-    sources = [
-        'result_of_shortcuts_scan.json',
-        'exe_apps_from_registry.json'
-    ]
-
-    # Run deduplication
-    start_deduplication(sources=sources)
+    # Scan shortcuts and registry concurrently, registry install locations are resolved to .exe files
+    # and everything is deduplicated into the app catalog on the fly
+    build_catalog(default_sources())
 
     logger.info('Scaning for Applications in Windows own data is complited')
 
 if __name__ == '__main__':
-    start_scan()
\ No newline at end of file
+    start_scan()
@@ -1,18 +1,20 @@
 import os
-from rapidfuzz import process
-from typing import Union, Tuple
+import time
 import threading
-from threading import Thread
+from bisect import bisect_right
+import numpy as np
+from rapidfuzz import process, fuzz
+from typing import Callable, Iterable, Iterator, List, Optional, Sequence, Union, Tuple
 from src.features import functions 
+from src.features import file_index
+from src.features import scan_pool
+from src.features import prune_rules
 import logging
 from src.core import config
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Track active search threads
-active_search_threads = set()
-
 def find_best_match(candidates: list[str], target_name: str) -> Union[str, None]:
 	"""
 	Find the best matching program name from a list of candidates using fuzzy matching.
@@ -29,17 +31,213 @@ def find_best_match(candidates: list[str], target_name: str) -> Union[str, None]
 		return best_match[0]
 	return None
 
-def search_directory_recursive(root_path: str, target_program: str, should_delete: bool = False) -> Union[str, None]:
+def _match_batch(names: List[str], starts: List[int], directories: List[str], target_name: str,
+				 accept: Callable[[str, str], bool] = None, workers: int = 1) -> Optional[Tuple[str, str]]:
 	"""
-	Recursively search through all subdirectories for the target program.
+	Score one buffer of file names with a single `process.cdist` call.
+
+	Args:
+		names (List[str]): File names of several directories, concatenated
+		starts (List[int]): Index in `names` where each directory's files start
+		directories (List[str]): Directories in the same order as `starts`
+		target_name (str): The program name to find a match for
+		accept (Callable[[str, str], bool]): Optional check of a (directory, file name) match, rejected matches are skipped
+		workers (int): Threads used by `process.cdist`, -1 for all cores
+
+	Returns:
+		Optional[Tuple[str, str]]: (directory, file name) of the match, None if nothing scored >= 91
+	"""
+	scores = process.cdist(
+		[target_name], names, scorer=fuzz.WRatio, score_cutoff=91, dtype=np.float64, workers=workers
+	)[0]
+	hits = np.flatnonzero(scores >= 91)
+
+	# Same result as `find_best_match` per directory: the first directory with a match,
+	# and in it the first name with the best score
+	checked_position = -1
+	for hit in hits:
+		position = bisect_right(starts, int(hit)) - 1
+		if position == checked_position:
+			continue
+		checked_position = position
+
+		start = starts[position]
+		end = starts[position + 1] if position + 1 < len(starts) else len(names)
+		best = start + int(np.argmax(scores[start:end]))
+		if accept is None or accept(directories[position], names[best]):
+			return directories[position], names[best]
+	return None
+
+def find_best_match_batched(listings: Iterable[Tuple[str, Sequence[str]]], target_name: str,
+							batch_size: int = None, accept: Callable[[str, str], bool] = None,
+							workers: int = 1) -> Optional[Tuple[str, str]]:
+	"""
+	Find the best matching program over many directory listings.
+	File names are collected into one buffer and scored together, instead of one `extractOne` call per directory.
+	The result is the same as calling `find_best_match` for every directory in order and taking the first match.
 	
 	Args:
-		root_path (str): The root directory to start searching from
-		target_program (str): The name of the program to search for
-		should_delete (bool): If True, delete the program when found
+		listings (Iterable[Tuple[str, Sequence[str]]]): (directory, file names) pairs, e.g. from `os.walk`
+		target_name (str): The program name to find a match for
+		batch_size (int): Number of names scored per call, `config.scan_match_batch_size` by default
+		accept (Callable[[str, str], bool]): Optional check of a (directory, file name) match, rejected matches are skipped
+		workers (int): Threads used for scoring, -1 for all cores
 		
 	Returns:
-		Union[str, None]: The found program name if successful, None otherwise
+		Optional[Tuple[str, str]]: (directory, file name) of the best match (score >= 91), None otherwise
+	"""
+	batch_size = batch_size or config.scan_match_batch_size
+	names: List[str] = []
+	starts: List[int] = []
+	directories: List[str] = []
+
+	for directory, files in listings:
+		if not files:
+			continue
+		starts.append(len(names))
+		directories.append(directory)
+		names.extend(files)
+
+		if len(names) >= batch_size:
+			match = _match_batch(names, starts, directories, target_name, accept, workers)
+			if match:
+				return match
+			names, starts, directories = [], [], []
+
+	if names:
+		return _match_batch(names, starts, directories, target_name, accept, workers)
+	return None
+
+class ScanJob:
+	"""
+	State of one program scan, shared by all its tasks in the scan pool.
+
+	Every scan has its own cancellation token and deadline, so starting a new scan never revives
+	workers of an earlier one. The first found program wins: only one task may open/delete it,
+	and `wait()` returns its result message right away.
+
+	Attributes:
+		target_program (str): The program to search for
+		should_delete (bool): Whether to delete the program if found
+		deadline (float): `time.monotonic()` value after which the scan is cancelled
+		prune_engine (PruneEngine): Pruning rules applied at every depth of the walk
+	"""
+
+	def __init__(self, target_program: str, should_delete: bool = False, timeout: float = None):
+		self.target_program = target_program
+		self.should_delete = should_delete
+		self.deadline = time.monotonic() + (timeout if timeout is not None else config.scan_timeout)
+		self.prune_engine = prune_rules.PruneEngine.from_config()
+
+		self._cancelled = threading.Event()
+		self._finished = threading.Event()
+		self._lock = threading.Lock()
+		self._claimed: bool = False
+		self._pending: int = 0
+		self._result: Optional[str] = None
+
+	def is_cancelled(self) -> bool:
+		"""
+		Check whether tasks of this scan should stop: a result was found, the scan was cancelled,
+		its deadline passed or the application is closing (`config.stop_scaning`).
+		"""
+		if self._cancelled.is_set() or config.stop_scaning.is_set():
+			return True
+		if time.monotonic() > self.deadline:
+			logger.info(f'Scan for {self.target_program} reached its deadline')
+			self.cancel()
+			return True
+		return False
+
+	def cancel(self) -> None:
+		"""
+		Stop all tasks of this scan, `wait()` returns immediately.
+		"""
+		self._cancelled.set()
+		self._finished.set()
+
+	def submit(self, function: Callable, *args) -> None:
+		"""
+		Queue `function(self, *args)` in the shared scan pool, as a task of this scan.
+		"""
+		with self._lock:
+			self._pending += 1
+		scan_pool.get_pool().submit(self._run_task, function, args)
+
+	def _run_task(self, function: Callable, args: tuple) -> None:
+		try:
+			# Tasks queued before the scan was cancelled are skipped without touching the disk
+			if not self.is_cancelled():
+				function(self, *args)
+		finally:
+			with self._lock:
+				self._pending -= 1
+				if self._pending == 0:
+					self._finished.set()
+
+	def found(self, program_path: str) -> None:
+		"""
+		Report a found program. Only the first report is handled (opened or deleted), the rest are ignored.
+		"""
+		with self._lock:
+			if self._claimed or self._cancelled.is_set():
+				return
+			self._claimed = True
+
+		try:
+			self._result = handle_found_program(program_path, self.target_program, self.should_delete)
+		except Exception as e:
+			logger.error(f"Error processing found program {program_path}: {e}")
+			with self._lock:
+				self._claimed = False
+			return
+		self.cancel()
+
+	def wait(self) -> Optional[str]:
+		"""
+		Block until the first program is found, every task is over or the deadline passed.
+
+		Returns:
+			Optional[str]: Result message of the found program, None if nothing was found
+		"""
+		self._finished.wait(timeout=max(0.0, self.deadline - time.monotonic()))
+		self.cancel()
+		self.prune_engine.log_counts()
+		return self._result
+
+def _walk_listings(job: ScanJob, root_path: str, depth: int) -> Iterator[Tuple[str, List[str]]]:
+	"""
+	Walk `root_path` and yield (directory, file names) pairs, until the scan is cancelled.
+	Subfolders are pruned at every depth by the scan's prune engine.
+	When some worker of the scan pool is idle, the first subfolder is kept and the rest are handed over to the pool.
+	"""
+	pool = scan_pool.get_pool()
+	for current_dir, subdirs, files in os.walk(root_path):
+		if job.is_cancelled():
+			return
+
+		relative_path = current_dir[len(root_path):].strip(os.sep)
+		current_depth = depth + (relative_path.count(os.sep) + 1 if relative_path else 0)
+		job.prune_engine.prune(current_dir, subdirs, len(files), current_depth)
+
+		yield current_dir, files
+
+		# Keep walking the first subfolder, let idle workers take over the rest
+		if len(subdirs) > 1 and pool.has_idle_workers():
+			for folder in subdirs[1:]:
+				job.submit(search_directory_recursive, os.path.join(current_dir, folder), current_depth + 1)
+			del subdirs[1:]
+
+def search_directory_recursive(job: ScanJob, root_path: str, depth: int = 1) -> None:
+	"""
+	Recursively search through all subdirectories for the target program.
+	Runs as a task of the scan pool: when some worker of the pool is idle, not yet visited
+	subdirectories are handed over to the pool instead of being walked by this task.
+	
+	Args:
+		job (ScanJob): The scan this search belongs to
+		root_path (str): The root directory to start searching from
+		depth (int): Depth of `root_path` below the search root
 	"""
 	try:
 		# Check if directory exists and is accessible
@@ -47,45 +245,17 @@ def search_directory_recursive(root_path: str, target_program: str, should_delet
 			logger.warning(f"Directory {root_path} is not accessible")
 			return None
 
-		while not config.stop_scaning.is_set():
-			try:
-				for current_dir, subdirs, files in os.walk(root_path):
-					if config.stop_scaning.is_set():
-						return None
-						
-					found_program = find_best_match(files, target_program)
-					if found_program:
-						logger.info(f'Program {config.programm_name} was found in {current_dir}')
-						program_path = os.path.join(current_dir, found_program)
-						
-						try:
-							if should_delete:
-								functions.delete_object(program_path)
-								config.stop_scaning.set()
-								config.message_to_display = 'Object was found and deleted'
-							else:
-								# Store the found path and open the program
-								config.application_paths['USER_CUSTOM_OBJECTS'][config.programm_name] = program_path
-								functions.save_user_objects(program_path, config.programm_name)
-								functions.open_object(program_path)
-								config.stop_scaning.set()
-								config.message_to_display = 'Object was found and opened'
-						except Exception as e:
-							logger.error(f"Error processing found program {found_program}: {e}")
-							return None
-				break
-			except PermissionError:
-				logger.warning(f"Permission denied accessing directory: {current_dir}")
-				continue
-			except Exception as e:
-				logger.error(f"Error during directory walk: {e}")
-				continue
+		# Names are scored in batches, so cancellation is checked in between as well
+		listings = _walk_listings(job, root_path, depth)
+		match = find_best_match_batched(listings, job.target_program, accept=lambda *_: not job.is_cancelled())
+		if match is None:
+			return None
+
+		current_dir, found_program = match
+		logger.info(f'Program {job.target_program} was found in {current_dir}')
+		job.found(os.path.join(current_dir, found_program))
 	except Exception as e:
 		logger.error(f"Error in search_directory_recursive: {e}")
-	finally:
-		# Remove this thread from active threads when done
-		if threading.current_thread() in active_search_threads:
-			active_search_threads.remove(threading.current_thread())
 
 def separate_folders_and_files(directory: str) -> Tuple[Tuple[str], Tuple[str]]:
 	"""
@@ -124,134 +294,193 @@ def separate_folders_and_files(directory: str) -> Tuple[Tuple[str], Tuple[str]]:
 		logger.error(f"Error in separate_folders_and_files: {e}")
 		return ((), ())
 
-def search_directory(directory: str, folders: Tuple[str], files: Tuple[str], 
-					target_program: str, should_delete: bool = False) -> Union[str, None]:
+def handle_found_program(program_path: str, target_program: str, should_delete: bool = False) -> str:
+	"""
+	Open (and remember) or delete the program that was found.
+	
+	Args:
+		program_path (str): Full path to the found program
+		target_program (str): The program name user asked for
+		should_delete (bool): Whether to delete the program instead of opening it
+		
+	Returns:
+		str: Result message
+	"""
+	if not should_delete:
+		config.application_paths['USER_CUSTOM_OBJECTS'][target_program] = program_path
+		functions.save_user_objects(program_path, target_program)
+		functions.open_object(program_path)
+		return 'Object was found and opened'
+	else:
+		functions.delete_object(program_path)
+		return 'Object was found and deleted'
+
+def search_index(job: ScanJob, root_path: str) -> bool:
 	"""
-	Search for a program in the current directory and its subdirectories.
+	Search for a program in the filename index instead of walking the disk.
 	
 	Args:
+		job (ScanJob): The scan this search belongs to
+		root_path (str): The search root to look up in the index
+		
+	Returns:
+		bool: True if the program was found
+	"""
+	# The index may be slightly behind the disk, so only existing files are accepted
+	match = find_best_match_batched(
+		file_index.iter_listings(root_path), job.target_program,
+		accept=lambda directory, name: os.path.exists(os.path.join(directory, name)),
+		workers=-1
+	)
+	if match is None or job.is_cancelled():
+		return False
+
+	current_dir, found_program = match
+	logger.info(f'Program {job.target_program} was found in index, in {current_dir}')
+	job.found(os.path.join(current_dir, found_program))
+	return True
+
+def search_directory(job: ScanJob, directory: str, folders: Tuple[str], files: Tuple[str]) -> bool:
+	"""
+	Search for a program in the current directory and queue its subdirectories.
+	
+	Args:
+		job (ScanJob): The scan this search belongs to
 		directory (str): The directory to search in
 		folders (Tuple[str]): List of folders in the directory
 		files (Tuple[str]): List of files in the directory
-		target_program (str): The program to search for
-		should_delete (bool): Whether to delete the program if found
 		
 	Returns:
-		Union[str, None]: 'Object was found' if successful, None otherwise
+		bool: True if the program was found in the directory itself
 	"""
 	try:
 		# First check files in current directory
-		found_program = find_best_match(files, target_program)
+		found_program = find_best_match(files, job.target_program)
 		if found_program:
-			program_path = os.path.join(directory, found_program)
-			if not should_delete:
-				config.application_paths['USER_CUSTOM_OBJECTS'][target_program] = program_path
-				functions.save_user_objects(program_path, target_program)
-				functions.open_object(program_path)
-				config.stop_scaning.set()
-				return 'Object was found and opened'
-			else:
-				functions.delete_object(program_path)
-				config.stop_scaning.set()
-				return 'Object was found and deleted'
+			job.found(os.path.join(directory, found_program))
+			return True
 		
-		# If not found in current directory, search subdirectories
+		# If not found in current directory, queue subdirectories for the scan pool
+		folders = list(folders)
+		job.prune_engine.prune(directory, folders, len(files), 0)
 		for folder in folders:
-			if not config.stop_scaning.is_set():
-				folder_path = os.path.join(directory, folder)
-				thread = Thread(target=search_directory_recursive, 
-							  args=[folder_path, target_program, should_delete])
-				thread.daemon = True
-				active_search_threads.add(thread)
-				thread.start()
-			else:
-				return None
+			if job.is_cancelled():
+				return False
+			job.submit(search_directory_recursive, os.path.join(directory, folder), 1)
 	except Exception as e:
 		logger.error(f"Error in search_directory: {e}")
-		return None
+	return False
 
-def search_drive(drive_path: str, target_program: str, should_delete: bool = False) -> Union[str, None]:
+def get_search_roots(drive_path: str) -> Tuple[str]:
 	"""
-	Search for a program in a specific drive.
+	Get the directories that should be searched on a drive.
 	
 	Args:
 		drive_path (str): The drive to search in
-		target_program (str): The program to search for
-		should_delete (bool): Whether to delete the program if found
 		
 	Returns:
-		Union[str, None]: 'Object was found' if successful, None otherwise
+		Tuple[str]: `config.paths_for_searching` for C drive, the whole drive otherwise
+	"""
+	if drive_path == 'C:\\':
+		# For C drive, search only in specified paths
+		return tuple(config.paths_for_searching)
+	# For other drives, search the entire drive
+	return (drive_path,)
+
+def search_drive(job: ScanJob, drive_path: str) -> None:
+	"""
+	Search for a program in a specific drive.
+	The filename index is queried first, the drive is walked if the index doesn't cover it or has no match.
+	
+	Args:
+		job (ScanJob): The scan this search belongs to
+		drive_path (str): The drive to search in
 	"""
 	try:
 		if not os.path.exists(drive_path):
 			logger.warning(f"Drive {drive_path} does not exist")
 			return None
 			
-		if drive_path == 'C:\\':
-			# For C drive, search only in specified paths
-			for search_path in config.paths_for_searching:
-				if config.stop_scaning.is_set():
-					return None
-				if not os.path.exists(search_path):
-					logger.warning(f"Search path {search_path} does not exist")
-					continue
-					
-				folders, files = separate_folders_and_files(search_path)
-				if not folders and not files:  # Skip if directory is not accessible
-					continue
-					
-				result = search_directory(search_path, folders, files, target_program, should_delete)
-				if result and 'Object was found' in result:
-					config.message_to_display = result 
-		else:
-			# For other drives, search the entire drive
-			folders, files = separate_folders_and_files(drive_path)
+		for search_path in get_search_roots(drive_path):
+			if job.is_cancelled():
+				return None
+			if not os.path.exists(search_path):
+				logger.warning(f"Search path {search_path} does not exist")
+				continue
+
+			if file_index.covers(search_path) and search_index(job, search_path):
+				return None
+			if job.is_cancelled():
+				return None
+
+			# Not indexed, or not in the index - it may have been installed or created since the last refresh
+			folders, files = separate_folders_and_files(search_path)
 			if not folders and not files:  # Skip if directory is not accessible
+				continue
+			found = search_directory(job, search_path, folders, files)
+
+			if found:
 				return None
-				
-			result = search_directory(drive_path, folders, files, target_program, should_delete)
-			if result and 'Object was found' in result:
-				config.message_to_display = result 
 
 	except Exception as e:
 		logger.error(f"Error searching drive {drive_path}: {e}")
-	finally:
-		# Remove this thread from active threads when done
-		if threading.current_thread() in active_search_threads:
-			active_search_threads.remove(threading.current_thread())
 
-def search_all_drives(drives: Tuple[str], target_program: str, should_delete: bool = False) -> None:
+def search_all_drives(job: ScanJob, drives: Tuple[str]) -> None:
 	"""
-	Launch parallel searches across multiple drives.
+	Launch parallel searches across multiple drives, as tasks of the shared scan pool.
 	
 	Args:
+		job (ScanJob): The scan this search belongs to
 		drives (Tuple[str]): List of drives to search
-		target_program (str): The program to search for
-		should_delete (bool): Whether to delete the program if found
 	"""
 	for drive in drives:
-		thread = Thread(target=search_drive, 
-					   args=[drive, target_program, should_delete],
-					   name=f'Search Thread {drive}')
-		thread.daemon = True  # Make thread daemon so it exits when main program exits
-		active_search_threads.add(thread)
-		thread.start()
-
-def scan_for_program(target_program: str, should_delete: bool = False) -> None:
+		job.submit(search_drive, drive)
+
+def start_scan(target_program: str, should_delete: bool = False, timeout: float = None) -> ScanJob:
 	"""
-	Main function to initiate the program search across all drives.
+	Start the program search across all drives, without waiting for it.
 	
 	Args:
 		target_program (str): The name of the program to search for
 		should_delete (bool): Whether to delete the program if found
+		timeout (float): Seconds until the scan is cancelled, `config.scan_timeout` by default
+		
+	Returns:
+		ScanJob: The started scan, `wait()` returns its result
 	"""
 	logger.info('Starting program scan')
 	config.programm_name = target_program
-	config.stop_scaning.clear()
 	
-	available_drives: Tuple[str] = functions.get_drives()
-	search_all_drives(available_drives, target_program, should_delete)
+	available_drives: Tuple[str] = functions.get_drives() or ()
+
+	# Keep the filename index up to date, so next searches don't have to walk the drives.
+	# Without an index this is a full build, otherwise only changed directories are re-read
+	search_roots = [root for drive in available_drives for root in get_search_roots(drive) if os.path.exists(root)]
+	if file_index.age() > config.file_index_refresh_interval or not all(file_index.covers(root) for root in search_roots):
+		file_index.refresh_index_in_background(search_roots)
+
+	job = ScanJob(target_program, should_delete, timeout)
+	job.submit(search_all_drives, available_drives)
+	return job
+
+def scan_for_program(target_program: str, should_delete: bool = False) -> str:
+	"""
+	Main function to search for a program across all drives.
+	Returns as soon as the first match is handled, every drive was searched or `config.scan_timeout` passed.
+	
+	Args:
+		target_program (str): The name of the program to search for
+		should_delete (bool): Whether to delete the program if found
+		
+	Returns:
+		str: Result message
+	"""
+	result = start_scan(target_program, should_delete).wait()
+	if result is None:
+		logger.info(f'Program {target_program} was not found')
+		return f'{target_program} was not found'
+	return result
 
 if __name__ == '__main__':
 	program_name = input('Enter the name of the program to search for: ')
-	scan_for_program(program_name)
+	print(scan_for_program(program_name))
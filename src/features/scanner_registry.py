@@ -1,22 +1,26 @@
-import winreg
 import json
 import os
-from extract_exe import find_exe_files, save_exe_apps_to_config
+from typing import Iterator, Tuple
 
-# List of registry hives and paths to search for installed applications
+# Registry hives (`winreg` constant names) and paths to search for installed applications.
+# `winreg` exists only on Windows, so it's imported when a scan starts
 REGISTRY_PATHS = [
-    (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall"),
-    (winreg.HKEY_LOCAL_MACHINE, r"SOFTWARE\Wow6432Node\Microsoft\Windows\CurrentVersion\Uninstall"),
-    (winreg.HKEY_CURRENT_USER,  r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall"),
+    ('HKEY_LOCAL_MACHINE', r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall"),
+    ('HKEY_LOCAL_MACHINE', r"SOFTWARE\Wow6432Node\Microsoft\Windows\CurrentVersion\Uninstall"),
+    ('HKEY_CURRENT_USER',  r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall"),
 ]
 
-def scan_registry_for_apps():
+def iter_registry_apps() -> Iterator[Tuple[str, str]]:
     """
-    Scans Windows uninstall registry keys for installed applications.
-    Returns a dict mapping application display names to executable paths.
+    Yield (display name, install location or icon path) of the applications in the uninstall registry keys.
+
+    Raises:
+        ImportError: If `winreg` isn't available (not Windows)
     """
-    apps = {}
-    for hive, path in REGISTRY_PATHS:
+    import winreg
+
+    for hive_name, path in REGISTRY_PATHS:
+        hive = getattr(winreg, hive_name)
         try:
             with winreg.OpenKey(hive, path) as reg_key:
                 for i in range(winreg.QueryInfoKey(reg_key)[0]):
@@ -37,13 +41,19 @@ def scan_registry_for_apps():
                                     continue
                             # Only record if path exists
                             if exe_path and os.path.exists(exe_path):
-                                apps[display_name] = exe_path
+                                yield display_name, exe_path
                     except (FileNotFoundError, OSError, PermissionError):
                         # Skip entries we can't access or without the right values
                         continue
         except (FileNotFoundError, PermissionError):
             continue
 
+def scan_registry_for_apps():
+    """
+    Scans Windows uninstall registry keys for installed applications.
+    Returns a dict mapping application display names to executable paths.
+    """
+    apps = dict(iter_registry_apps())
     save_apps_to_config(apps)
     return apps
 
@@ -1,10 +1,7 @@
 import os
 import json
 from pathlib import Path
-
-# Requires pywin32: pip install pywin32
-import pythoncom
-from win32com.shell import shell
+from typing import Iterator, Tuple
 
 # Start Menu directories to search for shortcuts
 START_MENU_DIRS = [
@@ -17,6 +14,10 @@ def resolve_shortcut(lnk_path: str) -> str:
     Resolve a .lnk shortcut to its target executable path.
     Returns the path or None if resolution fails.
     """
+    # Requires pywin32: pip install pywin32 (Windows only, so imported on use)
+    import pythoncom
+    from win32com.shell import shell
+
     try:
         pythoncom.CoInitialize()
         shell_link = pythoncom.CoCreateInstance(
@@ -34,12 +35,13 @@ def resolve_shortcut(lnk_path: str) -> str:
         pythoncom.CoUninitialize()
 
 
-def scan_shortcuts_for_apps() -> dict:
+def iter_shortcut_apps() -> Iterator[Tuple[str, str]]:
     """
-    Scans Start Menu directories for .lnk shortcuts and resolves them.
-    Returns a dict mapping shortcut names to target executable paths.
+    Yield (shortcut name, target executable path) of the Start Menu shortcuts.
+
+    Raises:
+        ImportError: If pywin32 isn't installed
     """
-    apps = {}
     for base_dir in START_MENU_DIRS:
         if not os.path.isdir(base_dir):
             continue
@@ -49,10 +51,16 @@ def scan_shortcuts_for_apps() -> dict:
                     lnk_path = os.path.join(root, file)
                     exe_path = resolve_shortcut(lnk_path)
                     if exe_path and os.path.exists(exe_path):
-                        name = Path(file).stem
-                        apps[name] = exe_path
+                        yield Path(file).stem, exe_path
 
+def scan_shortcuts_for_apps() -> dict:
+    """
+    Scans Start Menu directories for .lnk shortcuts and resolves them.
+    Returns a dict mapping shortcut names to target executable paths.
+    """
+    apps = dict(iter_shortcut_apps())
     save_shortcuts_to_config(apps)
+    return apps
 
 def save_shortcuts_to_config(apps: dict):
     """
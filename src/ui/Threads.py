@@ -1,34 +1,46 @@
-from PyQt5.QtCore import QThread, pyqtSignal, QMutexLocker
+from PyQt5.QtCore import QObject, QThread, pyqtSignal, QMutexLocker
 import logging
+import queue
 import time
 from src.features import reorganizer
+from src.features import duplicate_finder
 from src.features import image_processing
+from src.features import image_pipeline
 from src.features import open_exe
 from src.features import scaning
 from src.core import config
+from src.core import llm_sessions
 
-class LLMStreamingThread(QThread):
+class LLMStreamingTask(QObject):
 	"""
-	A background thread that handles LLM streaming to prevent UI blocking.
-	
-	This thread processes LLM responses in chunks and updates the UI through signals.
-	The thread can be stopped by calling the stop() method.
-	
+	An answer to a message of a chat page, run by the LLM request scheduler (`llm_scheduler.scheduler`)
+	on one of its worker threads, instead of a thread of its own.
+
+	Chat answers are cancelled when a new message is sent on the same page, task reports aren't
+	(they tell about something that was already done). A long-term task runs as a request of its own,
+	without holding a slot of the LLM provider, and its report is queued right after it.
+	The object lives in the UI thread, so its signals reach the page in the UI thread.
+
 	Attributes:
 		chunk_ready (pyqtSignal): Signal emitted when a new text chunk is ready
 		streaming_started (pyqtSignal): Signal emitted when streaming begins
 		streaming_finished (pyqtSignal): Signal emitted when streaming completes
+		placeholder_discarded (pyqtSignal): Signal emitted with the typing placeholder of an answer cancelled before it started
 	"""
 	# UI update signals
 	chunk_ready = pyqtSignal(str)
 	streaming_started = pyqtSignal()
 	streaming_finished = pyqtSignal()
+	placeholder_discarded = pyqtSignal(object)
 
 	functions_registry: dict = {
 		'opening': open_exe.open_application,
 		'deletion': scaning.scan_for_program,
-		'reorganization': reorganizer.reorganize_by_extension,
-		'image processing': image_processing.grayscaling_image
+		'reorganization': reorganizer.reorganize_from_command,
+		'undo reorganization': reorganizer.undo_reorganization,
+		'duplicate search': duplicate_finder.find_duplicates_in_folder,
+		'image processing': image_pipeline.process_image,
+		'batch image processing': image_processing.grayscaling_images
 	}
 
 	def __init__(self,
@@ -36,12 +48,12 @@ class LLMStreamingThread(QThread):
 				 user_message_type: str = ''
 		):
 		"""
-		Initialize the LLM streaming thread.
+		Initialize the LLM streaming task.
 
 		Args:
 			chat_page: The UI page to update with streaming chunks
-			is_task_case (bool): Whether this is a task case requiring special formatting
-			message (str): The message to process through the LLM
+			processed_result (str): The result of the message processor, the message to process through the LLM
+			user_message_type (str): 'Instantanious Task', 'Long-Term Task' or 'Chatting'
 		"""
 		super().__init__()
 		self.chat_page = chat_page
@@ -49,20 +61,34 @@ class LLMStreamingThread(QThread):
 		self.user_message_type = user_message_type
 		self.logger = logging.getLogger(__name__)
 
+		# Message to send to the LLM, for a long-term task it's its report
+		self.message_to_llm = processed_result
+		# Typing placeholder added for this answer
+		self.placeholder = self.chat_page.last_llm_placeholder()
+
 		# Connect signals to page methods
 		self.chunk_ready.connect(self.chat_page.add_llm_chunk)
 		self.streaming_started.connect(self.chat_page.start_llm_streaming)
 		self.streaming_finished.connect(self.chat_page.finish_llm_streaming)
+		self.placeholder_discarded.connect(self.chat_page.discard_llm_placeholder)
 
 		# To track is streaming started ot not
 		self.streaming_is_started: bool = False
 
+	def submit(self, scheduler) -> None:
+		"""
+		Queue the task (and its long-term task, if any) after the other requests of its page.
+		"""
+		page_id = self.chat_page.page_id
+		is_chatting = self.user_message_type == 'Chatting'
+		provider = config.llm_backends['chatting' if is_chatting else 'formatter']
+		if self.user_message_type == 'Long-Term Task':
+			scheduler.submit(page_id, None, self._run_long_term_task, cancellable=False)
+		scheduler.submit(page_id, provider, self.run, cancellable=is_chatting, on_cancel=self._cancelled_before_start)
+
 	def handle_error(self) -> None:
 		"""
 		Handle errors that occur during LLM streaming.
-		
-		Args:
-			error_details (str): Optional error details to log
 		"""
 
 		if not self.streaming_is_started:
@@ -75,16 +101,22 @@ class LLMStreamingThread(QThread):
 		time.sleep(1)
 
 		self.streaming_finished.emit()
-		self.stop()
 
-	def _llm_request(self, stream_method, message_to_llm: str):
+	def _cancelled_before_start(self, request) -> None:
+		self.placeholder_discarded.emit(self.placeholder)
+
+	def _llm_request(self, stream_method, message_to_llm: str, request) -> None:
 		try:
-			for chunk in stream_method(message_to_llm):
-				if self.isInterruptionRequested():
+			stream = stream_method(message_to_llm)
+			for chunk in stream:
+				if request.cancelled:
+					# Closing the stream ends the request to the provider, the question stays out of the history
+					stream.close()
+					self.logger.info('LLM streaming was cancelled by a new message')
 					break
 				self.chunk_ready.emit(chunk)
 		except Exception as e:
-			self.logger.error(f'Error occurs while trying to send a request to llm')
+			self.logger.error(f'Error occurs while trying to send a request to llm, error - {e}')
 			self.handle_error()
 
 	def _long_term_task_execution(self, processed_result):
@@ -93,64 +125,57 @@ class LLMStreamingThread(QThread):
 
 		task = self.functions_registry[task_to_execute]
 		if task_to_execute == 'deletion':
-			task(arg, should_delete=True)
+			# Returns as soon as the first match is handled (or the scan is over)
+			return task(arg, should_delete=True)
 		else:
 			task(arg)
 
 		while config.message_to_display == '':
 			return 'Everythings is complited!'
-		return config.message_to_display
+		message = config.message_to_display
+		config.message_to_display = '' # Reset to base state
+		return message
 
-	def run(self) -> None:
+	def _run_long_term_task(self, request) -> None:
+		try:
+			self.message_to_llm = self._long_term_task_execution(self.processed_result)
+		except Exception as e:
+			self.logger.error(f'Error in long-term task `{self.processed_result[0]}`, error - {e}')
+			# Its report shows the error
+			self.message_to_llm = None
+
+	def run(self, request) -> None:
 		"""
-		Main execution method for the thread.
-		
-		Processes the LLM response in chunks and updates the UI through signals.
-		The stream type is determined by is_task_case.
+		Stream the answer to the page, on a worker thread of the scheduler.
+		Stops at the next chunk once the request is cancelled.
 		"""
-		self.logger.info('LLM streaming thread started')
+		self.logger.info('LLM streaming task started')
 		try:
-			# Select appropriate stream method based on case type
-			try:
+			if self.message_to_llm is None:
+				self.handle_error()
+				return
+
+			# The session of the page is leased until the answer is over, so it isn't evicted to disk meanwhile
+			with llm_sessions.sessions.lease(self.chat_page.page_id) as session:
+				# Select appropriate stream method based on case type
 				stream_method = (
-					self.chat_page.llm.message_formater_stream 
+					session.message_formater_stream 
 					if self.user_message_type != 'Chatting'
-					else self.chat_page.llm.claude_stream
+					else session.chat_stream
 				)
-			except Exception as e:
-				self.logger.error(f'Error occurs while trying to initialize `stream_method`')
-				self.handle_error()
 
-			self.streaming_started.emit()
-			self.streaming_is_started = True
+				self.streaming_started.emit()
+				self.streaming_is_started = True
 
-			if self.user_message_type == 'Instantanious Task':
-				self._llm_request(stream_method, self.processed_result)
-			elif self.user_message_type == 'Long-Term Task':
-				message_to_llm = self._long_term_task_execution(self.processed_result)
-				self._llm_request(stream_method, message_to_llm)
-				config.message_to_display = '' # Reset to base state
-			else:
-				self._llm_request(stream_method, self.processed_result)
+				self._llm_request(stream_method, self.message_to_llm, request)
 
 			self.streaming_finished.emit()
 
-			self.stop()
-
 		except Exception as e:
-			self.logger.error(f'Error in LLM streaming thread: {e}')
+			self.logger.error(f'Error in LLM streaming task: {e}')
+			self.handle_error()
 		finally:
-			self.logger.info('LLM streaming thread finished')
-			self.stop()
-
-	def stop(self) -> None:
-		"""
-		Request the thread to stop by setting the interruption flag.
-		
-		This method sets the interruption flag, causing the thread to exit
-		its loop in the next iteration.
-		"""
-		self.requestInterruption()
+			self.logger.info('LLM streaming task finished')
 
 class AlarmMonitorThread(QThread):
 	"""
@@ -209,8 +234,14 @@ class AlarmMonitorThread(QThread):
 
 class GrayscalingThreadMonitor(QThread):
 	"""
-	Check does grayscaling is over or not
+	Report the progress of grayscaling, read from `config.grayscaling_progress`.
+
+	Attributes:
+		grayscaling_progress (pyqtSignal): (done, total, new image path) for every finished image,
+			the path is '' if the image failed
+		grayscaling_thread_ended (pyqtSignal): Emitted when the last image of a run is finished
 	"""
+	grayscaling_progress = pyqtSignal(int, int, str)
 	grayscaling_thread_ended = pyqtSignal()
 
 	def __init__(self):
@@ -221,10 +252,13 @@ class GrayscalingThreadMonitor(QThread):
 		self.logger.info('Grayscaling Thread is started')
 		while not self.isInterruptionRequested():
 			try:
-				if config.grayscaling_flag:
+				progress = config.grayscaling_progress.get(timeout=0.1)
+			except queue.Empty:
+				continue
+			try:
+				self.grayscaling_progress.emit(progress.done, progress.total, progress.new_image_path)
+				if progress.done == progress.total:
 					self.grayscaling_thread_ended.emit()
-					config.grayscaling_flag = False
-				QThread.msleep(100)
 			except Exception as e: 
 				self.logger.error(f'Error in grayscaling monitor thread, error - {e}')
 		self.logger.info('Grayscaling Thread is stopped')
@@ -23,7 +23,12 @@ from .Threads import (
 )
 from .Custom_Title_Bar     import CustomTitleBar
 from src.features import functions
+from src.features import file_index
 from src.core import config
+from src.core import llm
+from src.core import llm_sessions
+from src.core import llm_scheduler
+from src.core import response_cache
 
 class MainWindow(QMainWindow):
     """
@@ -75,7 +80,12 @@ class MainWindow(QMainWindow):
         
         # Start grayscaling monitor thread
         self.grayscaling_thread = GrayscalingThreadMonitor()
+        self.grayscaling_thread.grayscaling_progress.connect(self.notify_grayscaling_progress)
         self.grayscaling_thread.grayscaling_thread_ended.connect(self.notify_grayscaling_ended)
+        self.grayscaling_thread.start()
+
+        # Connect to the LLM providers in the background, so the first answer doesn't wait for the handshake
+        llm.clients.warm_up()
 
         self.logger.info('MainWindow initialized successfully')
 
@@ -95,11 +105,19 @@ class MainWindow(QMainWindow):
         qr.moveCenter(cp)
         self.move(qr.topLeft())
 
+    def notify_grayscaling_progress(self, done: int, total: int, new_image_path: str) -> None:
+        """
+        Show the progress of a batch grayscaling, every tenth part of the batch.
+        """
+        if total > 1 and done < total and done * 10 // total != (done - 1) * 10 // total and config.current_page:
+            config.current_page.add_message('Joy', f'Grayscaling: {done} of {total} pics are ready')
+
     def notify_grayscaling_ended(self) -> None:
         """
         Notify the user when the grayscaling image process is finished.
         """
-        self.display_response('Grayscaling was finished, you can check a new image in your folder', config.current_page)
+        if config.current_page:
+            config.current_page.add_message('Joy', 'Grayscaling was finished, you can check a new image in your folder')
 
     def print_alarm(self) -> None:
         """
@@ -165,10 +183,13 @@ class MainWindow(QMainWindow):
         """
         if not config.tray_activation:
             self.alarm_monitor.stop()
+            self.grayscaling_thread.stop()
             config.stop_scaning.set()
+            file_index.stop_refresh()
             self.logger.info(f'Stop scaning')
-            if self.current_llm_thread:
-                self.current_llm_thread.stop()
+            llm_scheduler.scheduler.shutdown()
+            llm.clients.close()
+            response_cache.save_cache()
             event.accept()    
         else:    
             # Hide instead of closing when minimized to tray
@@ -279,6 +300,9 @@ class MainWindow(QMainWindow):
         del self.existed_pages[key]
         del self.existed_pages_widgets[page_widget]
         del self.pages_position[page_position_in_existed_pages+1]
+        # The conversation of the deleted chat isn't needed anymore
+        llm_scheduler.scheduler.cancel(key)
+        llm_sessions.sessions.discard(key)
 
     def switch_chat(self, chat_id: int) -> None:
         """
@@ -289,6 +313,8 @@ class MainWindow(QMainWindow):
         print(chat_id, self.pages_position)
         config.current_page_widget_id = chat_id
         config.current_page = self.pages_position[chat_id+1]
+        # Restore the LLM session of the chat if it was evicted to disk, before the first message needs it
+        llm_sessions.sessions.get(config.current_page.page_id)
         self.chat_stack.setCurrentIndex(chat_id)
 
     def show_settings_page(self) -> None:
@@ -14,11 +14,12 @@ import threading
 import logging
 import uuid
 import re
+from collections import deque
 from .toggle_button_implamantation import ToggleButton
 from src.data import load_user_data
 from src.features import functions
 from src.core import config
-from src.core import llm
+from src.core import llm_sessions
 
 # Constants for icon paths
 ICON_PATHS = {
@@ -86,10 +87,9 @@ class Page(QWidget):
         self.page_id = uuid.uuid4().hex
         self.sidebar = sidebar
         self.ui_application = ui_application
-        self.llm = llm.LLM()
 
-        self._last_llm_widget = None
-        self._last_typing_widget = None
+        # Typing placeholders of the answers that haven't started yet, oldest first (answers of a page start in order)
+        self._llm_placeholders = deque()
         self._current_llm_text_label = None # Track current streaming text label
         self._accumulated_text = '' # Store accumulated chunk
 
@@ -118,6 +118,14 @@ class Page(QWidget):
 
         self.is_first_message = False
 
+    @property
+    def llm(self):
+        """
+        LLM session of this chat, restored from disk if it was evicted (see `llm_sessions.py`).
+        Answers use `llm_sessions.sessions.lease(page_id)` instead, so the session isn't evicted while it's answering.
+        """
+        return llm_sessions.sessions.get(self.page_id)
+
     def _create_sidebar_button(self) -> QWidget:
         sidebar_button = QPushButton()
         sidebar_button.setIcon(QIcon(ICON_PATHS['SIDEBAR']))
@@ -481,8 +489,8 @@ class Page(QWidget):
         if sender == 'LLM' and message == '':  # Empty message means show typing indicator
             # Create typing indicator with same layout as other messages
             typing_widget = self._create_typing_indicator()
-            self._last_llm_widget = message_container  # Store reference to the entire widget
-            self._last_typing_widget = typing_widget  # Store reference to typing indicator
+            message_container.typing_widget = typing_widget  # Store reference to typing indicator
+            self._llm_placeholders.append(message_container)  # Store reference to the entire widget
             
             message_layout.addWidget(typing_widget)
             message_layout.addStretch()
@@ -593,8 +601,9 @@ class Page(QWidget):
             min_typing_duration (int): Minimum time to show typing indicator (default: 800ms)
             max_typing_duration (int): Maximum time to show typing indicator before transitioning anyway (default: 3000ms)
         """
-        if self._last_llm_widget is None:
+        if not self._llm_placeholders:
             return
+        placeholder = self._llm_placeholders.popleft()
 
         import time
         self._transition_start_time = time.time() * 1000  # Convert to milliseconds
@@ -605,14 +614,12 @@ class Page(QWidget):
                 for i in range(self.message_display_area.count()):
                     item = self.message_display_area.item(i)
                     widget = self.message_display_area.itemWidget(item)
-                    if widget == self._last_llm_widget:
+                    if widget == placeholder:
                         # Remove the old widget
                         self.message_display_area.takeItem(i)
                         
                         # Clean up the typing indicator
-                        if hasattr(self, '_last_typing_widget') and self._last_typing_widget:
-                            if hasattr(self._last_typing_widget, 'gif'):
-                                self._last_typing_widget.gif.stop()
+                        placeholder.typing_widget.gif.stop()
                         
                         # Create new message with empty content initially
                         new_widget = self._create_message('Joy', '', llm_message=True)
@@ -647,11 +654,6 @@ class Page(QWidget):
                         
             except Exception as e:
                 self.logger.error(f'Error starting LLM streaming: {e}')
-            finally:
-                # Clean up references
-                self._last_llm_widget = None
-                if hasattr(self, '_last_typing_widget'):
-                    self._last_typing_widget = None
 
         def _check_transition_conditions():
             """Check if we should transition based on timing and chunk availability"""
@@ -875,3 +877,23 @@ class Page(QWidget):
         """
         print('llm_placeholder')
         self.add_message('LLM', '', llm_message=True)
+
+    def last_llm_placeholder(self):
+        """
+        Typing placeholder added last, None if every answer has started
+        """
+        return self._llm_placeholders[-1] if self._llm_placeholders else None
+
+    @pyqtSlot(object)
+    def discard_llm_placeholder(self, placeholder):
+        """
+        Remove the typing placeholder of an answer that was cancelled before it started
+        """
+        if placeholder is None or placeholder not in self._llm_placeholders:
+            return
+        self._llm_placeholders.remove(placeholder)
+        for i in range(self.message_display_area.count()):
+            if self.message_display_area.itemWidget(self.message_display_area.item(i)) == placeholder:
+                placeholder.typing_widget.gif.stop()
+                self.message_display_area.takeItem(i)
+                break
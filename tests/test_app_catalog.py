@@ -0,0 +1,71 @@
+import json
+import random
+import string
+import pytest
+from src.core import config
+from src.features.app_catalog import AppCatalog
+from src.features.open_exe import find_best_app_match
+
+APP_NAMES = [
+    'Telegram Desktop', 'Discord', 'Visual Studio Code', 'Visual Studio 2022 Professional', 'Microsoft Word',
+    'Microsoft Excel', 'Microsoft PowerPoint', 'Microsoft Teams', 'Microsoft Edge', 'Google Chrome', 'Mozilla Firefox',
+    'Steam', 'Epic Games Launcher', 'Adobe Photoshop 2024', 'Adobe Acrobat Reader DC', 'Adobe Premiere Pro',
+    'GIMP 2.10', 'Inkscape', 'Blender', 'OBS Studio', 'VLC media player', 'Spotify', 'Zoom', 'Skype', 'Slack',
+    'Notepad++', 'Sublime Text', 'PyCharm Community Edition', 'IntelliJ IDEA Ultimate', 'Android Studio',
+    'Git Bash', 'PuTTY', 'WinSCP', 'FileZilla', '7-Zip File Manager', 'WinRAR', 'qBittorrent', 'Audacity',
+    'Paint.NET', 'LibreOffice Writer', 'LibreOffice Calc', 'Thunderbird', 'Postman', 'Docker Desktop',
+    'Python 3.12 (64-bit)', 'Node.js command prompt', 'Windows PowerShell', 'Viber', 'WhatsApp', 'Signal'
+]
+
+QUERIES = [
+    'telegram', 'tg', 'discord', 'vs code', 'code', 'vsc', 'visual studio', 'word', 'excel', 'ppt', 'teams',
+    'edge', 'chrome', 'firefox', 'ff', 'steam', 'epic', 'photoshop', 'ps', 'acrobat', 'pdf reader', 'premiere',
+    'gimp', 'obs', 'vlc', 'spotify', 'zoom', 'skype', 'slack', 'notepad', 'npp', 'sublime', 'pycharm', 'idea',
+    'android', 'git', 'putty', 'scp', 'ftp', '7zip', 'rar', 'torrent', 'audacity', 'paint', 'writer', 'calc',
+    'mail', 'postman', 'docker', 'python', 'node', 'powershell', 'viber', 'whats app', 'signal', 'x', 'zz top'
+]
+
+def sample_catalog(seed=0, fillers=500):
+    rng = random.Random(seed)
+    apps = {name: f'C:\\Programs\\{name}\\app.exe' for name in APP_NAMES}
+    for number in range(fillers):
+        name = ' '.join(''.join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 9))) for _ in range(rng.randint(1, 3)))
+        apps.setdefault(name.title(), f'C:\\Programs\\filler{number}\\app.exe')
+    return apps
+
+@pytest.fixture
+def catalog_file(tmp_path):
+    path = tmp_path / 'catalog.json'
+    path.write_text(json.dumps(sample_catalog()), encoding='utf-8')
+    return str(path)
+
+@pytest.mark.parametrize('max_candidates', [4, 64])
+def test_find_matches_the_full_scan(catalog_file, max_candidates):
+    catalog = AppCatalog(catalog_file, max_candidates=max_candidates)
+    apps = sample_catalog()
+    for query in QUERIES:
+        assert catalog.find(query) == find_best_app_match(query, apps), query
+        # The cached answer is the same
+        assert catalog.find(query) == find_best_app_match(query, apps), query
+
+def test_exact_name_wins(catalog_file):
+    catalog = AppCatalog(catalog_file)
+    name, path, score = catalog.find('discord')
+    assert (name, path) == ('Discord', 'C:\\Programs\\Discord\\app.exe')
+    assert score == pytest.approx(1.7)
+
+def test_lookup_cache_is_bounded(catalog_file, monkeypatch):
+    monkeypatch.setattr(config, 'app_catalog_lookups_size', 3)
+    catalog = AppCatalog(catalog_file)
+    for query in ('tg', 'vsc', 'ff', 'tg', 'npp'):
+        catalog.find(query)
+    assert list(catalog._snapshot.lookups) == ['ff', 'tg', 'npp']
+
+def test_catalog_reloads_when_the_file_changes(catalog_file, tmp_path):
+    catalog = AppCatalog(catalog_file)
+    assert catalog.find('viber')[0] == 'Viber'
+    (tmp_path / 'catalog.json').write_text(json.dumps({'Viber Messenger': 'D:\\viber.exe'}), encoding='utf-8')
+    assert catalog.find('viber')[0] == 'Viber Messenger'
+
+def test_empty_or_missing_catalog(tmp_path):
+    assert AppCatalog(str(tmp_path / 'missing.json')).find('discord') is None
@@ -0,0 +1,80 @@
+import os
+import json
+import time
+from src.features import extract_exe
+from src.features.app_sources import AppSource, FilesystemSource, build_catalog
+
+class StubSource(AppSource):
+    """
+    Source yielding fixed entries, optionally slowly, so less trusted sources finish first.
+    """
+
+    def __init__(self, name, entries, delay=0.0, available=True, fail_after=None):
+        self.name = name
+        self.entries = entries
+        self.delay = delay
+        self._available = available
+        self.fail_after = fail_after
+
+    def available(self):
+        return self._available
+
+    def discover(self):
+        for number, entry in enumerate(self.entries):
+            if number == self.fail_after:
+                raise OSError('registry key is unreadable')
+            time.sleep(self.delay)
+            yield entry
+
+def make_apps(root, apps):
+    for app_name, exe_names in apps.items():
+        os.makedirs(os.path.join(root, app_name))
+        for exe_name in exe_names:
+            open(os.path.join(root, app_name, exe_name), 'w').close()
+    return root
+
+def read_catalog(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+def test_build_catalog_from_a_folder_and_stub_sources(tmp_path):
+    root = make_apps(str(tmp_path / 'Programs'), {
+        'Telegram': ['telegram.exe', 'updater.exe'],
+        'Viber': ['viber.exe'],
+        'Notes': ['notes.exe', 'notes_helper.exe'],
+        'Empty': []
+    })
+    viber_exe = os.path.join(root, 'Viber', 'viber.exe')
+    trusted = StubSource('shortcuts', [('Telegram', 'C:\\Telegram Desktop\\Telegram.exe'), ('Mail', 'C:\\Mail\\mail.exe')], delay=0.05)
+    filesystem = FilesystemSource(root, exe_cache=extract_exe.ExeResolutionCache(str(tmp_path / 'cache.json')))
+    least_trusted = StubSource('registry', [('Viber Messenger', viber_exe), ('Game', 'C:\\Games\\game.exe')])
+    output = str(tmp_path / 'catalog.json')
+
+    stats = build_catalog([trusted, filesystem, least_trusted], output)
+
+    catalog = read_catalog(output)
+    # The slow trusted source still comes first, the folder's 'Telegram' is a duplicate name
+    assert list(catalog)[:2] == ['Telegram', 'Mail']
+    assert catalog['Telegram'] == os.path.normpath('C:\\Telegram Desktop\\Telegram.exe')
+    assert set(list(catalog)[2:4]) == {'Viber', 'Notes'}
+    assert catalog['Notes'] == os.path.join(root, 'Notes', 'notes.exe')
+    # 'Viber Messenger' points to the folder's viber.exe, a duplicate path
+    assert list(catalog)[4:] == ['Game']
+    assert 'Viber Messenger' not in catalog and 'Empty' not in catalog
+    assert (stats.written, stats.duplicates) == (5, 2)
+
+def test_unavailable_and_failing_sources(tmp_path):
+    output = str(tmp_path / 'catalog.json')
+    sources = [StubSource('missing', [('Other', 'C:\\other.exe')], available=False),
+               StubSource('broken', [('App', 'C:\\app.exe'), ('Lost', 'C:\\lost.exe')], fail_after=1),
+               StubSource('fine', [('Tool', 'C:\\tool.exe')])]
+    stats = build_catalog(sources, output)
+    assert list(read_catalog(output)) == ['App', 'Tool']
+    assert stats.written == 2
+
+def test_no_available_source_keeps_the_old_catalog(tmp_path):
+    output = tmp_path / 'catalog.json'
+    output.write_text('{"Old": "C:\\\\old.exe"}', encoding='utf-8')
+    stats = build_catalog([StubSource('missing', [], available=False)], str(output))
+    assert stats.written == 0
+    assert read_catalog(output) == {'Old': 'C:\\old.exe'}
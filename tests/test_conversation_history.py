@@ -0,0 +1,104 @@
+import threading
+import time
+import pytest
+from src.core import config
+from src.core.conversation_history import ConversationHistory
+
+# 10 estimated tokens per message, 20 per turn
+MESSAGE = 'x' * 39
+
+class FakeSummarizer:
+    """
+    `summarize` callable recording its calls, blocked until `release` is set if `blocking`.
+    """
+
+    def __init__(self, result='SUMMARY', blocking=False):
+        self.result = result
+        self.calls = []
+        self.release = threading.Event()
+        if not blocking:
+            self.release.set()
+
+    def __call__(self, summary, messages):
+        self.calls.append((summary, list(messages)))
+        self.release.wait(5)
+        return self.result
+
+@pytest.fixture(autouse=True)
+def recent_turns(monkeypatch):
+    monkeypatch.setattr(config, 'llm_history_recent_turns', 1)
+
+def chat(history, turns, start=0):
+    for turn in range(start, start + turns):
+        history.append('user', f'{turn:02}' + MESSAGE[2:])
+        history.append('assistant', f'{turn:02}' + MESSAGE[2:])
+
+def test_folds_old_turns_to_half_the_budget():
+    summarizer = FakeSummarizer()
+    history = ConversationHistory(budget=100, summarize=summarizer)
+    chat(history, 4)
+    assert not summarizer.calls
+    chat(history, 1, start=4)
+    history.wait()
+
+    summary, folded = summarizer.calls[0]
+    assert summary == ''
+    assert [message['content'][:2] for message in folded] == ['00', '00', '01', '01', '02', '02']
+    assert history.summary == 'SUMMARY'
+    assert len(history) == 4
+    assert history.tokens() <= history.budget // 2
+    assert 'SUMMARY' in history.messages()[0]['content']
+
+def test_keeps_the_recent_turns(monkeypatch):
+    monkeypatch.setattr(config, 'llm_history_recent_turns', 2)
+    summarizer = FakeSummarizer()
+    # Every turn alone is over the budget
+    history = ConversationHistory(budget=10, summarize=summarizer)
+    chat(history, 2)
+    assert not summarizer.calls
+    chat(history, 1, start=2)
+    history.wait()
+    assert [message['content'][:2] for message in history.messages() if message['role'] != 'system'] == ['01', '01', '02', '02']
+
+def test_drops_old_turns_at_twice_the_budget_while_summarizing():
+    summarizer = FakeSummarizer(blocking=True)
+    history = ConversationHistory(budget=100, summarize=summarizer)
+    try:
+        chat(history, 5)
+        assert history.summarizing
+        chat(history, 10, start=5)
+        assert history.tokens() <= 2 * history.budget
+        # The newest turn is always kept
+        assert history.messages()[-1]['content'][:2] == '14'
+    finally:
+        summarizer.release.set()
+    history.wait()
+    assert not history.summarizing
+    assert history.summary == 'SUMMARY'
+
+def test_clear_discards_a_running_summary():
+    summarizer = FakeSummarizer(result='OLD SUMMARY', blocking=True)
+    history = ConversationHistory(budget=100, summarize=summarizer)
+    chat(history, 5)
+    pending = history._pending
+    history.clear()
+    summarizer.release.set()
+    pending.result(5)
+    assert history.summary == ''
+    assert len(history) == 0
+
+def test_pop_on_empty_history():
+    history = ConversationHistory(summarize=FakeSummarizer())
+    assert history.pop() is None
+    history.append('user', 'question')
+    assert history.pop() == {'role': 'user', 'content': 'question'}
+    assert history.tokens() == ConversationHistory(summarize=FakeSummarizer()).tokens()
+
+def test_to_dict_from_dict_round_trip():
+    history = ConversationHistory('Be brief', budget=1000, summarize=FakeSummarizer())
+    history.summary = 'Earlier: the user likes tea'
+    chat(history, 3)
+    restored = ConversationHistory.from_dict(history.to_dict(), budget=1000)
+    assert restored.messages() == history.messages()
+    assert restored.tokens() == history.tokens()
+    assert restored.to_dict() == history.to_dict()
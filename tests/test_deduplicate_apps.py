@@ -0,0 +1,138 @@
+import os
+import json
+import pytest
+from src.features import deduplicate_apps
+from src.features.deduplicate_apps import CatalogBuilder, iter_json_object, normalize_target_path, start_deduplication
+
+# Keys and values with escaped quotes, braces, commas and colons inside strings, non-ASCII text and numbers
+TRICKY_OBJECT = {
+    'Plain App': 'C:\\Program Files\\App\\app.exe',
+    'Quote "App"': 'C:\\Apps\\"quoted"\\app.exe',
+    'Braces {App}': 'C:\\Apps\\{braces}\\[x]\\app.exe',
+    'Separators , : }': 'C:\\Apps\\a,b:c}\\app.exe',
+    'Escapes \\ \n \t \u00e9': 'C:\\\\server\\share\\app.exe',
+    'Ünïcödé приложение': 'D:\\Программы\\app.exe',
+    'Number': 12345.678e-3,
+    'Nested': {'a': [1, 2, {'b': '}'}]},
+    'Null': None
+}
+
+def write_json(path, text):
+    with open(path, 'w', encoding='utf-8') as file:
+        file.write(text)
+    return str(path)
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 7, 16, 64, deduplicate_apps.CHUNK_SIZE])
+@pytest.mark.parametrize('indent', [None, 2])
+def test_iter_json_object_across_chunk_boundaries(tmp_path, chunk_size, indent):
+    path = write_json(tmp_path / 'source.json', json.dumps(TRICKY_OBJECT, indent=indent, ensure_ascii=False))
+    assert list(iter_json_object(path, chunk_size)) == list(TRICKY_OBJECT.items())
+
+@pytest.mark.parametrize('chunk_size', [1, 4, 1000])
+def test_iter_json_object_large_object(tmp_path, chunk_size):
+    data = {f'App "{number}" {{x}}': f'C:\\Apps\\{number}\\app.exe' for number in range(2000)}
+    path = write_json(tmp_path / 'source.json', json.dumps(data))
+    assert dict(iter_json_object(path, chunk_size)) == data
+
+@pytest.mark.parametrize('text', ['{}', '  {\n }  ', '\n{}\n'])
+def test_iter_json_object_empty(tmp_path, text):
+    assert list(iter_json_object(write_json(tmp_path / 'source.json', text), 2)) == []
+
+@pytest.mark.parametrize('text', ['[1, 2]', '"text"', '{"a": "b"', '{"a" "b"}', '{"a": "b" "c": "d"}', '{"a": "unterminated}'])
+def test_iter_json_object_invalid(tmp_path, text):
+    path = write_json(tmp_path / 'source.json', text)
+    with pytest.raises(ValueError):
+        list(iter_json_object(path, 3))
+
+@pytest.mark.parametrize('raw, expected', [
+    ('C:\\Apps\\app.exe', os.path.normpath('C:\\Apps\\app.exe')),
+    ('  "C:\\Apps\\app.exe"  ', os.path.normpath('C:\\Apps\\app.exe')),
+    ('"C:\\Apps\\app.exe",0', os.path.normpath('C:\\Apps\\app.exe')),
+    ('C:\\Apps\\app.exe,-101', os.path.normpath('C:\\Apps\\app.exe')),
+    ('"C:\\Apps\\app.exe", 3', os.path.normpath('C:\\Apps\\app.exe')),
+    # A comma that isn't followed by an icon index is a part of the path
+    ('C:\\Apps,Tools\\app.exe', os.path.normpath('C:\\Apps,Tools\\app.exe')),
+    ('C:/Apps/./Sub/../app.exe', os.path.normpath('C:/Apps/app.exe')),
+])
+def test_normalize_target_path(raw, expected):
+    assert normalize_target_path(raw) == expected
+
+@pytest.mark.parametrize('raw', ['', '   ', '""', '",0', None, 42, ['C:\\app.exe']])
+def test_normalize_target_path_unusable(raw):
+    assert normalize_target_path(raw) is None
+
+def test_normalize_target_path_expands_variables(monkeypatch):
+    monkeypatch.setenv('DEDUP_TEST_DIR', os.path.join('X', 'Programs'))
+    assert normalize_target_path('"%DEDUP_TEST_DIR%\\app.exe",0' if os.name == 'nt' else '"$DEDUP_TEST_DIR/app.exe",0') == \
+        os.path.normpath(os.path.join('X', 'Programs', 'app.exe'))
+
+def read_catalog(path):
+    with open(path, 'r', encoding='utf-8') as file:
+        return json.load(file)
+
+def test_catalog_builder_keeps_priority_order_with_interleaved_sources(tmp_path):
+    output = str(tmp_path / 'catalog.json')
+    builder = CatalogBuilder(output, sources_count=3)
+    # Less trusted sources deliver first, their entries wait for the sources before them
+    builder.add(2, 'Editor', 'C:\\Low\\editor.exe')
+    builder.add(1, 'Browser', 'C:\\Mid\\browser.exe')
+    builder.add(1, 'Editor Copy', 'C:\\Top\\editor.exe')
+    builder.add(0, 'Editor', 'C:\\Top\\editor.exe')
+    builder.finish_source(1)
+    builder.add(2, 'Player', 'C:\\Low\\player.exe')
+    builder.add(0, 'Mail', 'C:\\Top\\mail.exe')
+    builder.finish_source(0)
+    builder.add(2, 'BROWSER', 'C:\\Low\\other_browser.exe')
+    stats = builder.close()
+
+    catalog = read_catalog(output)
+    assert list(catalog) == ['Editor', 'Mail', 'Browser', 'Player']
+    assert catalog['Editor'] == os.path.normpath('C:\\Top\\editor.exe')
+    assert catalog['Browser'] == os.path.normpath('C:\\Mid\\browser.exe')
+    # 'Editor Copy' (same path), 'Editor' of source 2 and 'BROWSER' (same names) are dropped
+    assert (stats.read, stats.written, stats.duplicates, stats.invalid) == (7, 4, 3, 0)
+    assert not os.path.exists(f'{output}.tmp')
+
+def test_catalog_builder_counts_invalid_entries(tmp_path):
+    output = str(tmp_path / 'catalog.json')
+    builder = CatalogBuilder(output)
+    builder.add(0, 'App', 'C:\\app.exe')
+    builder.add(0, 'No Path', '')
+    builder.add(0, 42, 'C:\\number.exe')
+    builder.add(0, 'Not A Path', 17)
+    stats = builder.close()
+    assert read_catalog(output) == {'App': os.path.normpath('C:\\app.exe')}
+    assert (stats.read, stats.written, stats.invalid) == (4, 1, 3)
+
+def test_start_deduplication_prefers_earlier_sources(tmp_path):
+    shortcuts = write_json(tmp_path / 'shortcuts.json', json.dumps({'App': 'C:\\Apps\\app.exe', 'Tool': '"C:\\Tools\\tool.exe",0'}))
+    registry = write_json(tmp_path / 'registry.json', json.dumps({'App (Registry)': 'c:\\apps\\APP.exe' if os.name == 'nt' else 'C:\\Apps\\app.exe',
+                                                                  'Game': 'C:\\Games\\game.exe'}))
+    output = str(tmp_path / 'catalog.json')
+    stats = start_deduplication([shortcuts, str(tmp_path / 'missing.json'), registry], output)
+    assert list(read_catalog(output)) == ['App', 'Tool', 'Game']
+    assert (stats.written, stats.duplicates) == (3, 1)
+
+def test_catalog_file_defaults_to_config(tmp_path, monkeypatch):
+    from src.core import config
+    monkeypatch.setattr(config, 'APPS_CATALOG_FILE', str(tmp_path / 'default.json'))
+    builder = CatalogBuilder()
+    builder.add(0, 'App', 'C:\\app.exe')
+    builder.close()
+    assert os.path.exists(tmp_path / 'default.json')
+
+def test_catalog_builder_spills_waiting_entries_beyond_the_limit(tmp_path):
+    output = str(tmp_path / 'catalog.json')
+    builder = CatalogBuilder(output, sources_count=2, pending_limit=2)
+    for number in range(5):
+        builder.add(1, f'Low {number}', f'C:\\Low\\app{number}.exe')
+    # At most `pending_limit` entries wait in memory, the rest are on disk
+    assert len(builder._pending[1]) < 2
+    assert os.path.exists(f'{output}.pending1.tmp')
+    builder.add(0, 'Low 3', 'C:\\Top\\app.exe')
+    builder.finish_source(0)
+    stats = builder.close()
+
+    assert list(read_catalog(output)) == ['Low 3', 'Low 0', 'Low 1', 'Low 2', 'Low 4']
+    assert (stats.read, stats.written, stats.duplicates) == (6, 5, 1)
+    assert not os.path.exists(f'{output}.pending1.tmp')
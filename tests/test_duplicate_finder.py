@@ -0,0 +1,107 @@
+import os
+import pytest
+from src.core import config
+from src.features import duplicate_finder
+from src.features.duplicate_finder import DuplicateStats, find_duplicates, full_hash, quick_hash
+
+BLOCK = 1024
+
+@pytest.fixture(autouse=True)
+def small_blocks(monkeypatch):
+    monkeypatch.setattr(config, 'duplicate_block_size', BLOCK)
+
+def write(root, name, content):
+    path = os.path.join(root, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'wb') as file:
+        file.write(content)
+    return path
+
+def big(middle: bytes, head=b'h', tail=b't') -> bytes:
+    # Same first and last block, the middle decides the content
+    return head * BLOCK + middle * BLOCK + tail * BLOCK
+
+def search(root, **kwargs):
+    stats = DuplicateStats()
+    groups = find_duplicates(str(root), workers=2, stats=stats, **kwargs)
+    return [(group.size, group.paths) for group in groups], stats
+
+def test_unique_sizes_are_never_opened(tmp_path, monkeypatch):
+    write(tmp_path, 'a.bin', b'1')
+    write(tmp_path, 'b.bin', b'22')
+    write(tmp_path, 'sub/c.bin', b'333')
+    monkeypatch.setattr(duplicate_finder, '_hash_mapped', lambda *args: pytest.fail('a file was hashed'))
+    groups, stats = search(tmp_path)
+    assert groups == []
+    assert (stats.files, stats.size_candidates, stats.quick_hashed, stats.full_hashed) == (3, 0, 0, 0)
+
+def test_quick_hash_drops_files_that_differ_at_the_start(tmp_path):
+    write(tmp_path, 'a.bin', big(b'm', head=b'a'))
+    write(tmp_path, 'b.bin', big(b'm', head=b'b'))
+    groups, stats = search(tmp_path)
+    assert groups == []
+    assert (stats.size_candidates, stats.quick_hashed, stats.full_hashed) == (2, 2, 0)
+
+def test_full_hash_separates_files_that_differ_in_the_middle(tmp_path):
+    write(tmp_path, 'a.bin', big(b'x'))
+    write(tmp_path, 'copy of a.bin', big(b'x'))
+    write(tmp_path, 'b.bin', big(b'y'))
+    groups, stats = search(tmp_path)
+    assert groups == [(3 * BLOCK, ['a.bin', 'copy of a.bin'])]
+    assert (stats.size_candidates, stats.quick_hashed, stats.full_hashed) == (3, 3, 3)
+
+def test_small_files_are_not_hashed_twice(tmp_path, monkeypatch):
+    write(tmp_path, 'a.txt', b'same' * 10)
+    write(tmp_path, 'dir/a.txt', b'same' * 10)
+    write(tmp_path, 'b.txt', b'diff' * 10)
+    monkeypatch.setattr(duplicate_finder, 'full_hash', lambda *args: pytest.fail('a small file was fully hashed'))
+    groups, stats = search(tmp_path)
+    assert groups == [(40, ['a.txt', 'dir/a.txt'])]
+    assert stats.full_hashed == 0
+
+def test_quick_hash_of_a_small_file_is_its_full_hash(tmp_path):
+    for size in (1, BLOCK, 2 * BLOCK):
+        path = write(tmp_path, f'{size}.bin', os.urandom(size))
+        assert quick_hash(path, size) == full_hash(path, size)
+    path = write(tmp_path, 'big.bin', os.urandom(2 * BLOCK + 1))
+    assert quick_hash(path, 2 * BLOCK + 1) != full_hash(path, 2 * BLOCK + 1)
+
+def test_empty_files_are_ignored(tmp_path):
+    write(tmp_path, 'a.txt', b'')
+    write(tmp_path, 'b.txt', b'')
+    assert search(tmp_path)[0] == []
+
+def test_unreadable_files_are_dropped(tmp_path, monkeypatch):
+    for name in ('a.bin', 'b.bin', 'c.bin'):
+        write(tmp_path, name, b'same')
+    hash_mapped = duplicate_finder._hash_mapped
+
+    def failing(path, size, block_size):
+        if path.endswith('b.bin'):
+            raise PermissionError('locked')
+        return hash_mapped(path, size, block_size)
+
+    monkeypatch.setattr(duplicate_finder, '_hash_mapped', failing)
+    assert search(tmp_path)[0] == [(4, ['a.bin', 'c.bin'])]
+
+def test_groups_are_sorted_by_wasted_space(tmp_path):
+    for name in ('a1', 'a2'):
+        write(tmp_path, name, b'a' * 100)
+    for name in ('b1', 'b2', 'b3'):
+        write(tmp_path, name, b'b' * 100)
+    write(tmp_path, 'c1', big(b'c'))
+    write(tmp_path, 'c2', big(b'c'))
+    groups = find_duplicates(str(tmp_path))
+    assert [group.paths[0] for group in groups] == ['c1', 'b1', 'a1']
+    assert [group.wasted for group in groups] == [3 * BLOCK, 200, 100]
+
+def test_result_message(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'message_to_display', '')
+    write(tmp_path, 'a.txt', b'x' * 2048)
+    write(tmp_path, 'b.txt', b'x' * 2048)
+    assert len(duplicate_finder.find_duplicates_in_folder(str(tmp_path))) == 1
+    assert 'would free 2.0 KB' in config.message_to_display
+    assert '2.0 KB x 2: a.txt, b.txt' in config.message_to_display
+
+    assert duplicate_finder.find_duplicates_in_folder(str(tmp_path / 'missing')) is None
+    assert 'was not searched' in config.message_to_display
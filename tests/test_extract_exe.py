@@ -0,0 +1,37 @@
+import os
+from src.features import extract_exe
+from src.features.extract_exe import ExeResolutionCache, resolve_exes
+
+def make_app(root, name, exe_names):
+    app_dir = os.path.join(root, name)
+    os.makedirs(app_dir)
+    for exe_name in exe_names:
+        open(os.path.join(app_dir, exe_name), 'w').close()
+    return app_dir
+
+def test_resolve_exes_keeps_input_order(tmp_path):
+    apps = [(f'App {number}', make_app(str(tmp_path), f'App {number}', [f'app {number}.exe', 'uninstall.exe']))
+            for number in range(20)]
+    apps.append(('Missing', str(tmp_path / 'missing')))
+    cache = ExeResolutionCache(str(tmp_path / 'cache.json'))
+    results = list(resolve_exes(apps, cache=cache, workers=3))
+    assert [name for name, _ in results] == [name for name, _ in apps]
+    assert results[0][1] == os.path.join(apps[0][1], 'app 0.exe')
+    assert results[-1][1] is None
+    assert os.path.exists(tmp_path / 'cache.json')
+
+def test_resolve_exes_streams_its_input(tmp_path, monkeypatch):
+    monkeypatch.setattr(extract_exe.config, 'exe_resolution_window', 2)
+    app_dir = make_app(str(tmp_path), 'App', ['app.exe'])
+    read = []
+
+    def discover():
+        for number in range(1000):
+            read.append(number)
+            yield f'App {number}', app_dir
+
+    results = resolve_exes(discover(), cache=ExeResolutionCache(str(tmp_path / 'cache.json')), workers=2)
+    assert next(results) == ('App 0', os.path.join(app_dir, 'app.exe'))
+    # Only a window of the input is read ahead of the first result
+    assert len(read) <= 2 * 2
+    results.close()
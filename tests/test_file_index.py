@@ -0,0 +1,124 @@
+import os
+import gzip
+import json
+import pytest
+from src.core import config
+from src.features import file_index
+
+@pytest.fixture(autouse=True)
+def index_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'FILE_INDEX_FILE', str(tmp_path / 'file_index.json.gz'))
+    monkeypatch.setattr(config, 'scan_prune_prefixes', ())
+    monkeypatch.setattr(file_index, '_index', None)
+    file_index._stop.clear()
+    yield tmp_path / 'file_index.json.gz'
+    file_index._stop.clear()
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / 'Programs'
+    for folder, names in (('', ['readme.txt']), ('Telegram', ['telegram.exe', 'updater.exe']),
+                          (os.path.join('Telegram', 'modules'), ['core.dll']), ('node_modules', ['pkg.js'])):
+        os.makedirs(root / folder, exist_ok=True)
+        for name in names:
+            (root / folder / name).write_text('x')
+    return str(root)
+
+def listings(root):
+    return {os.path.relpath(directory, root): sorted(files) for directory, files in file_index.iter_listings(root)}
+
+def test_build_and_load_round_trip(tree, index_file, monkeypatch):
+    stats = file_index.refresh_index([tree])
+    assert (stats.reread, stats.skipped, stats.removed) == (3, 0, 0)
+    expected = {'.': ['readme.txt'], 'Telegram': ['telegram.exe', 'updater.exe'], os.path.join('Telegram', 'modules'): ['core.dll']}
+    assert listings(tree) == expected
+
+    # Read back from disk
+    monkeypatch.setattr(file_index, '_index', None)
+    data = file_index.load_index()
+    assert data['version'] == file_index.INDEX_VERSION
+    assert listings(tree) == expected
+    assert file_index.covers(tree)
+    assert not file_index.covers(os.path.join(tree, 'Telegram'))
+    assert file_index.age() < 60
+
+def test_old_or_broken_index_is_not_used(index_file):
+    with gzip.open(index_file, 'wt', encoding='utf-8') as file:
+        json.dump({'version': 1, 'roots': {}}, file)
+    assert file_index.load_index() is None
+    index_file.write_bytes(b'not gzip')
+    assert file_index.load_index() is None
+    assert file_index.age() == float('inf')
+
+def test_stale_index_does_not_cover(tree, monkeypatch):
+    file_index.refresh_index([tree])
+    monkeypatch.setattr(config, 'file_index_max_age', -1)
+    assert not file_index.covers(tree)
+
+def test_finished_scans_do_not_stop_the_build(tree):
+    config.stop_scaning.set()
+    try:
+        stats = file_index.refresh_index([tree])
+    finally:
+        config.stop_scaning.clear()
+    assert stats is not None
+    assert file_index.covers(tree)
+
+def test_stop_refresh_interrupts_without_saving(tree, index_file):
+    file_index.stop_refresh()
+    assert file_index.refresh_index([tree]) is None
+    assert not os.path.exists(index_file)
+    assert file_index.load_index() is None
+
+def touch_directory(path):
+    # Move the mtime forward explicitly, file systems with a coarse mtime may not change it otherwise
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 2_000_000_000))
+
+def test_unchanged_directories_are_not_reread(tree):
+    file_index.refresh_index([tree])
+    stats = file_index.refresh_index([tree])
+    assert (stats.reread, stats.skipped, stats.removed) == (0, 3, 0)
+
+def test_changed_mtime_triggers_a_reread(tree):
+    file_index.refresh_index([tree])
+    telegram = os.path.join(tree, 'Telegram')
+    open(os.path.join(telegram, 'telegram_beta.exe'), 'w').close()
+    touch_directory(telegram)
+
+    stats = file_index.refresh_index([tree])
+    assert (stats.reread, stats.skipped) == (1, 2)
+    assert 'telegram_beta.exe' in listings(tree)['Telegram']
+
+def test_removed_and_new_directories(tree):
+    file_index.refresh_index([tree])
+    modules = os.path.join(tree, 'Telegram', 'modules')
+    os.remove(os.path.join(modules, 'core.dll'))
+    os.rmdir(modules)
+    os.makedirs(os.path.join(tree, 'Viber'))
+    touch_directory(os.path.join(tree, 'Telegram'))
+    touch_directory(tree)
+
+    stats = file_index.refresh_index([tree])
+    assert (stats.reread, stats.skipped, stats.removed) == (3, 0, 1)
+    assert set(listings(tree)) == {'.', 'Telegram', 'Viber'}
+
+def test_other_prune_rules_rebuild_the_index(tree, monkeypatch):
+    file_index.refresh_index([tree])
+    monkeypatch.setattr(config, 'scan_prune_globs', ())
+    stats = file_index.refresh_index([tree])
+    assert (stats.reread, stats.skipped) == (4, 0)
+    assert 'node_modules' in listings(tree)
+
+def test_rebuild_ignores_the_stored_index(tree):
+    file_index.refresh_index([tree])
+    stats = file_index.refresh_index([tree], rebuild=True)
+    assert (stats.reread, stats.skipped) == (3, 0)
+
+def test_only_one_refresh_runs_at_a_time(tree):
+    with file_index._build_lock:
+        assert file_index.refresh_index([tree]) is None
+        assert file_index.refresh_index_in_background([tree]) is None
+    thread = file_index.refresh_index_in_background([tree])
+    thread.join(10)
+    assert file_index.covers(tree)
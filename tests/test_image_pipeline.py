@@ -0,0 +1,113 @@
+import numpy as np
+import pytest
+from PIL import Image
+from src.features import image_pipeline
+from src.features.image_pipeline import ImageOperation, parse_operations, plan_operations, run_pipeline
+
+def operations(text):
+    return [(operation.name, operation.args) for operation in parse_operations(text)]
+
+def test_parse_operations_in_the_order_they_are_mentioned():
+    assert operations('resize to 800x600, rotate 90 and make it gray, convert to png') == [
+        ('resize', (800, 600)), ('rotate', (90,)), ('grayscale', ()), ('convert', ('png',))
+    ]
+
+@pytest.mark.parametrize('text, expected', [
+    ('resize it 50%', [('scale', (50,))]),
+    ('scale to 25 %', [('scale', (25,))]),
+    ('crop 10 20 110 120', [('crop', (10, 20, 110, 120))]),
+    ('rotate', [('rotate', (90,))]),
+    ('rotate it by -45', [('rotate', (-45,))]),
+    ('make it black and white', [('grayscale', ())]),
+    ('grey please', [('grayscale', ())]),
+    ('thumbnail', [('thumbnail', (256,))]),
+    ('thumbnail of 128', [('thumbnail', (128,))]),
+    ('convert it to .JPG', [('convert', ('jpg',))]),
+])
+def test_parse_single_operations(text, expected):
+    assert operations(text) == expected
+
+@pytest.mark.parametrize('text', ['convert it to pdf', 'crop the image', 'greatly appreciated', 'the integrated photo'])
+def test_nothing_understood(text):
+    assert parse_operations(text) == []
+
+def test_resizes_and_crops_are_fused_into_one_resampling():
+    plan = plan_operations([
+        ImageOperation('crop', (100, 100, 900, 700)),
+        ImageOperation('resize', (400, 300)),
+        ImageOperation('thumbnail', (200,))
+    ], (1000, 800))
+    assert [step.kind for step in plan.steps] == ['resample']
+    assert plan.steps[0].args == ((200, 150), (100.0, 100.0, 900.0, 700.0))
+
+def test_crop_after_a_resize_maps_back_to_the_source():
+    plan = plan_operations([ImageOperation('scale', (50,)), ImageOperation('crop', (0, 0, 100, 50))], (400, 200))
+    assert plan.steps[0].args == ((100, 50), (0.0, 0.0, 200.0, 100.0))
+
+def test_rotations_become_one_transposition():
+    plan = plan_operations([ImageOperation('rotate', (90,)), ImageOperation('rotate', (180,))], (10, 20))
+    assert [(step.kind, step.args) for step in plan.steps] == [('transpose', (Image.Transpose.ROTATE_270,))]
+    assert plan_operations([ImageOperation('rotate', (180,)), ImageOperation('rotate', (180,))], (10, 20)).steps == []
+
+def test_whole_image_resample_is_dropped():
+    assert plan_operations([ImageOperation('resize', (10, 20)), ImageOperation('grayscale'), ImageOperation('grayscale')], (10, 20)).steps == [
+        image_pipeline._Step('grayscale')
+    ]
+
+def test_free_rotation_plans_the_rest_later():
+    later = [ImageOperation('resize', (50, 50)), ImageOperation('convert', ('webp',))]
+    plan = plan_operations([ImageOperation('rotate', (30,))] + later, (100, 100))
+    assert [step.kind for step in plan.steps] == ['rotate']
+    assert plan.rest == later
+    assert plan.output_format == 'webp'
+
+@pytest.mark.parametrize('operation', [
+    ImageOperation('crop', (0, 0, 200, 10)),
+    ImageOperation('convert', ('pdf',)),
+    ImageOperation('sharpen')
+])
+def test_invalid_operations(operation):
+    with pytest.raises(ValueError):
+        plan_operations([operation], (100, 100))
+
+def test_pipeline_matches_the_steps_one_by_one(tmp_path):
+    source = tmp_path / 'photo.png'
+    pixels = np.random.default_rng(0).integers(0, 256, size=(120, 160, 3), dtype=np.uint8)
+    Image.fromarray(pixels, mode='RGB').save(source)
+
+    output_path = run_pipeline(str(source), [
+        ImageOperation('crop', (20, 10, 140, 110)),
+        ImageOperation('rotate', (90,)),
+        ImageOperation('grayscale'),
+        ImageOperation('convert', ('bmp',))
+    ])
+
+    assert output_path == str(tmp_path / 'cropped_rotated_gray_converted_photo.bmp')
+    expected = image_pipeline._grayscale(
+        Image.fromarray(pixels, mode='RGB').crop((20, 10, 140, 110)).transpose(Image.Transpose.ROTATE_90)
+    )
+    with Image.open(output_path) as result:
+        assert result.mode == 'L'
+        assert np.array_equal(np.asarray(result), np.asarray(expected))
+
+def test_free_rotation_then_resize(tmp_path):
+    source = tmp_path / 'photo.png'
+    Image.new('RGB', (100, 50), 'red').save(source)
+    output_path = run_pipeline(str(source), [ImageOperation('rotate', (45,)), ImageOperation('resize', (40, 30))])
+    with Image.open(output_path) as result:
+        assert result.size == (40, 30)
+
+def test_transparency_is_flattened_for_jpeg(tmp_path):
+    source = tmp_path / 'logo.png'
+    Image.new('RGBA', (20, 20), (255, 0, 0, 128)).save(source)
+    output_path = run_pipeline(str(source), [ImageOperation('convert', ('jpg',))])
+    with Image.open(output_path) as result:
+        assert (result.format, result.mode) == ('JPEG', 'RGB')
+
+def test_process_image_leaves_the_pic_alone_when_nothing_is_understood(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_pipeline.config, 'message_to_display', '')
+    source = tmp_path / 'photo.png'
+    Image.new('RGB', (10, 10)).save(source)
+    image_pipeline.process_image((str(source), 'convert it to pdf'))
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['photo.png']
+    assert 'did not understand' in image_pipeline.config.message_to_display
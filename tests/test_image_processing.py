@@ -0,0 +1,157 @@
+import queue
+import numpy as np
+import pytest
+from PIL import Image
+from src.features import image_processing
+from src.features.image_processing import _luminance, grayscale_array
+
+def per_pixel(rgb_array):
+    """
+    The per-pixel formula the conversion used before it was vectorized.
+    """
+    return np.array(
+        [[int(0.299 * r + 0.587 * g + 0.114 * b) for r, g, b, *_ in row] for row in rgb_array.tolist()],
+        dtype=np.uint8
+    )
+
+def random_rgb(height, width, channels=3, seed=0):
+    return np.random.default_rng(seed).integers(0, 256, size=(height, width, channels), dtype=np.uint8)
+
+def test_luminance_is_bit_exact():
+    rgb_array = random_rgb(200, 300)
+    assert np.array_equal(_luminance(rgb_array), per_pixel(rgb_array))
+
+def test_luminance_is_bit_exact_on_edge_values():
+    # Every combination of the values where truncation is most likely to differ
+    values = [0, 1, 2, 127, 128, 129, 253, 254, 255]
+    rgb_array = np.array([[[r, g, b] for g in values for b in values] for r in values], dtype=np.uint8)
+    assert np.array_equal(_luminance(rgb_array), per_pixel(rgb_array))
+    # Pure gray stays the same
+    gray = np.repeat(np.arange(256, dtype=np.uint8).reshape(1, 256, 1), 3, axis=2)
+    assert np.array_equal(_luminance(gray), per_pixel(gray))
+
+def test_luminance_ignores_alpha():
+    rgba_array = random_rgb(50, 60, channels=4)
+    assert np.array_equal(_luminance(rgba_array), per_pixel(rgba_array))
+
+def test_grayscale_array_of_an_rgb_image():
+    rgb_array = random_rgb(120, 80)
+    assert np.array_equal(grayscale_array(Image.fromarray(rgb_array, mode='RGB')), per_pixel(rgb_array))
+
+def test_grayscale_array_of_a_grayscale_image():
+    img = Image.fromarray(random_rgb(40, 30), mode='RGB').convert('L')
+    assert np.array_equal(grayscale_array(img), np.asarray(img))
+
+@pytest.mark.parametrize('mode', ['P', 'CMYK', '1'])
+def test_grayscale_array_of_other_modes(mode):
+    img = Image.fromarray(random_rgb(40, 30), mode='RGB').convert(mode)
+    gray_array = grayscale_array(img)
+    assert gray_array.shape == (40, 30)
+    assert np.array_equal(gray_array, per_pixel(np.asarray(img.convert('RGB'))))
+
+def test_grayscale_array_keeps_alpha():
+    rgba_array = random_rgb(40, 30, channels=4)
+    gray_array = grayscale_array(Image.fromarray(rgba_array, mode='RGBA'))
+    assert gray_array.shape == (40, 30, 2)
+    assert np.array_equal(gray_array[..., 0], per_pixel(rgba_array))
+    assert np.array_equal(gray_array[..., 1], rgba_array[..., 3])
+
+def test_gray_image_path():
+    assert image_processing.gray_image_path('/home/user/pics/cat.png') == '/home/user/pics/gray_cat.png'
+
+def test_strips_stay_within_the_tile_budget():
+    img = Image.fromarray(random_rgb(100, 50), mode='RGB')
+    # A row of an RGB strip needs width * (2 * 3 bands + 18) bytes
+    budget = 7 * 50 * 24
+    strips = list(image_processing.iter_grayscale_strips(img, tile_budget=budget))
+    assert [top for top, _ in strips] == list(range(0, 100, 7))
+    assert all(len(strip) <= 7 for _, strip in strips)
+    assert np.array_equal(np.vstack([strip for _, strip in strips]), grayscale_array(img))
+
+def test_one_row_strips_when_the_budget_is_tiny():
+    img = Image.fromarray(random_rgb(10, 20), mode='RGB')
+    assert len(list(image_processing.iter_grayscale_strips(img, tile_budget=1))) == 10
+
+@pytest.mark.parametrize('tile_budget', [1, 10_000, None])
+def test_png_strip_writer(tmp_path, tile_budget):
+    rgb_array = random_rgb(64, 48)
+    output_path = str(tmp_path / 'gray.png')
+    image_processing.save_grayscale(Image.fromarray(rgb_array, mode='RGB'), output_path, tile_budget)
+    with Image.open(output_path) as saved:
+        assert saved.mode == 'L'
+        assert np.array_equal(np.asarray(saved), per_pixel(rgb_array))
+
+def test_other_formats_are_saved_by_pillow(tmp_path):
+    rgb_array = random_rgb(30, 40)
+    output_path = str(tmp_path / 'gray.bmp')
+    image_processing.save_grayscale(Image.fromarray(rgb_array, mode='RGB'), output_path, tile_budget=1000)
+    with Image.open(output_path) as saved:
+        assert saved.mode == 'L'
+        assert np.array_equal(np.asarray(saved), per_pixel(rgb_array))
+
+def test_failed_conversion_leaves_no_truncated_png(tmp_path, monkeypatch):
+    def broken_strips(img, tile_budget=None):
+        yield 0, np.zeros((1, img.width), dtype=np.uint8)
+        raise OSError('truncated source')
+
+    monkeypatch.setattr(image_processing, 'iter_grayscale_strips', broken_strips)
+    output_path = tmp_path / 'gray.png'
+    with pytest.raises(OSError):
+        image_processing.save_grayscale(Image.new('RGB', (8, 8)), str(output_path))
+    assert not output_path.exists()
+
+def test_rgba_round_trip_keeps_alpha_as_la(tmp_path):
+    rgba_array = random_rgb(50, 70, channels=4)
+    output_path = str(tmp_path / 'gray.png')
+    image_processing.save_grayscale(Image.fromarray(rgba_array, mode='RGBA'), output_path, tile_budget=5000)
+    with Image.open(output_path) as saved:
+        assert saved.mode == 'LA'
+        saved_array = np.asarray(saved)
+    assert np.array_equal(saved_array[..., 0], per_pixel(rgba_array))
+    assert np.array_equal(saved_array[..., 1], rgba_array[..., 3])
+
+def test_alpha_is_dropped_when_the_format_cannot_store_it(tmp_path):
+    rgba_array = random_rgb(20, 30, channels=4)
+    output_path = str(tmp_path / 'gray.bmp')
+    image_processing.save_grayscale(Image.fromarray(rgba_array, mode='RGBA'), output_path)
+    with Image.open(output_path) as saved:
+        assert saved.mode == 'L'
+        assert np.array_equal(np.asarray(saved), per_pixel(rgba_array))
+
+def test_palette_transparency_is_kept(tmp_path):
+    img = Image.new('P', (4, 4))
+    img.putpalette([0, 0, 0, 255, 255, 255])
+    img.info['transparency'] = 0
+    output_path = str(tmp_path / 'gray.png')
+    image_processing.save_grayscale(img, output_path)
+    with Image.open(output_path) as saved:
+        assert saved.mode == 'LA'
+        assert not np.asarray(saved)[..., 1].any()
+
+def drain(progress):
+    items = []
+    while not progress.empty():
+        items.append(progress.get_nowait())
+    return items
+
+def test_batch_of_images_on_the_process_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr(image_processing.config, 'grayscaling_progress', queue.Queue())
+    monkeypatch.setattr(image_processing.config, 'message_to_display', '')
+    monkeypatch.setattr(image_processing.config, 'image_process_workers', 2)
+    for number in range(3):
+        Image.fromarray(random_rgb(16, 16, seed=number), mode='RGB').save(tmp_path / f'pic{number}.png')
+    (tmp_path / 'broken.jpg').write_bytes(b'not an image')
+    (tmp_path / 'gray_old.png').write_bytes(b'made by an earlier run')
+    (tmp_path / 'notes.txt').write_text('skipped')
+
+    image_processing.grayscaling_images(str(tmp_path))
+
+    progress = drain(image_processing.config.grayscaling_progress)
+    assert sorted(item.done for item in progress) == [1, 2, 3, 4]
+    assert all(item.total == 4 for item in progress)
+    failed = [item for item in progress if item.error]
+    assert [item.image_path.split('/')[-1] for item in failed] == ['broken.jpg']
+    for number in range(3):
+        with Image.open(tmp_path / f'gray_pic{number}.png') as saved:
+            assert np.array_equal(np.asarray(saved), per_pixel(random_rgb(16, 16, seed=number)))
+    assert '3 of 4' in image_processing.config.message_to_display
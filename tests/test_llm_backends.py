@@ -0,0 +1,107 @@
+import time
+from types import SimpleNamespace
+import pytest
+from src.core import config
+from src.core import llm_backends
+from src.core.llm_backends import ClaudeBackend, CohereBackend, MockBackend, OpenAIChatBackend
+
+MESSAGES = [
+    {'role': 'system', 'content': 'Be brief'},
+    {'role': 'user', 'content': 'Hi'},
+    {'role': 'assistant', 'content': 'Hello'},
+    {'role': 'user', 'content': 'How are you?'}
+]
+
+class FakeClients:
+    def __init__(self, **clients):
+        self.clients = clients
+
+    def get(self, provider):
+        return self.clients[provider]
+
+@pytest.fixture
+def clients(monkeypatch):
+    registry = FakeClients()
+    monkeypatch.setattr(llm_backends, '_clients', lambda: registry)
+    return registry.clients
+
+def test_mock_echoes_the_last_user_message_word_by_word():
+    tokens = list(MockBackend(first_token_latency=0, token_latency=0).stream(MESSAGES))
+    assert tokens == ['Mock ', 'answer: ', 'How ', 'are ', 'you?']
+
+def test_mock_reply_and_latency():
+    backend = MockBackend(reply='one two three', first_token_latency=0.05, token_latency=0.02)
+    start = time.perf_counter()
+    stream = backend.stream(MESSAGES)
+    assert next(stream) == 'one '
+    first_token = time.perf_counter() - start
+    assert list(stream) == ['two ', 'three']
+    assert first_token >= 0.05
+    assert time.perf_counter() - start >= 0.09
+
+def test_mock_latency_comes_from_config(monkeypatch):
+    monkeypatch.setattr(config, 'llm_mock_first_token_latency', 0)
+    monkeypatch.setattr(config, 'llm_mock_token_latency', 0)
+    start = time.perf_counter()
+    assert ''.join(MockBackend().stream([])) == 'Mock answer: '
+    assert time.perf_counter() - start < 0.05
+
+def test_openai_chat_backend(clients):
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        delta = lambda content: SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=content))])
+        return iter([delta('Fine'), SimpleNamespace(choices=[]), delta(None), delta(', thanks')])
+
+    clients['DeepSeek'] = SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create)))
+    assert list(OpenAIChatBackend('DeepSeek', 'deepseek-chat').stream(MESSAGES)) == ['Fine', ', thanks']
+    assert calls == [{'model': 'deepseek-chat', 'messages': MESSAGES, 'stream': True}]
+
+def test_claude_backend_sends_system_messages_separately(clients):
+    calls = []
+
+    class Stream:
+        text_stream = iter(['Fine', '!'])
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            return False
+
+    def stream(**kwargs):
+        calls.append(kwargs)
+        return Stream()
+
+    clients['Claude'] = SimpleNamespace(messages=SimpleNamespace(stream=stream))
+    assert list(ClaudeBackend('claude-model', max_tokens=10).stream(MESSAGES)) == ['Fine', '!']
+    assert calls == [{'max_tokens': 10, 'messages': MESSAGES[1:], 'model': 'claude-model', 'system': 'Be brief'}]
+
+def test_cohere_backend_sends_the_history(clients):
+    calls = []
+
+    def chat_stream(**kwargs):
+        calls.append(kwargs)
+        return iter([SimpleNamespace(event_type='stream-start'), SimpleNamespace(event_type='text-generation', text='Fine')])
+
+    clients['COHERE'] = SimpleNamespace(chat_stream=chat_stream)
+    assert list(CohereBackend('command').stream(MESSAGES)) == ['Fine']
+    assert calls == [{
+        'message': 'How are you?',
+        'chat_history': [
+            {'role': 'SYSTEM', 'message': 'Be brief'}, {'role': 'USER', 'message': 'Hi'}, {'role': 'CHATBOT', 'message': 'Hello'}
+        ],
+        'model': 'command'
+    }]
+
+def test_backends_are_created_once(monkeypatch):
+    monkeypatch.setattr(llm_backends, '_backends', {})
+    monkeypatch.setitem(config.llm_backends, 'formatter', 'Mock')
+    backend = llm_backends.backend_for('formatter')
+    assert isinstance(backend, MockBackend)
+    assert llm_backends.get_backend('Mock') is backend
+
+def test_unknown_backend():
+    with pytest.raises(KeyError):
+        llm_backends.get_backend('Nope')
@@ -0,0 +1,93 @@
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from src.core import config
+from src.core.llm_clients import ClientRegistry
+
+@pytest.fixture
+def provider():
+    """
+    Local mock HTTP server standing in for a provider, recording the connections and requests it got.
+    """
+    server_state = {'connections': 0, 'requests': []}
+
+    class MockProvider(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def setup(self):
+            server_state['connections'] += 1
+            super().setup()
+
+        def do_HEAD(self):
+            server_state['requests'].append('HEAD')
+            self.send_response(200)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            server_state['requests'].append('POST')
+            body = b'{"ok": true}'
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockProvider)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    server_state['base_url'] = f'http://127.0.0.1:{server.server_address[1]}'
+    yield server_state
+    server.shutdown()
+    server.server_close()
+
+def test_keep_warm_is_off_by_default():
+    assert config.llm_keep_warm_interval == 0
+
+def test_warm_up_connects_once_and_the_connection_is_reused(provider):
+    registry = ClientRegistry({'DeepSeek': 'mock key'}, {'DeepSeek': provider['base_url']})
+    try:
+        registry.warm_up(['DeepSeek'])
+        registry._keep_warm_thread.join(5)
+        assert not registry._keep_warm_thread.is_alive()
+        assert provider['requests'] == ['HEAD']
+
+        for _ in range(3):
+            response = registry.http_client('DeepSeek').post(f'{provider["base_url"]}/chat/completions', json={'messages': []})
+            assert response.json() == {'ok': True}
+        assert provider['requests'] == ['HEAD', 'POST', 'POST', 'POST']
+        assert provider['connections'] == 1
+    finally:
+        registry.close()
+
+def test_keep_warm_repeats_until_closed(provider):
+    registry = ClientRegistry({'DeepSeek': 'mock key'}, {'DeepSeek': provider['base_url']})
+    registry.warm_up(['DeepSeek'], keep_warm_interval=0.02)
+    deadline = time.monotonic() + 5
+    while len(provider['requests']) < 3:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+    registry.close()
+    registry._keep_warm_thread.join(5)
+    assert not registry._keep_warm_thread.is_alive()
+    assert set(provider['requests']) == {'HEAD'}
+
+def test_connect_to_an_unreachable_provider():
+    with socket.socket() as unused:
+        unused.bind(('127.0.0.1', 0))
+        port = unused.getsockname()[1]
+    registry = ClientRegistry({'DeepSeek': 'mock key'}, {'DeepSeek': f'http://127.0.0.1:{port}'})
+    try:
+        assert registry.connect('DeepSeek') is False
+    finally:
+        registry.close()
+
+def test_base_url_override():
+    registry = ClientRegistry({}, {'Claude': 'http://127.0.0.1:9'})
+    assert registry.base_url('Claude') == 'http://127.0.0.1:9'
+    assert registry.base_url('DeepSeek') == 'https://api.deepseek.com'
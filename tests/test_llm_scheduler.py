@@ -0,0 +1,139 @@
+import threading
+import time
+import pytest
+from src.core.llm_scheduler import LLMScheduler
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.005)
+
+@pytest.fixture
+def scheduler():
+    manager = LLMScheduler({'A': 2, 'B': 1}, default_limit=1, workers=8)
+    yield manager
+    manager.shutdown(wait=True)
+
+class Tracker:
+    """
+    Work of requests that blocks until `gate` is set, counting the requests running at once by provider.
+    """
+
+    def __init__(self):
+        self.gate = threading.Event()
+        self.lock = threading.Lock()
+        self.running = {}
+        self.peak = {}
+        self.done = []
+
+    def work(self, provider, label):
+        def run(request):
+            with self.lock:
+                self.running[provider] = self.running.get(provider, 0) + 1
+                self.peak[provider] = max(self.peak.get(provider, 0), self.running[provider])
+            try:
+                while not self.gate.wait(0.005):
+                    if request.cancelled:
+                        return
+            finally:
+                with self.lock:
+                    self.running[provider] -= 1
+                    self.done.append(label)
+        return run
+
+def test_limits(scheduler):
+    assert scheduler.limit('A') == 2
+    assert scheduler.limit('Other') == 1
+    assert scheduler.limit(None) is None
+
+def test_provider_limits_hold(scheduler):
+    tracker = Tracker()
+    for number in range(5):
+        scheduler.submit(f'a{number}', 'A', tracker.work('A', number))
+    for number in range(3):
+        scheduler.submit(f'b{number}', 'B', tracker.work('B', number))
+    for number in range(4):
+        scheduler.submit(f'n{number}', None, tracker.work(None, number))
+    wait_until(lambda: tracker.running.get(None) == 4 and tracker.running.get('A') == 2 and tracker.running.get('B') == 1)
+    metrics = scheduler.metrics()
+    assert metrics['running_by_provider'] == {'A': 2, 'B': 1, None: 4}
+    assert metrics['queued_by_provider'] == {'A': 3, 'B': 2}
+    tracker.gate.set()
+    wait_until(lambda: scheduler.metrics()['completed'] == 12)
+    assert tracker.peak == {'A': 2, 'B': 1, None: 4}
+
+def test_requests_of_a_page_run_in_order(scheduler):
+    order = []
+    running = []
+
+    def work(number):
+        def run(request):
+            running.append(number)
+            assert len(running) == 1
+            # Earlier requests take longer, they'd finish last without the order
+            time.sleep(0.01 * (5 - number))
+            order.append(number)
+            running.remove(number)
+        return run
+
+    for number in range(5):
+        scheduler.submit('page', 'A', work(number))
+    wait_until(lambda: len(order) == 5)
+    assert order == [0, 1, 2, 3, 4]
+    assert scheduler.metrics()['failed'] == 0
+
+def test_cancel_drops_queued_requests_and_stops_the_running_one(scheduler):
+    tracker = Tracker()
+    cancelled = []
+    running = scheduler.submit('page', 'B', tracker.work('B', 'running'))
+    queued = [scheduler.submit('page', 'B', tracker.work('B', number), on_cancel=cancelled.append) for number in range(2)]
+    kept = scheduler.submit('page', 'B', tracker.work('B', 'kept'), cancellable=False)
+    wait_until(lambda: tracker.running.get('B') == 1)
+
+    assert scheduler.cancel('page') == 3
+    assert running.cancelled
+    assert all(request.cancelled for request in queued)
+    assert cancelled == queued
+    assert not kept.cancelled
+
+    # The running request stops at its next check, the one that isn't cancellable runs after it
+    wait_until(lambda: 'running' in tracker.done)
+    tracker.gate.set()
+    wait_until(lambda: 'kept' in tracker.done)
+    assert tracker.done == ['running', 'kept']
+    wait_until(lambda: scheduler.metrics()['completed'] == 1)
+    assert scheduler.metrics()['cancelled'] == 3
+
+def test_cancel_of_another_page_leaves_a_page_alone(scheduler):
+    tracker = Tracker()
+    request = scheduler.submit('page', 'A', tracker.work('A', 0))
+    assert scheduler.cancel('other') == 0
+    assert not request.cancelled
+    tracker.gate.set()
+
+def test_failed_work_is_counted_and_the_page_goes_on(scheduler):
+    done = []
+
+    def fail(request):
+        raise RuntimeError('provider error')
+
+    scheduler.submit('page', 'A', fail)
+    scheduler.submit('page', 'A', lambda request: done.append(True))
+    wait_until(lambda: done)
+    wait_until(lambda: scheduler.metrics()['completed'] == 1)
+    metrics = scheduler.metrics()
+    assert (metrics['failed'], metrics['submitted']) == (1, 2)
+
+def test_shutdown_cancels_everything():
+    manager = LLMScheduler({'A': 1}, workers=2)
+    tracker = Tracker()
+    cancelled = []
+    running = manager.submit('page', 'A', tracker.work('A', 0), cancellable=False)
+    manager.submit('other', 'A', tracker.work('A', 1), on_cancel=cancelled.append)
+    wait_until(lambda: tracker.running.get('A') == 1)
+    manager.shutdown(wait=True)
+    assert running.cancelled
+    assert len(cancelled) == 1
+    with pytest.raises(RuntimeError):
+        manager.submit('page', 'A', tracker.work('A', 2))
@@ -0,0 +1,83 @@
+import os
+import pytest
+from src.core import config
+from src.core.llm_sessions import SessionManager
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'formatter_cache_enabled', False)
+    return SessionManager(str(tmp_path / 'sessions'), max_in_memory=1)
+
+def say(session, text):
+    session.histories['Claude'].append('user', text)
+    session.histories['Claude'].append('assistant', f'answer to {text}')
+
+def test_evicted_session_is_restored_with_its_histories(manager, tmp_path):
+    say(manager.get('first'), 'hello')
+    manager.get('second')
+    assert manager.in_memory() == 1
+    assert os.path.exists(tmp_path / 'sessions' / 'first.json')
+
+    restored = manager.get('first')
+    assert restored.histories['Claude'].messages()[-2:] == [
+        {'role': 'user', 'content': 'hello'}, {'role': 'assistant', 'content': 'answer to hello'}
+    ]
+    assert restored.claude_conversation_history is restored.histories['Claude']
+    assert (manager.evictions, manager.restorations) == (2, 1)
+    # The file is removed once the session is back in memory
+    assert not os.path.exists(tmp_path / 'sessions' / 'first.json')
+
+def test_empty_sessions_are_not_stored(manager, tmp_path):
+    manager.get('first')
+    manager.get('second')
+    assert manager.in_memory() == 1
+    assert os.listdir(tmp_path / 'sessions') == []
+
+def test_leased_session_is_not_evicted(manager):
+    with manager.lease('first') as session:
+        say(session, 'hello')
+        manager.get('second')
+        assert manager.get('third') is not None
+        # 'first' stays while leased, the idle 'second' was evicted
+        assert manager.in_memory() == 2
+        assert manager._sessions['first'] is session
+    manager.get('fourth')
+    assert 'first' not in manager._sessions
+
+def test_busy_session_is_not_evicted(manager):
+    session = manager.get('first')
+    say(session, 'hello')
+    session.active_streams += 1
+    manager.get('second')
+    assert manager._sessions['first'] is session
+    session.active_streams -= 1
+    manager.get('third')
+    assert 'first' not in manager._sessions
+
+def test_discard_removes_the_file(manager, tmp_path):
+    say(manager.get('first'), 'hello')
+    manager.get('second')
+    assert os.path.exists(tmp_path / 'sessions' / 'first.json')
+    manager.discard('first')
+    assert not os.path.exists(tmp_path / 'sessions' / 'first.json')
+    assert manager.get('first').is_empty()
+
+def test_corrupt_file_starts_a_new_session_and_is_kept(manager, tmp_path):
+    say(manager.get('first'), 'hello')
+    manager.get('second')
+    path = tmp_path / 'sessions' / 'first.json'
+    path.write_text('{"version": 1, "histories": {', encoding='utf-8')
+
+    session = manager.get('first')
+    assert session.is_empty()
+    assert not os.path.exists(path)
+    assert (tmp_path / 'sessions' / 'first.json.bad').read_text(encoding='utf-8').startswith('{"version"')
+
+def test_files_of_the_previous_run_are_removed(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'formatter_cache_enabled', False)
+    directory = tmp_path / 'sessions'
+    directory.mkdir()
+    (directory / 'old.json').write_text('{}', encoding='utf-8')
+    (directory / 'old.json.bad').write_text('{', encoding='utf-8')
+    SessionManager(str(directory), max_in_memory=1).get('page')
+    assert os.listdir(directory) == ['old.json.bad']
@@ -0,0 +1,103 @@
+import os
+import re
+import ast
+import time
+import pytest
+from src.core.local_formatter import TEMPLATES, format_message, match_output
+
+FUNCTIONS_FILE = os.path.join(os.path.dirname(__file__), os.pardir, 'src', 'features', 'functions.py')
+
+# Values put into the f-strings of `functions.py`, by the source of the expression
+SAMPLE_VALUES = {
+    'now.day': '7',
+    "now.strftime('%B')": 'March',
+    'now.year': '2026',
+    "user_command.replace('search ', '', 1)": 'weather in Paris',
+    'sbc.get_brightness()[0]': '40',
+    'result': '3.5',
+    'e': 'file not found',
+}
+SAMPLE_TIME = (2026, 3, 7, 9, 5, 3, 5, 66, -1)
+
+# Outputs of templated tasks that are not phrased locally (questions and errors), left to the LLM
+UNPHRASED = {
+    'Please provide the directory where your music is saved - ',
+    'Error in add_music_entry - "file not found"',
+}
+
+def _functions():
+    # `functions.py` needs Windows-only packages, its source is read instead of importing it
+    with open(FUNCTIONS_FILE, encoding='utf-8') as file:
+        tree = ast.parse(file.read())
+    return {node.name: node for node in tree.body if isinstance(node, ast.FunctionDef)}
+
+def _render(node, functions):
+    """
+    The strings an expression of a return statement can produce, with the sample values.
+    """
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return [node.value]
+    if isinstance(node, ast.JoinedStr):
+        parts = []
+        for value in node.values:
+            if isinstance(value, ast.Constant):
+                parts.append(value.value)
+            else:
+                source = ast.unparse(value.value)
+                assert source in SAMPLE_VALUES, f'No sample value for {{{source}}} of functions.py'
+                parts.append(SAMPLE_VALUES[source])
+        return [''.join(parts)]
+    if isinstance(node, ast.Call):
+        called = ast.unparse(node.func)
+        if called == 'time.strftime':
+            return [time.strftime(node.args[0].value, SAMPLE_TIME)]
+        if called in functions:
+            return real_outputs(called, functions)
+    return []
+
+def real_outputs(task, functions=None):
+    functions = functions or _functions()
+    outputs = []
+    for node in ast.walk(functions[task]):
+        if isinstance(node, ast.Return) and node.value is not None:
+            outputs.extend(_render(node.value, functions))
+    return outputs
+
+@pytest.fixture(scope='module')
+def functions():
+    return _functions()
+
+@pytest.mark.parametrize('task', sorted(TEMPLATES))
+def test_every_template_matches_a_real_output(task, functions):
+    outputs = real_outputs(task, functions)
+    assert outputs, f'{task} returns no strings'
+    for pattern, _ in TEMPLATES[task]:
+        assert any(re.fullmatch(pattern, output) for output in outputs), f'{pattern!r} matches no output of {task}'
+
+@pytest.mark.parametrize('task', sorted(TEMPLATES))
+def test_real_outputs_are_phrased_in_every_language(task, functions):
+    for output in real_outputs(task, functions):
+        if output in UNPHRASED:
+            assert format_message(output, 'en') is None
+            continue
+        matched = match_output(output)
+        assert matched is not None and matched[0] == task, output
+        for language_code in ('en', 'ru'):
+            answer = format_message(output, language_code)
+            assert answer and '{' not in answer, (output, language_code)
+
+def test_values_are_filled_in():
+    assert format_message('09:05:03', 'en') == "It's 09:05 right now! Need help with anything else?"
+    assert format_message('7 March 2026', 'ru') == 'Сегодня 7 марта 2026 года! Есть планы на сегодня?'
+    assert format_message('Current brightness: 40.5%', 'en') == 'Done! Your screen brightness is 40.5% now.'
+    assert format_message("  Here is your request about 'cats'\n", 'en') == "I searched for 'cats' for you, the results are in your browser!"
+
+@pytest.mark.parametrize('message, language_code', [
+    ('', 'en'),
+    ('Website was opened successfully', 'de'),
+    ('Folder C:\\Downloads was not reorganized - access denied', 'en'),
+    # Only whole outputs are matched
+    ('Volume has been muted successfully, but the speaker is off', 'en'),
+])
+def test_left_to_the_llm(message, language_code):
+    assert format_message(message, language_code) is None
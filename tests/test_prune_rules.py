@@ -0,0 +1,62 @@
+import os
+from src.core import config
+from src.features.prune_rules import PruneEngine
+
+def test_globs_match_folder_names_case_insensitive():
+    engine = PruneEngine(globs=('node_modules', '.git', 'build*'))
+    subdirs = ['src', 'Node_Modules', '.GIT', 'build-x64', 'rebuild']
+    engine.prune('project', subdirs, files_count=0, depth=0)
+    assert subdirs == ['src', 'rebuild']
+    assert engine.counts == {'glob node_modules': 1, 'glob .git': 1, 'glob build*': 1}
+
+def test_default_globs_keep_program_folders():
+    engine = PruneEngine.from_config()
+    subdirs = ['MyCacheTool', 'site-packages', 'Temp', 'Installer', 'assembly', '$Tools', '.cargo', 'node_modules', '.git']
+    engine.prune('root', subdirs, files_count=0, depth=0)
+    assert subdirs == ['MyCacheTool', 'site-packages', 'Temp', 'Installer', 'assembly', '$Tools', '.cargo']
+
+def test_prefixes_prune_the_tree_under_them_only(tmp_path):
+    root = str(tmp_path)
+    engine = PruneEngine(prefixes=(os.path.join(root, 'Windows'),))
+    subdirs = ['Windows', 'WindowsApps', 'Programs']
+    engine.prune(root, subdirs, files_count=0, depth=0)
+    assert subdirs == ['WindowsApps', 'Programs']
+
+    subdirs = ['System32']
+    engine.prune(os.path.join(root, 'Windows'), subdirs, files_count=0, depth=1)
+    assert subdirs == []
+    assert engine.counts[f'prefix {os.path.normcase(os.path.join(root, "Windows"))}'] == 2
+
+def test_max_depth():
+    engine = PruneEngine(max_depth=2)
+    subdirs = ['a', 'b']
+    engine.prune('root', subdirs, files_count=0, depth=1)
+    assert subdirs == ['a', 'b']
+    engine.prune('root', subdirs, files_count=0, depth=2)
+    assert subdirs == []
+    assert engine.counts['max depth'] == 2
+
+def test_max_directory_entries_counts_files_and_folders():
+    engine = PruneEngine(max_directory_entries=5)
+    subdirs = ['a', 'b']
+    engine.prune('root', subdirs, files_count=3, depth=0)
+    assert subdirs == ['a', 'b']
+    engine.prune('root', subdirs, files_count=4, depth=0)
+    assert subdirs == []
+    assert engine.counts['max directory entries'] == 2
+
+def test_fingerprint_changes_with_the_rules():
+    assert PruneEngine(globs=('.git',)).fingerprint() == PruneEngine(globs=('.git',)).fingerprint()
+    assert PruneEngine(globs=('.git',)).fingerprint() != PruneEngine(globs=('.git', '.hg')).fingerprint()
+    assert PruneEngine(max_depth=3).fingerprint() != PruneEngine(max_depth=4).fingerprint()
+
+def test_walk_never_enters_pruned_folders(tmp_path, monkeypatch):
+    for folder in ('app', os.path.join('app', 'node_modules', 'pkg'), os.path.join('cache tool', 'bin'), os.path.join('.git', 'objects')):
+        os.makedirs(tmp_path / folder)
+    monkeypatch.setattr(config, 'scan_prune_prefixes', ())
+    engine = PruneEngine.from_config()
+    visited = []
+    for current_dir, subdirs, files in os.walk(tmp_path):
+        visited.append(os.path.relpath(current_dir, tmp_path))
+        engine.prune(current_dir, subdirs, len(files), len(visited[-1].split(os.sep)) - (visited[-1] == '.'))
+    assert sorted(visited) == sorted(['.', 'app', 'cache tool', os.path.join('cache tool', 'bin')])
@@ -0,0 +1,194 @@
+import os
+import json
+import time
+import pytest
+from src.core import config
+from src.features import reorganizer
+
+def make_files(root, names):
+    for name in names:
+        path = os.path.join(root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(name)
+
+def top_level(root):
+    return sorted(name for name in os.listdir(root) if name != config.RELOCATION_JOURNAL_FILE)
+
+def test_undo_resume_and_second_undo(tmp_path, monkeypatch):
+    root = str(tmp_path)
+    make_files(root, ['a.txt', 'b.jpg'])
+    reorganizer.reorganize(root)
+    make_files(root, ['c.png', 'd.png'])
+    reorganizer.reorganize(root)
+    assert top_level(root) == ['jpg', 'png', 'txt']
+
+    # d.png is locked by another program during the first undo
+    replace = os.replace
+
+    def locked_replace(source, destination):
+        if source.endswith('d.png'):
+            raise PermissionError('The file is used by another process')
+        replace(source, destination)
+
+    monkeypatch.setattr(reorganizer.os, 'replace', locked_replace)
+    stats = reorganizer.undo_reorganization(root)
+    assert (stats.moved, stats.failed) == (1, 1)
+    assert top_level(root) == ['c.png', 'jpg', 'png', 'txt']
+
+    # The resumed undo only moves the file that failed
+    monkeypatch.setattr(reorganizer.os, 'replace', replace)
+    stats = reorganizer.undo_reorganization(root)
+    assert (stats.moved, stats.failed) == (1, 0)
+    assert top_level(root) == ['c.png', 'd.png', 'jpg', 'txt']
+
+    # The second undo takes back the first reorganization
+    stats = reorganizer.undo_reorganization(root)
+    assert (stats.moved, stats.failed) == (2, 0)
+    assert top_level(root) == ['a.txt', 'b.jpg', 'c.png', 'd.png']
+    assert reorganizer.undo_reorganization(root) is None
+
+def test_legacy_log_can_be_undone(tmp_path):
+    root = str(tmp_path)
+    # What older versions left: files moved into extension folders and {file name: new path}
+    make_files(root, [os.path.join('txt', 'a.txt'), os.path.join('jpg', 'b.jpg')])
+    with open(os.path.join(root, config.LEGACY_RELOCATION_LOG_FILE), 'w') as file:
+        json.dump({'a.txt': os.path.join('txt', 'a.txt'), 'b.jpg': os.path.join('jpg', 'b.jpg')}, file, indent=2)
+
+    stats = reorganizer.undo_reorganization(root)
+    assert (stats.moved, stats.failed) == (2, 0)
+    assert top_level(root) == ['a.txt', 'b.jpg']
+    assert not os.path.exists(os.path.join(root, config.LEGACY_RELOCATION_LOG_FILE))
+    assert reorganizer.undo_reorganization(root) is None
+
+def test_legacy_log_is_older_than_new_runs(tmp_path):
+    root = str(tmp_path)
+    make_files(root, [os.path.join('txt', 'a.txt'), 'c.png'])
+    with open(os.path.join(root, config.LEGACY_RELOCATION_LOG_FILE), 'w') as file:
+        json.dump({'a.txt': os.path.join('txt', 'a.txt')}, file)
+
+    # A new reorganization doesn't move the legacy log, it's migrated first
+    plan = reorganizer.plan_reorganization(root)
+    assert [move.source for move in plan.moves] == ['c.png']
+    reorganizer.execute_plan(plan)
+
+    reorganizer.undo_reorganization(root)
+    assert top_level(root) == ['c.png', 'txt']
+    reorganizer.undo_reorganization(root)
+    assert top_level(root) == ['a.txt', 'c.png']
+
+def test_broken_legacy_log_is_left_alone(tmp_path):
+    root = str(tmp_path)
+    legacy_path = tmp_path / config.LEGACY_RELOCATION_LOG_FILE
+    legacy_path.write_text('{"a.txt": ', encoding='utf-8')
+    assert not reorganizer.migrate_legacy_log(root)
+    assert legacy_path.exists()
+    assert reorganizer.undo_reorganization(root) is None
+
+def moves(plan):
+    return sorted((move.source, move.destination) for move in plan.moves)
+
+def test_plan_moves_files_into_extension_folders(tmp_path):
+    make_files(str(tmp_path), ['a.txt', 'B.JPG', 'c.jpg', 'README'])
+    plan = reorganizer.plan_by_extension(str(tmp_path))
+    assert moves(plan) == [('B.JPG', 'jpg/B.JPG'), ('README', 'no_ext/README'), ('a.txt', 'txt/a.txt'), ('c.jpg', 'jpg/c.jpg')]
+    assert plan.directories == ['jpg', 'no_ext', 'txt']
+    # Planning touches nothing
+    assert top_level(str(tmp_path)) == ['B.JPG', 'README', 'a.txt', 'c.jpg']
+
+def test_existing_names_in_target_folders_are_not_overwritten(tmp_path):
+    make_files(str(tmp_path), ['photo.jpg', 'photo (1).jpg', 'jpg/photo.jpg'])
+    plan = reorganizer.plan_by_extension(str(tmp_path))
+    assert moves(plan) == [('photo (1).jpg', 'jpg/photo (1).jpg'), ('photo.jpg', 'jpg/photo (2).jpg')]
+
+    stats = reorganizer.execute_plan(plan, workers=2)
+    assert (stats.moved, stats.failed) == (2, 0)
+    assert sorted(os.listdir(tmp_path / 'jpg')) == ['photo (1).jpg', 'photo (2).jpg', 'photo.jpg']
+    with open(tmp_path / 'jpg' / 'photo.jpg', encoding='utf-8') as file:
+        assert file.read() == 'jpg/photo.jpg'
+
+def test_recursive_plan_renames_files_with_the_same_name(tmp_path):
+    make_files(str(tmp_path), ['one/photo.jpg', 'two/photo.jpg', 'jpg/kept.jpg'])
+    plan = reorganizer.plan_reorganization(str(tmp_path), recursive=True)
+    # Files already in their folder stay there
+    assert moves(plan) == [('one/photo.jpg', 'jpg/photo.jpg'), ('two/photo.jpg', 'jpg/photo (1).jpg')]
+
+def test_unreadable_target_folder_does_not_stop_planning(tmp_path):
+    # A file without an extension named like the folder of the other files
+    make_files(str(tmp_path), ['jpg', 'photo.jpg'])
+    plan = reorganizer.plan_by_extension(str(tmp_path))
+    assert moves(plan) == [('jpg', 'no_ext/jpg'), ('photo.jpg', 'jpg/photo.jpg')]
+
+def test_dry_run_creates_nothing(tmp_path):
+    make_files(str(tmp_path), ['a.txt'])
+    plan = reorganizer.reorganize(str(tmp_path), dry_run=True)
+    assert moves(plan) == [('a.txt', 'txt/a.txt')]
+    assert top_level(str(tmp_path)) == ['a.txt']
+    assert not (tmp_path / config.RELOCATION_JOURNAL_FILE).exists()
+
+def test_moves_are_journaled(tmp_path):
+    make_files(str(tmp_path), [f'file{number}.txt' for number in range(reorganizer.MOVES_PER_TASK * 2 + 1)])
+    stats = reorganizer.reorganize(str(tmp_path))
+    assert (stats.moved, stats.failed) == (reorganizer.MOVES_PER_TASK * 2 + 1, 0)
+    records = reorganizer.read_journal(str(tmp_path))
+    assert records[0]['op'] == 'start'
+    assert records[-1] == {'op': 'end', 'moved': stats.moved, 'failed': 0}
+    assert sorted(record['to'] for record in records if record['op'] == 'move') == sorted(
+        f'txt/file{number}.txt' for number in range(stats.moved)
+    )
+
+def test_missing_folder_is_reported(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'message_to_display', '')
+    assert reorganizer.reorganize(str(tmp_path / 'missing')) is None
+    assert 'was not reorganized' in config.message_to_display
+
+def bucket(tmp_path, rule, name, size=0, mtime=None):
+    path = tmp_path / name
+    path.write_bytes(b'\0' * size)
+    if mtime is not None:
+        os.utime(path, (mtime, mtime))
+    with os.scandir(tmp_path) as entries:
+        entry = next(entry for entry in entries if entry.name == name)
+        return reorganizer.BUCKET_RULES[rule][0](entry)
+
+@pytest.mark.parametrize('name, expected', [
+    ('photo.JPG', 'images'), ('notes.txt', 'documents'), ('song.flac', 'audio'), ('clip.mkv', 'video'),
+    ('backup.7z', 'archives'), ('setup.exe', 'programs'), ('data.xyz', 'other'), ('Makefile', 'other')
+])
+def test_bucket_by_type(tmp_path, name, expected):
+    assert bucket(tmp_path, 'type', name) == expected
+
+def test_bucket_by_date(tmp_path):
+    mtime = time.mktime((2024, 5, 17, 12, 0, 0, 0, 0, -1))
+    assert bucket(tmp_path, 'date', 'report.pdf', mtime=mtime) == '2024-05'
+
+def test_bucket_by_size(tmp_path, monkeypatch):
+    monkeypatch.setattr(config, 'reorganize_size_tiers', ((10, 'small'), (100, 'medium')))
+    assert bucket(tmp_path, 'size', 'empty.bin') == 'small'
+    assert bucket(tmp_path, 'size', 'ten.bin', size=10) == 'medium'
+    assert bucket(tmp_path, 'size', 'big.bin', size=100) == 'huge'
+
+def test_every_rule_has_a_description():
+    assert set(reorganizer.BUCKET_RULES) == {'extension', 'type', 'date', 'size'}
+    assert all(callable(bucket_of) and description for bucket_of, description in reorganizer.BUCKET_RULES.values())
+
+@pytest.mark.parametrize('text, expected', [
+    (r'C:\Downloads', (r'C:\Downloads', 'extension', False)),
+    (r'C:\Downloads by date', (r'C:\Downloads', 'date', False)),
+    (r'C:\Downloads by Month recursively', (r'C:\Downloads', 'date', True)),
+    ('/home/user/Downloads by kind with subfolders', ('/home/user/Downloads', 'type', True)),
+    ('/home/user/Downloads including subfolders by size', ('/home/user/Downloads', 'size', True)),
+    ('by extensions /data', ('/data', 'extension', False)),
+    # Words inside folder names are not commands
+    ('/home/user/standby dates', ('/home/user/standby dates', 'extension', False)),
+    ('/home/user/nonrecursive', ('/home/user/nonrecursive', 'extension', False)),
+])
+def test_parse_reorganize_command(text, expected):
+    assert reorganizer.parse_reorganize_command(text) == expected
+
+def test_reorganize_from_command(tmp_path):
+    make_files(str(tmp_path), ['a.txt', 'nested/b.mp3'])
+    stats = reorganizer.reorganize_from_command(f'{tmp_path} by type recursively')
+    assert (stats.moved, stats.failed) == (2, 0)
+    assert sorted(os.listdir(tmp_path / 'documents')) == ['a.txt']
+    assert sorted(os.listdir(tmp_path / 'audio')) == ['b.mp3']
@@ -0,0 +1,123 @@
+import os
+import json
+import time
+import pytest
+from src.core import response_cache
+from src.core.response_cache import ResponseCache, answer_template, fill_template, replay, split_message
+
+@pytest.fixture
+def cache(tmp_path):
+    # A delay the tests never wait for, they save explicitly
+    return ResponseCache(str(tmp_path / 'cache.json'), max_entries=3, save_delay=60)
+
+def wait_until(condition, timeout=5):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        time.sleep(0.01)
+    return True
+
+def test_split_message_replaces_volatile_values():
+    template, values = split_message("It's  20:34 on Monday, 17.10.2026, volume 40")
+    assert values == ['20:34', 'Monday', '17.10.2026', '40']
+    assert template == "It's  on , , volume "
+
+def test_answer_template_fills_other_values():
+    _, values = split_message('Volume is set to 40')
+    template = answer_template('I turned the volume to 40%!', values)
+    assert template is not None
+    assert fill_template(template, ['75']) == 'I turned the volume to 75%!'
+
+def test_longer_values_are_slotted_first():
+    _, values = split_message('Timer 20 set for 20:34')
+    template = answer_template('Timer number 20 rings at 20:34', values)
+    assert fill_template(template, ['5', '07:15']) == 'Timer number 5 rings at 07:15'
+
+@pytest.mark.parametrize('answer', [
+    # A value is missing
+    'I turned the volume up',
+    # A value of its own, made up from the message
+    'I turned the volume to 40%, it was 30% before',
+    # A value only inside a longer number
+    'I turned the volume to 400%',
+])
+def test_answers_that_cannot_be_templated(answer):
+    _, values = split_message('Volume is set to 40')
+    assert answer_template(answer, values) is None
+
+def test_cached_answer_gets_the_values_of_the_next_message(cache):
+    assert cache.put("It's 20:34", 'en', 'The time is 20:34.')
+    assert cache.get("It's 07:05", 'en') == 'The time is 07:05.'
+    # Other language, other template
+    assert cache.get("It's 07:05", 'de') is None
+    assert cache.get('Volume is set to 5', 'en') is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+def test_long_or_empty_answers_are_not_cached(cache, monkeypatch):
+    monkeypatch.setattr(response_cache.config, 'formatter_cache_max_message', 10)
+    assert not cache.put('Volume is set to 40 percent', 'en', 'Volume 40 percent')
+    assert not cache.put('Volume 4', 'en', '  ')
+
+def test_least_recently_used_entry_is_evicted(cache):
+    for message in ('Volume is set to 1', 'Brightness is set to 1', 'Timer set for 1'):
+        cache.put(message, 'en', f'Done: {message}')
+    # Reading an entry makes it the most recent one
+    assert cache.get('Volume is set to 2', 'en') == 'Done: Volume is set to 2'
+    cache.put('Alarm set for 1', 'en', 'Done: Alarm set for 1')
+
+    assert cache.get('Brightness is set to 3', 'en') is None
+    for message in ('Volume is set to 3', 'Timer set for 3', 'Alarm set for 3'):
+        assert cache.get(message, 'en') == f'Done: {message}'
+
+def test_put_does_not_write_the_file(cache):
+    cache.put('Volume is set to 40', 'en', 'Volume is 40')
+    assert not os.path.exists(cache.path)
+
+def test_saved_cache_is_loaded_least_recent_first(cache, tmp_path):
+    cache.put('Volume is set to 1', 'en', 'Volume is 1')
+    cache.put('Timer set for 1', 'en', 'Timer is 1')
+    cache.save()
+
+    with open(tmp_path / 'cache.json', encoding='utf-8') as f:
+        assert [key for key, _ in json.load(f)] == ['en\nVolume is set to ', 'en\nTimer set for ']
+    reloaded = ResponseCache(str(tmp_path / 'cache.json'), max_entries=1)
+    assert reloaded.get('Timer set for 9', 'en') == 'Timer is 9'
+    assert reloaded.get('Volume is set to 9', 'en') is None
+
+def test_unchanged_cache_is_not_written_again(cache, tmp_path):
+    cache.put('Volume is set to 1', 'en', 'Volume is 1')
+    cache.save()
+    (tmp_path / 'cache.json').unlink()
+    cache.get('Volume is set to 2', 'en')
+    cache.save()
+    assert not (tmp_path / 'cache.json').exists()
+
+def test_changes_are_saved_after_the_delay(tmp_path):
+    cache = ResponseCache(str(tmp_path / 'cache.json'), save_delay=0.05)
+    cache.put('Volume is set to 1', 'en', 'Volume is 1')
+    cache.put('Timer set for 1', 'en', 'Timer is 1')
+    assert wait_until((tmp_path / 'cache.json').exists)
+    assert wait_until(lambda: cache._save_timer is None)
+    with open(tmp_path / 'cache.json', encoding='utf-8') as f:
+        assert len(json.load(f)) == 2
+
+def test_unreadable_cache_is_rebuilt(tmp_path):
+    (tmp_path / 'cache.json').write_text('{broken', encoding='utf-8')
+    cache = ResponseCache(str(tmp_path / 'cache.json'), save_delay=60)
+    assert cache.get('Volume is set to 1', 'en') is None
+    cache.put('Volume is set to 1', 'en', 'Volume is 1')
+    cache.save()
+    assert ResponseCache(str(tmp_path / 'cache.json')).get('Volume is set to 2', 'en') == 'Volume is 2'
+
+def test_save_cache_writes_the_shared_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(response_cache.config, 'FORMATTER_CACHE_FILE', str(tmp_path / 'shared.json'))
+    monkeypatch.setattr(response_cache.config, 'formatter_cache_save_delay', 60)
+    monkeypatch.setattr(response_cache, '_cache', None)
+    response_cache.save_cache()
+    response_cache.get_cache().put('Volume is set to 1', 'en', 'Volume is 1')
+    response_cache.save_cache()
+    assert (tmp_path / 'shared.json').exists()
+
+def test_replay_yields_the_answer_word_by_word():
+    assert list(replay('The time is  07:05.', token_delay=0)) == ['The ', 'time ', 'is  ', '07:05.']
@@ -0,0 +1,62 @@
+import threading
+import time
+from src.features.scan_pool import ScanPool
+
+def wait_until(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not predicate():
+        assert time.monotonic() < deadline, 'timed out'
+        time.sleep(0.005)
+
+def test_threads_never_exceed_the_size():
+    pool = ScanPool(3)
+    lock = threading.Lock()
+    state = {'running': 0, 'peak': 0, 'done': 0}
+
+    def task():
+        with lock:
+            state['running'] += 1
+            state['peak'] = max(state['peak'], state['running'])
+        time.sleep(0.01)
+        with lock:
+            state['running'] -= 1
+            state['done'] += 1
+
+    for _ in range(30):
+        pool.submit(task)
+    wait_until(lambda: state['done'] == 30)
+    assert len(pool._threads) == 3
+    assert state['peak'] <= 3
+
+def test_idle_workers_are_reused():
+    pool = ScanPool(4)
+    done = []
+    for number in range(5):
+        pool.submit(done.append, number)
+        wait_until(lambda: len(done) == number + 1)
+        wait_until(lambda: pool._idle == len(pool._threads))
+    # Every task found an idle worker, no new thread was needed
+    assert len(pool._threads) == 1
+    assert done == [0, 1, 2, 3, 4]
+
+def test_has_idle_workers():
+    pool = ScanPool(1)
+    assert pool.has_idle_workers()
+    gate = threading.Event()
+    pool.submit(gate.wait, 5)
+    wait_until(lambda: pool._threads and pool._idle == 0)
+    assert not pool.has_idle_workers()
+    gate.set()
+    wait_until(pool.has_idle_workers)
+
+def test_failing_task_does_not_stop_the_worker():
+    pool = ScanPool(1)
+    done = []
+
+    def fail():
+        raise OSError('Access is denied')
+
+    pool.submit(fail)
+    pool.submit(done.append, 'next')
+    wait_until(lambda: done)
+    assert len(pool._threads) == 1
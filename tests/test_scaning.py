@@ -0,0 +1,113 @@
+import os
+import random
+import string
+import pytest
+
+# The scanner imports `functions`, which needs the Windows only modules (pycaw, comtypes)
+scaning = pytest.importorskip('src.features.scaning')
+
+def random_tree(seed, directories=300, files_per_directory=6):
+    rng = random.Random(seed)
+    extensions = ('.dll', '.txt', '.png', '.exe')
+    return [
+        (os.path.join('root', f'folder_{number}'),
+         [''.join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 12))) + rng.choice(extensions)
+          for _ in range(rng.randint(0, files_per_directory))])
+        for number in range(directories)
+    ]
+
+def per_directory(listings, target_name):
+    # What the scanner did before the names were scored in batches
+    for directory, files in listings:
+        found_program = scaning.find_best_match(files, target_name)
+        if found_program:
+            return directory, found_program
+    return None
+
+@pytest.mark.parametrize('batch_size', [1, 7, 100, 100000])
+@pytest.mark.parametrize('position', [0, 150, 299, None])
+def test_batched_matching_equals_per_directory_matching(batch_size, position):
+    listings = random_tree(position or 1)
+    if position is not None:
+        listings[position][1].extend(['telegram_updater.exe', 'telegram.exe'])
+        # A weaker match later on must not win
+        listings[-1][1].append('telegrm.exe')
+    expected = per_directory(listings, 'telegram.exe')
+    assert scaning.find_best_match_batched(listings, 'telegram.exe', batch_size=batch_size) == expected
+    if position is not None:
+        assert expected == (listings[position][0], 'telegram.exe')
+
+def test_rejected_matches_are_skipped():
+    listings = [('first', ['telegram.exe']), ('empty', []), ('second', ['notes.txt', 'telegram.exe'])]
+    match = scaning.find_best_match_batched(listings, 'telegram.exe', accept=lambda directory, name: directory != 'first')
+    assert match == ('second', 'telegram.exe')
+
+def test_no_match():
+    assert scaning.find_best_match_batched(random_tree(3), 'telegram.exe', batch_size=50) is None
+    assert scaning.find_best_match_batched([], 'telegram.exe') is None
+
+@pytest.fixture
+def handled(monkeypatch):
+    """
+    Found programs, recorded instead of opened.
+    """
+    found = []
+
+    def handle_found_program(program_path, target_program, should_delete=False):
+        found.append(program_path)
+        return 'Object was found and opened'
+
+    monkeypatch.setattr(scaning, 'handle_found_program', handle_found_program)
+    return found
+
+def test_deadline_cancels_the_scan():
+    job = scaning.ScanJob('telegram.exe', timeout=0.05)
+    job.submit(lambda job: None)
+    assert job.wait() is None
+    assert job.is_cancelled()
+
+def test_tasks_of_a_cancelled_scan_are_skipped():
+    ran = []
+    job = scaning.ScanJob('telegram.exe', timeout=5)
+    job.cancel()
+    job.submit(lambda job: ran.append(True))
+    assert job.wait() is None
+    assert not ran
+
+def test_cancelling_a_scan_leaves_the_next_one_alone():
+    first = scaning.ScanJob('telegram.exe', timeout=5)
+    first.cancel()
+    second = scaning.ScanJob('telegram.exe', timeout=5)
+    assert first.is_cancelled()
+    assert not second.is_cancelled()
+
+def test_closing_the_application_cancels_scans():
+    job = scaning.ScanJob('telegram.exe', timeout=5)
+    scaning.config.stop_scaning.set()
+    try:
+        assert job.is_cancelled()
+    finally:
+        scaning.config.stop_scaning.clear()
+
+def test_only_the_first_found_program_is_handled(handled):
+    job = scaning.ScanJob('telegram.exe', timeout=5)
+    job.found('C:\\first\\telegram.exe')
+    job.found('D:\\second\\telegram.exe')
+    assert job.wait() == 'Object was found and opened'
+    assert handled == ['C:\\first\\telegram.exe']
+    # Finding a program stops only this scan, not the filename index or other scans
+    assert not scaning.config.stop_scaning.is_set()
+
+def test_walk_finds_the_program_on_the_pool(tmp_path, handled, monkeypatch):
+    monkeypatch.setattr(scaning.config, 'scan_prune_prefixes', ())
+    for number in range(20):
+        os.makedirs(tmp_path / f'App {number}' / 'bin')
+        (tmp_path / f'App {number}' / 'bin' / f'app{number}.dll').write_text('x')
+    (tmp_path / 'App 13' / 'bin' / 'telegram.exe').write_text('x')
+    os.makedirs(tmp_path / 'node_modules')
+    (tmp_path / 'node_modules' / 'telegram.exe').write_text('x')
+
+    job = scaning.ScanJob('telegram.exe', timeout=10)
+    job.submit(scaning.search_directory_recursive, str(tmp_path))
+    assert job.wait() == 'Object was found and opened'
+    assert handled == [str(tmp_path / 'App 13' / 'bin' / 'telegram.exe')]